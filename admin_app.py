@@ -1,8 +1,201 @@
 # admin_app.py
 import streamlit as st
+from sqlalchemy.exc import SQLAlchemyError
 from census_app.modules.admin_auth import admin_sidebar  # Absolute import
-from census_app.helpers import send_agent_reminders, get_pending_holders_summary, status_badge, export_pending_holders_csv, export_pending_holders_pdf
+from census_app.helpers import get_pending_holders_summary, style_pending_holders
+from census_app.exports import submit_export, get_export_status
+from census_app.survey_progress import completion_distribution
+from census_app.tabulation import TABULATIONS, crosstab, get_tabulation
+from census_app.assignment import get_islands_with_holders, get_agents, plan_island_assignment, apply_assignment, suggested_capacity
+from census_app.reminders import start_reminder_scheduler
+from census_app.household_roster import ROSTER_COLUMNS, ROSTER_OPTIONS, load_roster, save_roster
 import pandas as pd
+import time
+
+
+@st.cache_resource
+def reminder_scheduler():
+    """One background reminder scheduler per server process, shared by all admin sessions"""
+    return start_reminder_scheduler()
+
+
+def agent_assignment_panel():
+    """Partition an island's holders among selected agents by travel distance"""
+    st.subheader("👷 Assign Agents to Farmers")
+    islands = get_islands_with_holders()
+    agents = get_agents()
+    if not islands or not agents:
+        st.info("Assignment needs located holders and at least one Agent user.")
+        return
+
+    holder_counts = {row["island"]: row["holders"] for row in islands}
+    agent_names = {agent["id"]: agent["name"] for agent in agents}
+
+    island = st.selectbox("Island", list(holder_counts), format_func=lambda name: f"{name} ({holder_counts[name]} holders)")
+    agent_ids = st.multiselect("Agents working this island", list(agent_names), format_func=agent_names.get)
+    capacity = st.number_input(
+        "Max holders per agent",
+        min_value=1,
+        value=max(suggested_capacity(holder_counts[island], len(agent_ids)), 1),
+    )
+
+    if st.button("🧭 Optimize Assignment", disabled=not agent_ids):
+        try:
+            st.session_state.assignment_plan = plan_island_assignment(island, agent_ids, int(capacity))
+        except ValueError as e:
+            st.error(str(e))
+
+    plan = st.session_state.get("assignment_plan")
+    if not plan or plan["island"] != island:
+        return
+
+    df_plan = pd.DataFrame(plan["summary"])
+    df_plan.insert(0, "Agent", df_plan["agent_id"].map(agent_names))
+    st.dataframe(
+        df_plan.drop(columns=["agent_id", "centre"]).rename(columns={
+            "holders": "Holders", "mean_km": "Mean km", "max_km": "Max km"
+        }),
+        hide_index=True,
+        use_container_width=True,
+    )
+    st.caption(f"Total travel {plan['total_km']} km · {plan['changed']} holder(s) change agent")
+
+    if st.button("✅ Apply Assignment", type="primary"):
+        updated = apply_assignment(plan)
+        st.session_state.pop("assignment_plan", None)
+        st.success(f"Updated {updated} holder assignment(s) on {island}.")
+
+
+def household_roster_panel():
+    """Edit every household member of a holding in one grid; saved as one batched sync"""
+    st.subheader("🏠 Household Roster")
+    farm_id = st.number_input("Holding (farm) ID", min_value=1, step=1, value=None)
+    if farm_id is None:
+        return
+    farm_id = int(farm_id)
+
+    roster = load_roster(farm_id)
+    column_config = {
+        "id": None,
+        "holder_number": st.column_config.NumberColumn("Holder #", min_value=1, max_value=3, step=1, required=True),
+        "age": st.column_config.NumberColumn("Age", min_value=0, max_value=120, step=1, required=True),
+    }
+    for column, options in ROSTER_OPTIONS.items():
+        column_config[column] = st.column_config.SelectboxColumn(
+            column.replace("_", " ").title(), options=options, required=True
+        )
+
+    edited = st.data_editor(
+        roster[["id"] + ROSTER_COLUMNS],
+        column_config=column_config,
+        num_rows="dynamic",
+        hide_index=True,
+        use_container_width=True,
+        key=f"roster_editor_{farm_id}",
+    )
+
+    if st.button("💾 Save Roster", type="primary"):
+        try:
+            counts = save_roster(farm_id, edited)
+        except ValueError as e:
+            st.error(str(e))
+            return
+        except SQLAlchemyError as e:
+            st.error(f"Roster could not be saved: {e}")
+            return
+        st.session_state.pop(f"roster_editor_{farm_id}", None)
+        st.success(
+            f"Roster saved: {counts['inserted']} added, {counts['updated']} updated, {counts['deleted']} removed."
+        )
+
+
+def survey_reports_panel():
+    """Survey completion by island or agent from the holder progress bitmaps"""
+    st.subheader("📊 Survey Completion")
+    group_by = st.radio("Group by", ["island", "agent"], horizontal=True, format_func=str.title)
+    df_progress = pd.DataFrame(completion_distribution(group_by))
+    if df_progress.empty:
+        st.info("No holders yet.")
+        return
+
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Holders", int(df_progress["holders"].sum()))
+    col2.metric("Surveys Complete", int(df_progress["complete"].sum()))
+    col3.metric("Not Started", int(df_progress["not_started"].sum()))
+
+    st.dataframe(
+        df_progress.rename(columns={
+            "group_name": group_by.title(), "holders": "Holders", "complete": "Complete",
+            "in_progress": "In Progress", "not_started": "Not Started", "avg_percent": "Avg %",
+        }),
+        hide_index=True,
+        use_container_width=True,
+    )
+
+    census_tabulations_panel()
+
+
+def census_tabulations_panel():
+    """Standard census cross-tabs, served from the tabulation cache"""
+    st.subheader("📈 Census Tabulations")
+    name = st.selectbox("Table", list(TABULATIONS), format_func=lambda key: TABULATIONS[key]["title"])
+    measure = st.selectbox(
+        "Measure", TABULATIONS[name]["measures"], format_func=lambda m: m.replace("_", " ").title()
+    )
+
+    if st.button("🔄 Recompute"):
+        get_tabulation(name, force=True)
+
+    table = crosstab(name, measure)
+    if table.empty:
+        st.info("No data for this table yet.")
+        return
+    st.dataframe(table, use_container_width=True)
+    st.download_button(
+        "📥 Download CSV",
+        table.to_csv(),
+        file_name=f"{name}_{measure}.csv",
+        mime="text/csv",
+    )
+
+
+@st.cache_data(max_entries=4, ttl=600, show_spinner=False)
+def read_export(path):
+    """Bytes of a finished export, read from disk once instead of on every rerun"""
+    with open(path, "rb") as f:
+        return f.read()
+
+
+@st.fragment(run_every=2)
+def export_progress_panel(job_ids):
+    """Progress of the running export jobs; once they all finish, rerun the page once to stop polling"""
+    statuses = [get_export_status(job_id) for job_id in job_ids]
+    if all(status["state"] != "running" for status in statuses):
+        st.rerun()
+    for status in statuses:
+        if status["state"] == "running":
+            st.progress(status["progress"], text=f"Generating {status['filename']}...")
+
+
+def export_jobs_panel():
+    """Download links for this session's finished export jobs, plus a polling panel while any is running"""
+    statuses = {job_id: get_export_status(job_id) for job_id in reversed(st.session_state.get("export_jobs", []))}
+    running = [job_id for job_id, status in statuses.items() if status["state"] == "running"]
+    if running:
+        export_progress_panel(running)
+
+    for job_id, status in statuses.items():
+        if status["state"] == "done":
+            st.download_button(
+                f"⬇️ Download {status['filename']}",
+                data=read_export(status["path"]),
+                file_name=status["filename"],
+                mime="text/csv" if status["kind"] == "csv" else "application/pdf",
+                key=f"download_{job_id}",
+                on_click="ignore",
+            )
+        elif status["state"] == "failed":
+            st.error(f"Export {status['filename']} failed: {status['error']}")
 
 
 def run():
@@ -23,28 +216,38 @@ def run():
     st.title("👨‍💼 NACP - Admin Dashboard")
     st.success(f"✅ Welcome, {st.session_state.get('username')}!")
 
-    # --- Send reminders automatically (once per session) ---
-    if "reminders_sent" not in st.session_state:
-        send_agent_reminders()
-        st.session_state.reminders_sent = True
-        st.info("📧 Agent reminders sent for pending holders.")
+    # --- Agent reminders run in the background, outside the page render ---
+    scheduler = reminder_scheduler()
 
     # --- Admin Functions Section ---
     st.subheader("Admin Functions")
     st.write("Here you can manage users, assign agents, and monitor survey progress.")
 
-    col1, col2, col3 = st.columns(3)
+    col1, col2, col3, col4 = st.columns(4)
     with col1:
         if st.button("➕ Approve New Users"):
             st.info("Functionality to approve new users goes here.")
 
     with col2:
         if st.button("👷 Assign Agents to Farmers"):
-            st.info("Functionality to assign agents goes here.")
+            st.session_state.show_agent_assignment = not st.session_state.get("show_agent_assignment", False)
 
     with col3:
         if st.button("📊 View Survey Reports"):
-            st.info("Functionality to view survey reports goes here.")
+            st.session_state.show_survey_reports = not st.session_state.get("show_survey_reports", False)
+
+    with col4:
+        if st.button("🏠 Edit Household Roster"):
+            st.session_state.show_household_roster = not st.session_state.get("show_household_roster", False)
+
+    if st.session_state.get("show_agent_assignment"):
+        agent_assignment_panel()
+
+    if st.session_state.get("show_survey_reports"):
+        survey_reports_panel()
+
+    if st.session_state.get("show_household_roster"):
+        household_roster_panel()
 
     st.markdown("---")
 
@@ -53,29 +256,31 @@ def run():
     df_pending = get_pending_holders_summary()
 
     if not df_pending.empty:
-        # Show table
-        st.dataframe(df_pending)
-
-        # Status badge column
-        for idx, row in df_pending.iterrows():
-            status_badge(row["Urgency"])
+        # Show table with urgency badges
+        st.dataframe(style_pending_holders(df_pending), hide_index=True, use_container_width=True)
 
         # Export buttons
         col_export1, col_export2 = st.columns(2)
         with col_export1:
             if st.button("📁 Export CSV"):
-                filename = export_pending_holders_csv(df_pending)
-                st.success(f"CSV exported: {filename}")
+                st.session_state.setdefault("export_jobs", []).append(submit_export("csv"))
 
         with col_export2:
             if st.button("📝 Export PDF"):
-                filename = export_pending_holders_pdf(df_pending)
-                st.success(f"PDF exported: {filename}")
+                st.session_state.setdefault("export_jobs", []).append(submit_export("pdf"))
+
+        export_jobs_panel()
 
     else:
         st.info("No pending holders at this time.")
 
-    # --- Optional: Manual reminder trigger ---
-    if st.button("🔄 Resend Agent Reminders"):
-        send_agent_reminders()
-        st.success("Agent reminders resent successfully.")
+    # --- Agent reminder status / manual trigger ---
+    if scheduler.last_run:
+        last_run = time.strftime("%Y-%m-%d %H:%M", time.localtime(scheduler.last_run))
+        st.caption(f"📧 Last reminder batch: {last_run} ({scheduler.last_sent} digest(s) sent)")
+    if scheduler.last_error:
+        st.warning(f"Last reminder batch failed: {scheduler.last_error}")
+
+    if st.button("🔄 Send Due Agent Reminders Now"):
+        scheduler.trigger()
+        st.success("Reminder batch queued. Agents already reminded for a deadline are skipped.")
@@ -0,0 +1,277 @@
+"""
+Nearest-available-agent lookup for new holders.
+
+Agent home locations are kept in an in-memory KD-tree over 3D unit-sphere
+coordinates (straight-line distance there orders points the same way as
+great-circle distance). Agents are inserted, moved and removed incrementally
+as the agents table changes. New holders are assigned to the nearest agent
+with spare capacity in the same transaction that inserts them; open-holder
+loads are read from the database under an advisory lock, so concurrent
+inserts in any process cannot overbook an agent.
+"""
+import math
+import threading
+import time
+
+from sqlalchemy import text
+
+from census_app.config import (
+    engine, HOLDERS_TABLE, AGENTS_TABLE, STATUS_PENDING, DEFAULT_AGENT_CAPACITY, AGENT_INDEX_REFRESH_SECONDS
+)
+from census_app.helpers import REVIEW_WINDOW_HOURS
+
+# Arbitrary key for pg_advisory_xact_lock serialising agent assignment
+ASSIGNMENT_LOCK_KEY = 734202
+
+# Holder columns create_holder accepts; ids, agent fields, timestamps and the
+# household counters are managed by the database
+HOLDER_INPUT_COLUMNS = {
+    "name", "owner_id", "status", "latitude", "longitude", "sex", "date_of_birth", "age",
+    "marital_status", "nationality", "nationality_other", "education_level", "highest_education",
+    "agri_training", "primary_occupation", "primary_occupation_other", "secondary_occupation", "farm_id",
+}
+
+# --------------------------------------------------------
+# KD-tree
+# --------------------------------------------------------
+def to_unit_vector(lat, lon):
+    lat_rad, lon_rad = math.radians(lat), math.radians(lon)
+    return (
+        math.cos(lat_rad) * math.cos(lon_rad),
+        math.cos(lat_rad) * math.sin(lon_rad),
+        math.sin(lat_rad),
+    )
+
+
+class _Node:
+    __slots__ = ("point", "agent_id", "axis", "left", "right", "deleted")
+
+    def __init__(self, point, agent_id, axis):
+        self.point = point
+        self.agent_id = agent_id
+        self.axis = axis
+        self.left = None
+        self.right = None
+        self.deleted = False
+
+
+class KDTree:
+    """3-d tree supporting incremental insert, lazy delete and filtered nearest-neighbour search"""
+
+    def __init__(self):
+        self.root = None
+        self.nodes = {}
+        self.deleted_count = 0
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def insert(self, agent_id, point):
+        if agent_id in self.nodes:
+            self.remove(agent_id)
+        if self.root is None:
+            self.root = node = _Node(point, agent_id, 0)
+        else:
+            parent = self.root
+            while True:
+                side = "left" if point[parent.axis] < parent.point[parent.axis] else "right"
+                child = getattr(parent, side)
+                if child is None:
+                    node = _Node(point, agent_id, (parent.axis + 1) % 3)
+                    setattr(parent, side, node)
+                    break
+                parent = child
+        self.nodes[agent_id] = node
+
+    def remove(self, agent_id):
+        node = self.nodes.pop(agent_id, None)
+        if node is None:
+            return
+        node.deleted = True
+        self.deleted_count += 1
+        if self.deleted_count > len(self.nodes):
+            self._rebuild()
+
+    def _rebuild(self):
+        """Drop tombstones and rebalance by median splits"""
+        items = [(node.agent_id, node.point) for node in self.nodes.values()]
+
+        def build(items, axis):
+            if not items:
+                return None
+            items.sort(key=lambda item: item[1][axis])
+            mid = len(items) // 2
+            node = _Node(items[mid][1], items[mid][0], axis)
+            self.nodes[node.agent_id] = node
+            node.left = build(items[:mid], (axis + 1) % 3)
+            node.right = build(items[mid + 1:], (axis + 1) % 3)
+            return node
+
+        self.nodes = {}
+        self.deleted_count = 0
+        self.root = build(items, 0)
+
+    def nearest(self, point, accept=lambda agent_id: True):
+        """Closest live agent_id whose accept(agent_id) is true, or None"""
+        best = [None, float("inf")]
+
+        def visit(node):
+            if node is None:
+                return
+            if not node.deleted and accept(node.agent_id):
+                dist = sum((a - b) ** 2 for a, b in zip(point, node.point))
+                if dist < best[1]:
+                    best[0], best[1] = node.agent_id, dist
+            diff = point[node.axis] - node.point[node.axis]
+            near, far = (node.left, node.right) if diff < 0 else (node.right, node.left)
+            visit(near)
+            if diff * diff < best[1]:
+                visit(far)
+
+        visit(self.root)
+        return best[0]
+
+# --------------------------------------------------------
+# Agent index
+# --------------------------------------------------------
+class AgentIndex:
+    """Agent home locations and capacities, synced from the database"""
+
+    def __init__(self):
+        self.tree = KDTree()
+        self.agents = {}
+        self.lock = threading.Lock()
+        self.refreshed_at = 0.0
+
+    def upsert_agent(self, agent_id, lat, lon, capacity):
+        with self.lock:
+            previous = self.agents.get(agent_id)
+            if previous is None or (previous["lat"], previous["lon"]) != (lat, lon):
+                self.tree.insert(agent_id, to_unit_vector(lat, lon))
+            self.agents[agent_id] = {"lat": lat, "lon": lon, "capacity": capacity}
+
+    def remove_agent(self, agent_id):
+        with self.lock:
+            self.agents.pop(agent_id, None)
+            self.tree.remove(agent_id)
+
+    def refresh(self, conn):
+        """Apply agent inserts, moves, capacity changes and removals since the last refresh"""
+        rows = conn.execute(text(f"""
+            SELECT user_id, home_latitude, home_longitude, COALESCE(max_open_holders, :default_capacity) AS capacity
+            FROM {AGENTS_TABLE}
+            WHERE user_id IS NOT NULL AND home_latitude IS NOT NULL AND home_longitude IS NOT NULL
+        """), {"default_capacity": DEFAULT_AGENT_CAPACITY}).all()
+
+        current_ids = set()
+        for agent_id, lat, lon, capacity in rows:
+            current_ids.add(agent_id)
+            known = self.agents.get(agent_id)
+            if known != {"lat": lat, "lon": lon, "capacity": capacity}:
+                self.upsert_agent(agent_id, lat, lon, capacity)
+        for agent_id in set(self.agents) - current_ids:
+            self.remove_agent(agent_id)
+
+        with self.lock:
+            self.refreshed_at = time.time()
+
+    def nearest_available(self, lat, lon, load):
+        """Nearest agent whose open-holder count in load is below their capacity"""
+        with self.lock:
+            return self.tree.nearest(
+                to_unit_vector(lat, lon),
+                accept=lambda a: load.get(a, 0) < self.agents[a]["capacity"],
+            )
+
+
+_agent_index = None
+_agent_index_lock = threading.Lock()
+
+
+def ensure_agent_location_columns(conn):
+    conn.execute(text(f"ALTER TABLE {AGENTS_TABLE} ADD COLUMN IF NOT EXISTS home_latitude double precision"))
+    conn.execute(text(f"ALTER TABLE {AGENTS_TABLE} ADD COLUMN IF NOT EXISTS home_longitude double precision"))
+    conn.execute(text(f"ALTER TABLE {AGENTS_TABLE} ADD COLUMN IF NOT EXISTS max_open_holders integer"))
+
+
+def get_agent_index(max_age=AGENT_INDEX_REFRESH_SECONDS):
+    """Process-wide agent index, refreshed from the agents table when older than max_age seconds"""
+    global _agent_index
+    with _agent_index_lock:
+        if _agent_index is None:
+            with engine.begin() as conn:
+                ensure_agent_location_columns(conn)
+            _agent_index = AgentIndex()
+        if time.time() - _agent_index.refreshed_at > max_age:
+            with engine.connect() as conn:
+                _agent_index.refresh(conn)
+        return _agent_index
+
+# --------------------------------------------------------
+# Holder creation
+# --------------------------------------------------------
+def open_holder_loads(conn):
+    """Pending holders per assigned agent, as committed in the database"""
+    return dict(conn.execute(text(f"""
+        SELECT assigned_agent_id, COUNT(*) FROM {HOLDERS_TABLE}
+        WHERE status = :status AND assigned_agent_id IS NOT NULL
+        GROUP BY assigned_agent_id
+    """), {"status": STATUS_PENDING}).all())
+
+
+def assign_nearest_agents(conn, holders):
+    """Assign each (holder_id, latitude, longitude) to the nearest agent with spare capacity.
+
+    Runs inside the caller's transaction; the advisory lock is held until it
+    commits, so the loads read here stay accurate. Holders without a location,
+    or with no agent in capacity, are left unassigned. Returns {holder_id: agent_id}.
+    """
+    index = get_agent_index()
+    conn.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": ASSIGNMENT_LOCK_KEY})
+    load = open_holder_loads(conn)
+
+    assignments = {}
+    for holder_id, lat, lon in holders:
+        if lat is None or lon is None or (lat == 0 and lon == 0):
+            continue
+        agent_id = index.nearest_available(lat, lon, load)
+        if agent_id is None:
+            continue
+        load[agent_id] = load.get(agent_id, 0) + 1
+        assignments[holder_id] = agent_id
+
+    if assignments:
+        conn.execute(
+            text(f"""
+                UPDATE {HOLDERS_TABLE}
+                SET assigned_agent_id = :agent_id,
+                    agent_review_deadline = now()::timestamp + make_interval(hours => :window_hours)
+                WHERE holder_id = :holder_id
+            """),
+            [{"holder_id": holder_id, "agent_id": agent_id, "window_hours": REVIEW_WINDOW_HOURS}
+             for holder_id, agent_id in assignments.items()]
+        )
+    return assignments
+
+
+def create_holder(data):
+    """Insert a holder and assign the nearest available agent in the same transaction.
+
+    data holds holders column values (name, owner_id, latitude, longitude, ...);
+    only HOLDER_INPUT_COLUMNS are accepted. Returns (holder_id, assigned_agent_id);
+    the agent is None when no agent has capacity or the holder has no location yet.
+    """
+    unknown = set(data) - HOLDER_INPUT_COLUMNS
+    if unknown:
+        raise ValueError(f"Unknown holder column(s): {', '.join(sorted(unknown))}")
+    columns = list(data)
+
+    with engine.begin() as conn:
+        holder_id, lat, lon = conn.execute(text(f"""
+            INSERT INTO {HOLDERS_TABLE} ({", ".join(columns)})
+            VALUES ({", ".join(":" + column for column in columns)})
+            RETURNING holder_id, latitude, longitude
+        """), data).one()
+        assignments = assign_nearest_agents(conn, [(holder_id, lat, lon)])
+
+    return holder_id, assignments.get(holder_id)
@@ -0,0 +1,349 @@
+"""
+Parquet analytics lake.
+
+registration_form, holders and the survey tables are exported to zstd-compressed
+Parquet under LAKE_DIR, hive-partitioned as
+<table>/island=<island>/registration_month=<YYYY-MM>/part-<run>.parquet so
+analysts can load one island or period without touching the rest.
+
+Each run appends only rows whose updated_at is past the table's watermark
+(kept in _watermarks.json). An updated row is appended again, so a table may
+hold several versions of a key until compaction rewrites each partition as a
+single file holding only the latest version of every row. Deleted rows are
+picked up by a full re-export (--full).
+
+    python -m census_app.analytics_lake sync
+    python -m census_app.analytics_lake sync --full
+    python -m census_app.analytics_lake compact
+"""
+import argparse
+import json
+import os
+import shutil
+import uuid
+from datetime import datetime, timedelta
+from urllib.parse import quote, unquote
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from sqlalchemy import create_engine, text
+
+from census_app.config import engine, LAKE_DIR, LAKE_COMPACT_MIN_FILES, REGISTRATION_DATABASE_URL, HOLDERS_TABLE, HOLDER_SURVEY_PROGRESS_TABLE
+
+PARTITION_COLUMNS = ["island", "registration_month"]
+VERSION_COLUMN = "_lake_updated_at"
+WATERMARKS_FILE = "_watermarks.json"
+UNKNOWN_PARTITION = "unknown"
+COMPRESSION = "zstd"
+
+# Re-read a short window before the watermark so rows committed late with an
+# earlier timestamp are not missed; the overlap is removed again by compaction.
+WATERMARK_OVERLAP = timedelta(minutes=5)
+
+HOLDER_ISLAND_JOIN = f"""
+    LEFT JOIN {HOLDERS_TABLE} h ON h.holder_id = t.holder_id
+    LEFT JOIN holdings ho ON ho.id = h.farm_id
+    LEFT JOIN islands i ON i.id = ho.island_id
+"""
+
+# name -> source database, primary key, SQL exposing island / registered_at / version columns
+LAKE_TABLES = {
+    "registration_form": {
+        "database": "registration",
+        "key": ["id"],
+        "sql": f"""
+            SELECT t.*, t.created_at AS registered_at, t.updated_at AS {VERSION_COLUMN}
+            FROM registration_form t
+            WHERE t.updated_at >= :since
+        """,
+    },
+    "holders": {
+        "database": "census",
+        "key": ["holder_id"],
+        "sql": f"""
+            SELECT t.*, i.name AS island, t.submitted_at AS registered_at, t.updated_at AS {VERSION_COLUMN}
+            FROM {HOLDERS_TABLE} t
+            LEFT JOIN holdings ho ON ho.id = t.farm_id
+            LEFT JOIN islands i ON i.id = ho.island_id
+            WHERE t.updated_at >= :since
+        """,
+    },
+    "survey_responses": {
+        "database": "census",
+        "key": ["id"],
+        "sql": f"""
+            SELECT t.*, i.name AS island, h.submitted_at AS registered_at, t.updated_at AS {VERSION_COLUMN}
+            FROM survey_responses t
+            {HOLDER_ISLAND_JOIN}
+            WHERE t.updated_at >= :since
+        """,
+    },
+    "holder_survey_progress": {
+        "database": "census",
+        "key": ["id"],
+        "sql": f"""
+            SELECT t.*, i.name AS island, h.submitted_at AS registered_at, t.updated_at AS {VERSION_COLUMN}
+            FROM {HOLDER_SURVEY_PROGRESS_TABLE} t
+            {HOLDER_ISLAND_JOIN}
+            WHERE t.updated_at >= :since
+        """,
+    },
+}
+
+# Small reference tables rewritten whole on every run
+LAKE_SNAPSHOTS = {
+    "survey_questions": "SELECT * FROM survey_questions ORDER BY section_id, question_no",
+}
+
+# Census tables whose updated_at must move on every UPDATE for incremental sync
+TRACKED_CENSUS_TABLES = [HOLDERS_TABLE, "survey_responses", HOLDER_SURVEY_PROGRESS_TABLE]
+
+# --------------------------------------------------------
+# Change tracking
+# --------------------------------------------------------
+def ensure_lake_tracking(conn):
+    """Give the tracked census tables an updated_at column kept current by a trigger.
+
+    Each ALTER / CREATE TRIGGER locks its table, so only what is missing is added;
+    tables that already maintain updated_at (holders has update_holders_updated_at)
+    are left as they are.
+    """
+    if not conn.execute(text("SELECT to_regproc('update_updated_at_column')")).scalar():
+        conn.execute(text("""
+            CREATE OR REPLACE FUNCTION update_updated_at_column() RETURNS trigger AS $$
+            BEGIN
+                NEW.updated_at = NOW();
+                RETURN NEW;
+            END;
+            $$ LANGUAGE plpgsql
+        """))
+    with_column = {row[0] for row in conn.execute(text("""
+        SELECT table_name FROM information_schema.columns
+        WHERE column_name = 'updated_at' AND table_name = ANY(:tables)
+    """), {"tables": TRACKED_CENSUS_TABLES}).all()}
+    with_trigger = {row[0] for row in conn.execute(text("""
+        SELECT c.relname FROM pg_trigger t
+        JOIN pg_class c ON c.oid = t.tgrelid
+        JOIN pg_proc p ON p.oid = t.tgfoid
+        WHERE p.proname = 'update_updated_at_column' AND NOT t.tgisinternal
+    """)).all()}
+    for table in TRACKED_CENSUS_TABLES:
+        if table not in with_column:
+            conn.execute(text(f"ALTER TABLE {table} ADD COLUMN updated_at timestamp DEFAULT now()"))
+        conn.execute(text(f"CREATE INDEX IF NOT EXISTS idx_{table}_updated_at ON {table} (updated_at)"))
+        if table not in with_trigger:
+            conn.execute(text(f"""
+                CREATE TRIGGER trg_{table}_lake_updated_at
+                BEFORE UPDATE ON {table}
+                FOR EACH ROW EXECUTE FUNCTION update_updated_at_column()
+            """))
+
+
+_registration_engine = None
+
+
+def _source_engine(database):
+    global _registration_engine
+    if database == "census":
+        return engine
+    if not REGISTRATION_DATABASE_URL:
+        return None
+    if _registration_engine is None:
+        _registration_engine = create_engine(REGISTRATION_DATABASE_URL, pool_pre_ping=True)
+    return _registration_engine
+
+# --------------------------------------------------------
+# Watermarks
+# --------------------------------------------------------
+def _load_watermarks():
+    path = os.path.join(LAKE_DIR, WATERMARKS_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def _save_watermarks(watermarks):
+    os.makedirs(LAKE_DIR, exist_ok=True)
+    path = os.path.join(LAKE_DIR, WATERMARKS_FILE)
+    with open(f"{path}.tmp", "w") as f:
+        json.dump(watermarks, f, indent=2)
+    os.replace(f"{path}.tmp", path)
+
+# --------------------------------------------------------
+# Partitioned files
+# --------------------------------------------------------
+def _add_partition_columns(df):
+    df = df.drop(columns=["registration_month"], errors="ignore")
+    df["island"] = df["island"].fillna(UNKNOWN_PARTITION).astype(str)
+    df["registration_month"] = (
+        pd.to_datetime(df.pop("registered_at"), errors="coerce").dt.strftime("%Y-%m").fillna(UNKNOWN_PARTITION)
+    )
+    return df
+
+
+def _partition_dir(table, island, month):
+    return os.path.join(LAKE_DIR, table, f"island={quote(island, safe='')}", f"registration_month={month}")
+
+
+def _write_partitions(table, df, prefix):
+    """Write one file per (island, month) partition; returns the number of files written"""
+    files = 0
+    for (island, month), part in df.groupby(PARTITION_COLUMNS, sort=False):
+        directory = _partition_dir(table, island, month)
+        os.makedirs(directory, exist_ok=True)
+        pq.write_table(
+            pa.Table.from_pandas(part.drop(columns=PARTITION_COLUMNS), preserve_index=False),
+            os.path.join(directory, f"{prefix}-{uuid.uuid4().hex[:12]}.parquet"),
+            compression=COMPRESSION,
+        )
+        files += 1
+    return files
+
+
+def _partition_files(table):
+    """{(island, month): [paths]} for every partition of a lake table"""
+    root = os.path.join(LAKE_DIR, table)
+    partitions = {}
+    if not os.path.isdir(root):
+        return partitions
+    for island_dir in os.listdir(root):
+        for month_dir in os.listdir(os.path.join(root, island_dir)):
+            directory = os.path.join(root, island_dir, month_dir)
+            paths = sorted(
+                os.path.join(directory, name) for name in os.listdir(directory) if name.endswith(".parquet")
+            )
+            if paths:
+                key = (unquote(island_dir.split("=", 1)[1]), month_dir.split("=", 1)[1])
+                partitions[key] = paths
+    return partitions
+
+
+def _read_files(paths, island, month):
+    # permissive promotion merges all-null columns and files that stored an integer column as double
+    df = pa.concat_tables([pq.read_table(path) for path in paths], promote_options="permissive").to_pandas()
+    df["island"] = island
+    df["registration_month"] = month
+    return df
+
+
+def _latest_versions(df, key):
+    return df.sort_values(VERSION_COLUMN).drop_duplicates(subset=key, keep="last")
+
+
+def load_lake_table(table):
+    """A lake table as one DataFrame with only the latest version of every row"""
+    if table in LAKE_SNAPSHOTS:
+        return pd.read_parquet(os.path.join(LAKE_DIR, table, "snapshot.parquet"))
+    frames = [_read_files(paths, island, month) for (island, month), paths in _partition_files(table).items()]
+    if not frames:
+        return pd.DataFrame()
+    return _latest_versions(pd.concat(frames, ignore_index=True), LAKE_TABLES[table]["key"]).reset_index(drop=True)
+
+# --------------------------------------------------------
+# Sync
+# --------------------------------------------------------
+def sync_table(table, full=False):
+    """Append rows changed since the table's watermark; returns the number of rows written"""
+    spec = LAKE_TABLES[table]
+    source = _source_engine(spec["database"])
+    if source is None:
+        return 0
+
+    watermarks = _load_watermarks()
+    if full or table not in watermarks:
+        shutil.rmtree(os.path.join(LAKE_DIR, table), ignore_errors=True)
+        since = datetime(1970, 1, 1)
+    else:
+        since = datetime.fromisoformat(watermarks[table]) - WATERMARK_OVERLAP
+
+    # Nullable dtypes keep an integer column with NULLs as int64 instead of double,
+    # so every append file of a partition has the same column types
+    with source.connect() as conn:
+        df = pd.read_sql(text(spec["sql"]), conn, params={"since": since}, dtype_backend="numpy_nullable")
+    if df.empty:
+        return 0
+
+    df[VERSION_COLUMN] = pd.to_datetime(df[VERSION_COLUMN], errors="coerce")
+    _write_partitions(table, _add_partition_columns(df), "part")
+
+    latest = df[VERSION_COLUMN].max()
+    if pd.notna(latest):
+        watermarks[table] = latest.isoformat()
+        _save_watermarks(watermarks)
+    return len(df)
+
+
+def sync_snapshots():
+    for table, sql in LAKE_SNAPSHOTS.items():
+        with engine.connect() as conn:
+            df = pd.read_sql(text(sql), conn)
+        directory = os.path.join(LAKE_DIR, table)
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, "snapshot.parquet")
+        pq.write_table(pa.Table.from_pandas(df, preserve_index=False), f"{path}.tmp", compression=COMPRESSION)
+        os.replace(f"{path}.tmp", path)
+
+# --------------------------------------------------------
+# Compaction
+# --------------------------------------------------------
+def compact_table(table, min_files=LAKE_COMPACT_MIN_FILES):
+    """Rewrite fragmented partitions as single files of latest row versions.
+
+    A row that moved island or month is dropped from its old partition. Returns
+    the number of partitions rewritten.
+    """
+    key = LAKE_TABLES[table]["key"]
+    partitions = _partition_files(table)
+    if sum(len(paths) for paths in partitions.values()) < min_files:
+        return 0
+
+    frames = {location: _read_files(paths, *location) for location, paths in partitions.items()}
+    current = _latest_versions(pd.concat(frames.values(), ignore_index=True), key)
+    current_keys = {location: part for location, part in current.groupby(PARTITION_COLUMNS, sort=False)}
+
+    rewritten = 0
+    for location, paths in partitions.items():
+        kept = current_keys.get(location)
+        if len(paths) == 1 and kept is not None and len(kept) == len(frames[location]):
+            continue
+        if kept is not None:
+            _write_partitions(table, kept, "compacted")
+        for path in paths:
+            os.remove(path)
+        if kept is None:
+            directory = os.path.dirname(paths[0])
+            os.rmdir(directory)
+            if not os.listdir(os.path.dirname(directory)):
+                os.rmdir(os.path.dirname(directory))
+        rewritten += 1
+    return rewritten
+
+
+def sync_lake(full=False, compact=True):
+    """Sync every lake table, compacting fragmented ones; returns {table: rows written}"""
+    with engine.begin() as conn:
+        ensure_lake_tracking(conn)
+    written = {table: sync_table(table, full=full) for table in LAKE_TABLES}
+    sync_snapshots()
+    if compact:
+        for table in LAKE_TABLES:
+            compact_table(table)
+    return written
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Maintain the Parquet analytics lake")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sync = sub.add_parser("sync", help="append rows changed since the last run")
+    sync.add_argument("--full", action="store_true", help="re-export every table from scratch")
+    sub.add_parser("compact", help="compact every table now")
+    args = parser.parse_args()
+
+    if args.command == "sync":
+        for table, rows in sync_lake(full=args.full).items():
+            print(f"✅ {table}: {rows} row(s) written")
+    else:
+        for table in LAKE_TABLES:
+            print(f"✅ {table}: {compact_table(table, min_files=1)} partition(s) compacted")
@@ -0,0 +1,262 @@
+"""
+Geographic agent-to-holder assignment.
+
+Holders on an island are partitioned among the agents working that island with
+capacitated k-means: each iteration assigns holders greedily by distance to the
+agent cluster centres (respecting per-agent capacity), recomputes the centres,
+and a final local search swaps holders between agents while that shortens the
+total travel distance. Results are written back in one bulk UPDATE.
+"""
+import math
+
+import numpy as np
+from sqlalchemy import text
+
+from census_app.config import engine, HOLDERS_TABLE, USERS_TABLE, ROLE_AGENT
+
+EARTH_RADIUS_KM = 6371.0
+MAX_ITERATIONS = 30
+MAX_SWAP_PASSES = 5
+
+# --------------------------------------------------------
+# Distance
+# --------------------------------------------------------
+def haversine_matrix(points, centres):
+    """Great-circle distance in km between every point and every centre (both N x 2 lat/lon degrees)"""
+    lat1 = np.radians(points[:, 0])[:, None]
+    lon1 = np.radians(points[:, 1])[:, None]
+    lat2 = np.radians(centres[:, 0])[None, :]
+    lon2 = np.radians(centres[:, 1])[None, :]
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+# --------------------------------------------------------
+# Capacitated k-means
+# --------------------------------------------------------
+def _initial_centres(points, k, rng):
+    """k-means++ seeding on haversine distance"""
+    centres = [points[rng.integers(len(points))]]
+    for _ in range(1, k):
+        nearest = haversine_matrix(points, np.array(centres)).min(axis=1)
+        weights = nearest ** 2
+        total = weights.sum()
+        if total == 0:
+            centres.append(points[rng.integers(len(points))])
+        else:
+            centres.append(points[rng.choice(len(points), p=weights / total)])
+    return np.array(centres)
+
+
+def _capacitated_assign(distances, capacity):
+    """Assign each point to the closest centre with room left, shortest distances first"""
+    n, k = distances.shape
+    labels = np.full(n, -1)
+    load = np.zeros(k, dtype=int)
+    order = np.argsort(distances, axis=None)
+    for flat in order:
+        point, centre = divmod(int(flat), k)
+        if labels[point] != -1 or load[centre] >= capacity[centre]:
+            continue
+        labels[point] = centre
+        load[centre] += 1
+        if load.sum() == n:
+            break
+    return labels
+
+
+def _local_search(distances, labels, capacity):
+    """Move or swap single holders between agents while it reduces total distance"""
+    distances = np.asarray(distances, dtype=float)
+    labels = np.array(labels)
+    k = distances.shape[1]
+    load = np.bincount(labels, minlength=k)
+    for _ in range(MAX_SWAP_PASSES):
+        improved = False
+        for i in range(len(labels)):
+            current = labels[i]
+            gains = distances[i, current] - distances[i]
+            targets = [int(t) for t in np.argsort(-gains) if gains[t] > 1e-9]
+
+            # Plain move into an agent with spare capacity
+            moved = False
+            for target in targets:
+                if load[target] < capacity[target]:
+                    labels[i] = target
+                    load[current] -= 1
+                    load[target] += 1
+                    moved = True
+                    break
+            if moved:
+                improved = True
+                continue
+
+            # Every closer agent is full: swap with one of its holders if that helps both sides overall
+            for target in targets:
+                members = np.where(labels == target)[0]
+                if len(members) == 0:
+                    continue
+                swap_gain = gains[target] + distances[members, target] - distances[members, current]
+                best = int(np.argmax(swap_gain))
+                if swap_gain[best] > 1e-9:
+                    labels[i], labels[members[best]] = target, current
+                    improved = True
+                    break
+        if not improved:
+            break
+    return labels
+
+
+def capacitated_kmeans(points, capacities, seed=0):
+    """Partition points (N x 2 lat/lon) into len(capacities) capacity-limited clusters.
+
+    Returns (labels, centres). Raises ValueError if the capacities cannot hold every point.
+    """
+    capacity = np.asarray(capacities, dtype=int)
+    k = len(capacity)
+    if capacity.sum() < len(points):
+        raise ValueError(f"Agent capacity ({capacity.sum()}) is less than the number of holders ({len(points)})")
+    if len(points) == 0:
+        return np.array([], dtype=int), np.empty((k, 2))
+
+    rng = np.random.default_rng(seed)
+    centres = _initial_centres(points, min(k, len(points)), rng)
+    if len(centres) < k:
+        centres = np.vstack([centres, np.repeat(centres[:1], k - len(centres), axis=0)])
+
+    labels = None
+    for _ in range(MAX_ITERATIONS):
+        new_labels = _capacitated_assign(haversine_matrix(points, centres), capacity)
+        if labels is not None and np.array_equal(new_labels, labels):
+            break
+        labels = new_labels
+        for c in range(k):
+            members = points[labels == c]
+            if len(members):
+                centres[c] = members.mean(axis=0)
+
+    labels = _local_search(haversine_matrix(points, centres), labels, capacity)
+    return labels, centres
+
+# --------------------------------------------------------
+# Database
+# --------------------------------------------------------
+def get_islands_with_holders():
+    """Island names with located holder counts, largest first"""
+    with engine.connect() as conn:
+        rows = conn.execute(text(f"""
+            SELECT i.name AS island, COUNT(*) AS holders
+            FROM {HOLDERS_TABLE} h
+            JOIN holdings ho ON ho.id = h.farm_id
+            JOIN islands i ON i.id = ho.island_id
+            WHERE h.latitude IS NOT NULL AND h.longitude IS NOT NULL
+              AND NOT (h.latitude = 0 AND h.longitude = 0)
+            GROUP BY i.name
+            ORDER BY COUNT(*) DESC
+        """)).mappings().all()
+    return [dict(row) for row in rows]
+
+
+def get_agents():
+    """Agent users (users.id is what holders.assigned_agent_id references)"""
+    with engine.connect() as conn:
+        rows = conn.execute(text(f"""
+            SELECT u.id, COALESCE(a.name, u.username) AS name
+            FROM {USERS_TABLE} u
+            LEFT JOIN agents a ON a.user_id = u.id
+            WHERE u.role = :role
+            ORDER BY name
+        """), {"role": ROLE_AGENT}).mappings().all()
+    return [dict(row) for row in rows]
+
+
+def _load_island_holders(conn, island):
+    rows = conn.execute(text(f"""
+        SELECT h.holder_id, h.latitude, h.longitude, h.assigned_agent_id
+        FROM {HOLDERS_TABLE} h
+        JOIN holdings ho ON ho.id = h.farm_id
+        JOIN islands i ON i.id = ho.island_id
+        WHERE i.name = :island
+          AND h.latitude IS NOT NULL AND h.longitude IS NOT NULL
+          AND NOT (h.latitude = 0 AND h.longitude = 0)
+        ORDER BY h.holder_id
+    """), {"island": island}).all()
+    holder_ids = np.array([r[0] for r in rows], dtype=int)
+    points = np.array([[r[1], r[2]] for r in rows], dtype=float).reshape(-1, 2)
+    current = [r[3] for r in rows]
+    return holder_ids, points, current
+
+
+def _match_clusters_to_agents(labels, current, agent_ids):
+    """Map cluster numbers to agents so as many holders as possible keep their current agent"""
+    k = len(agent_ids)
+    agent_index = {agent_id: j for j, agent_id in enumerate(agent_ids)}
+    overlap = np.zeros((k, k), dtype=int)
+    for label, agent_id in zip(labels, current):
+        if agent_id in agent_index:
+            overlap[label, agent_index[agent_id]] += 1
+
+    mapping = {}
+    used = set()
+    for flat in np.argsort(-overlap, axis=None):
+        cluster, agent = divmod(int(flat), k)
+        if cluster in mapping or agent in used:
+            continue
+        mapping[cluster] = agent_ids[agent]
+        used.add(agent)
+    return mapping
+
+
+def plan_island_assignment(island, agent_ids, capacity_per_agent, seed=0):
+    """Compute (without saving) an assignment of an island's located holders to agent_ids"""
+    if not agent_ids:
+        raise ValueError("Select at least one agent")
+    with engine.connect() as conn:
+        holder_ids, points, current = _load_island_holders(conn, island)
+
+    labels, centres = capacitated_kmeans(points, [capacity_per_agent] * len(agent_ids), seed=seed)
+    mapping = _match_clusters_to_agents(labels, current, agent_ids)
+    assigned = np.array([mapping[label] for label in labels], dtype=int)
+
+    distances = haversine_matrix(points, centres)[np.arange(len(labels)), labels] if len(labels) else np.array([])
+    summary = []
+    for cluster, agent_id in sorted(mapping.items(), key=lambda item: item[1]):
+        member_distances = distances[labels == cluster]
+        summary.append({
+            "agent_id": agent_id,
+            "holders": int(len(member_distances)),
+            "mean_km": round(float(member_distances.mean()), 2) if len(member_distances) else 0.0,
+            "max_km": round(float(member_distances.max()), 2) if len(member_distances) else 0.0,
+            "centre": tuple(np.round(centres[cluster], 5)),
+        })
+
+    return {
+        "island": island,
+        "holder_ids": holder_ids.tolist(),
+        "agent_ids": assigned.tolist(),
+        "changed": int(sum(1 for old, new in zip(current, assigned) if old != new)),
+        "total_km": round(float(distances.sum()), 2) if len(distances) else 0.0,
+        "summary": summary,
+    }
+
+
+def apply_assignment(plan):
+    """Write a planned assignment back to holders in one bulk UPDATE; returns rows updated"""
+    if not plan["holder_ids"]:
+        return 0
+    with engine.begin() as conn:
+        result = conn.execute(text(f"""
+            UPDATE {HOLDERS_TABLE} AS h
+            SET assigned_agent_id = data.agent_id,
+                updated_at = now()
+            FROM unnest(CAST(:holder_ids AS integer[]), CAST(:agent_ids AS integer[])) AS data(holder_id, agent_id)
+            WHERE h.holder_id = data.holder_id
+              AND h.assigned_agent_id IS DISTINCT FROM data.agent_id
+        """), {"holder_ids": plan["holder_ids"], "agent_ids": plan["agent_ids"]})
+        return result.rowcount
+
+
+def suggested_capacity(holder_count, agent_count, slack=0.1):
+    """Even share per agent plus some slack so clusters can follow geography"""
+    if agent_count == 0:
+        return 0
+    return math.ceil(holder_count / agent_count * (1 + slack))
@@ -0,0 +1,162 @@
+"""
+Bulk holder import.
+
+Holders are COPYed into a temporary staging table and moved into holders with
+one INSERT ... SELECT. The per-row trg_create_holding_labour trigger is
+skipped for that transaction only, and all default holding_labour rows are
+generated in the same statement from labour_questions_template. Concurrent
+single-row inserts elsewhere still get their labour rows from the trigger.
+Located holders are assigned their nearest available agent before commit.
+
+    python -m census_app.bulk_import holders.csv
+"""
+import argparse
+import io
+
+import pandas as pd
+from sqlalchemy import text
+
+from census_app.agent_index import assign_nearest_agents
+from census_app.config import engine, HOLDERS_TABLE, HOLDING_LABOUR_TABLE
+
+LABOUR_TEMPLATE_TABLE = "labour_questions_template"
+BULK_IMPORT_SETTING = "nacp.bulk_import"
+INTEGER_TYPES = {"smallint", "integer", "bigint"}
+
+# Same defaults the trigger inserts; used to fill labour_questions_template if it is incomplete
+LABOUR_DEFAULT_QUESTIONS = {
+    2: "How many permanent workers including administrative staff were hired on the holding from Aug 1, 2024 to Jul 31, 2025 (excluding household)?",
+    3: "How many temporary workers including administrative staff were hired on the holding from Aug 1, 2024 to Jul 31, 2025 (excluding household)?",
+    4: "What was the number of non-Bahamian workers on the holding from Aug 1, 2024 to Jul 31, 2025?",
+    5: "Did any of your workers have work permits?",
+    6: "Were there any volunteer workers on the holding (i.e. unpaid labourers)?",
+    7: "Did you use any agricultural contracted services (crop protection, pruning, composting, harvesting, animal services, irrigation, farm admin etc.) on the holding?",
+}
+
+# --------------------------------------------------------
+# Schema
+# --------------------------------------------------------
+def ensure_bulk_import_support(conn):
+    """Let the labour trigger stand down inside bulk-import transactions and seed the question template"""
+    # The trigger function is shared with every other insert path; only replace it once
+    patched = conn.execute(text("""
+        SELECT position(:setting in prosrc) > 0 FROM pg_proc
+        WHERE proname = 'create_holding_labour_rows'
+    """), {"setting": BULK_IMPORT_SETTING}).scalar()
+    if not patched:
+        _install_labour_trigger_function(conn)
+
+    for no, question in LABOUR_DEFAULT_QUESTIONS.items():
+        conn.execute(text(f"""
+            INSERT INTO {LABOUR_TEMPLATE_TABLE} (question_no, question_text)
+            SELECT :no, :question
+            WHERE NOT EXISTS (SELECT 1 FROM {LABOUR_TEMPLATE_TABLE} WHERE question_no = :no)
+        """), {"no": no, "question": question})
+
+
+def _install_labour_trigger_function(conn):
+    values = ",\n".join(
+        f"(NEW.holder_id, {no}, '{question.replace(chr(39), chr(39) * 2)}', "
+        + ("0, 0, 0, NULL)" if no <= 4 else "NULL, NULL, NULL, 'Not Applicable')")
+        for no, question in LABOUR_DEFAULT_QUESTIONS.items()
+    )
+    conn.execute(text(f"""
+        CREATE OR REPLACE FUNCTION create_holding_labour_rows() RETURNS trigger AS $$
+        BEGIN
+            -- Bulk imports create labour rows set-based in the same transaction
+            IF current_setting('{BULK_IMPORT_SETTING}', true) = 'on' THEN
+                RETURN NEW;
+            END IF;
+
+            INSERT INTO {HOLDING_LABOUR_TABLE} (
+                holder_id, question_no, question_text, male_count, female_count, total_count, option_response
+            ) VALUES
+            {values};
+            RETURN NEW;
+        END;
+        $$ LANGUAGE plpgsql
+    """))
+
+
+def _holder_columns(conn):
+    rows = conn.execute(text("""
+        SELECT column_name, data_type FROM information_schema.columns
+        WHERE table_name = :table
+    """), {"table": HOLDERS_TABLE}).all()
+    return {row[0]: row[1] for row in rows}
+
+# --------------------------------------------------------
+# Import
+# --------------------------------------------------------
+def bulk_import_holders(df):
+    """Load a DataFrame of holders (columns named as in holders) in one transaction.
+
+    Returns the number of holders inserted. Unknown columns, holder_id and the
+    agent assignment columns are ignored; agents are assigned by location.
+    """
+    if df.empty:
+        return 0
+
+    with engine.begin() as conn:
+        ensure_bulk_import_support(conn)
+        holder_columns = _holder_columns(conn)
+    skipped = {"holder_id", "assigned_agent_id", "agent_review_deadline"}
+    columns = [column for column in df.columns if column in holder_columns and column not in skipped]
+    if not columns:
+        raise ValueError("No columns in the file match the holders table")
+    column_list = ", ".join(columns)
+
+    # Integer columns with blanks are read as floats; COPY rejects "5.0" for an integer
+    data = df[columns].copy()
+    integer_columns = [column for column in columns if holder_columns[column] in INTEGER_TYPES]
+    for column in integer_columns:
+        data[column] = pd.to_numeric(data[column]).astype("Int64")
+    copy_options = "FORMAT csv"
+    if integer_columns:
+        copy_options += f", FORCE_NULL ({', '.join(integer_columns)})"
+
+    buffer = io.StringIO()
+    data.to_csv(buffer, index=False, header=False)
+    buffer.seek(0)
+
+    with engine.begin() as conn:
+        # COPY needs the driver cursor; it shares this transaction with conn
+        cur = conn.connection.cursor()
+        cur.execute(f"SET LOCAL {BULK_IMPORT_SETTING} = 'on'")
+        cur.execute(f"""
+            CREATE TEMP TABLE holders_import_staging ON COMMIT DROP AS
+            SELECT {column_list} FROM {HOLDERS_TABLE} WITH NO DATA
+        """)
+        cur.copy_expert(f"COPY holders_import_staging ({column_list}) FROM STDIN WITH ({copy_options})", buffer)
+        cur.execute(f"""
+            WITH inserted AS (
+                INSERT INTO {HOLDERS_TABLE} ({column_list})
+                SELECT {column_list} FROM holders_import_staging
+                RETURNING holder_id, latitude, longitude
+            ),
+            labour AS (
+                INSERT INTO {HOLDING_LABOUR_TABLE} (
+                    holder_id, question_no, question_text, male_count, female_count, total_count, option_response
+                )
+                SELECT i.holder_id, t.question_no, t.question_text,
+                       CASE WHEN t.question_no <= 4 THEN 0 END,
+                       CASE WHEN t.question_no <= 4 THEN 0 END,
+                       CASE WHEN t.question_no <= 4 THEN 0 END,
+                       CASE WHEN t.question_no >= 5 THEN 'Not Applicable'::labour_option END
+                FROM inserted i
+                CROSS JOIN {LABOUR_TEMPLATE_TABLE} t
+                WHERE t.question_no BETWEEN 2 AND 7
+                ORDER BY i.holder_id, t.question_no
+            )
+            SELECT holder_id, latitude, longitude FROM inserted
+        """)
+        inserted = cur.fetchall()
+        assign_nearest_agents(conn, inserted)
+    return len(inserted)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bulk-load holders from a CSV file")
+    parser.add_argument("csv_file")
+    args = parser.parse_args()
+    print(f"✅ Imported {bulk_import_holders(pd.read_csv(args.csv_file))} holder(s)")
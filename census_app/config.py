@@ -63,6 +63,8 @@ HOUSEHOLD_MEMBERS_TABLE = "household_members"
 HOLDING_LABOUR_TABLE = "holding_labour"
 HOLDING_LABOUR_PERM_TABLE = "holding_labour_permanent"
 HOLDER_SURVEY_PROGRESS_TABLE = "holder_survey_progress"
+AGENT_REMINDER_LOG_TABLE = "agent_reminder_log"
+AGENTS_TABLE = "agents"
 
 # --------------------------------------------------------
 # Roles
@@ -88,6 +90,34 @@ TOTAL_SURVEY_SECTIONS = 5
 # --------------------------------------------------------
 EMAIL_USER = os.getenv("EMAIL_USER", "your_email@example.com")
 EMAIL_PASS = os.getenv("EMAIL_PASS", "")
+SMTP_HOST = os.getenv("SMTP_HOST", "smtp.gmail.com")
+SMTP_PORT = int(os.getenv("SMTP_PORT", 587))
+SMTP_USE_TLS = os.getenv("SMTP_USE_TLS", "1") == "1"
+
+# --------------------------------------------------------
+# Agent Reminders
+# --------------------------------------------------------
+REMINDER_INTERVAL_MINUTES = int(os.getenv("REMINDER_INTERVAL_MINUTES", 60))
+
+# --------------------------------------------------------
+# Agent Assignment
+# --------------------------------------------------------
+DEFAULT_AGENT_CAPACITY = int(os.getenv("DEFAULT_AGENT_CAPACITY", 50))
+AGENT_INDEX_REFRESH_SECONDS = int(os.getenv("AGENT_INDEX_REFRESH_SECONDS", 60))
+
+# --------------------------------------------------------
+# Report Exports
+# --------------------------------------------------------
+EXPORT_DIR = os.getenv("EXPORT_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "exports"))
+EXPORT_WORKERS = int(os.getenv("EXPORT_WORKERS", 2))
+
+# --------------------------------------------------------
+# Analytics Lake
+# --------------------------------------------------------
+LAKE_DIR = os.getenv("LAKE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "lake"))
+LAKE_COMPACT_MIN_FILES = int(os.getenv("LAKE_COMPACT_MIN_FILES", 8))
+# registration_form lives in the registration app's database; leave empty to skip it
+REGISTRATION_DATABASE_URL = os.getenv("REGISTRATION_DATABASE_URL", "")
 
 # --------------------------------------------------------
 # Enumerations & Constants
@@ -0,0 +1,202 @@
+"""
+Pending-holder export jobs.
+
+Exports run in a process pool so ReportLab layout never blocks the dashboard.
+Rows are streamed from the database with a server-side cursor and written out
+as they arrive: CSV line by line, PDF one page-sized table at a time. Workers
+report progress through a small JSON file next to the export.
+"""
+import csv
+import json
+import os
+import threading
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from multiprocessing import get_context
+
+from sqlalchemy import text
+
+from census_app.config import EXPORT_DIR, EXPORT_WORKERS, STATUS_PENDING
+from census_app.helpers import PENDING_HOLDERS_SQL, REVIEW_WINDOW_HOURS, DUE_SOON_HOURS
+
+EXPORT_COLUMNS = ["Holder ID", "Holder", "Agent", "Submitted", "Deadline", "Hours Left", "Urgency"]
+STREAM_BATCH_SIZE = 500
+
+_executor = None
+_executor_lock = threading.Lock()
+_jobs = {}
+
+# --------------------------------------------------------
+# Worker side (runs in the process pool)
+# --------------------------------------------------------
+def _query_params():
+    return {"status": STATUS_PENDING, "window_hours": REVIEW_WINDOW_HOURS, "due_soon_hours": DUE_SOON_HOURS}
+
+
+def _write_progress(progress_path, done, total):
+    tmp_path = f"{progress_path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump({"done": done, "total": total}, f)
+    os.replace(tmp_path, progress_path)
+
+
+def _stream_pending_rows(conn):
+    """Yield batches of pending-holder rows from a server-side cursor"""
+    result = conn.execution_options(stream_results=True, yield_per=STREAM_BATCH_SIZE).execute(
+        text(PENDING_HOLDERS_SQL), _query_params()
+    )
+    for batch in result.partitions():
+        yield batch
+
+
+def _count_pending(conn):
+    return conn.execute(text(f"SELECT COUNT(*) FROM ({PENDING_HOLDERS_SQL}) AS p"), _query_params()).scalar() or 0
+
+
+def _format_cell(value):
+    if value is None:
+        return ""
+    if isinstance(value, datetime):
+        return value.strftime("%Y-%m-%d %H:%M")
+    return str(value)
+
+
+def run_csv_export(path, progress_path):
+    from census_app.config import engine
+
+    with engine.connect() as conn:
+        total = _count_pending(conn)
+        done = 0
+        _write_progress(progress_path, done, total)
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(EXPORT_COLUMNS)
+            for batch in _stream_pending_rows(conn):
+                writer.writerows([_format_cell(v) for v in row] for row in batch)
+                done += len(batch)
+                _write_progress(progress_path, done, total)
+    return path
+
+
+def run_pdf_export(path, progress_path):
+    from census_app.config import engine
+    from reportlab.lib import colors
+    from reportlab.lib.pagesizes import A4, landscape
+    from reportlab.lib.units import cm
+    from reportlab.pdfgen import canvas
+    from reportlab.platypus import Table, TableStyle
+
+    page_width, page_height = landscape(A4)
+    margin = 1.5 * cm
+    table_style = TableStyle([
+        ("BACKGROUND", (0, 0), (-1, 0), colors.HexColor("#2e7d32")),
+        ("TEXTCOLOR", (0, 0), (-1, 0), colors.white),
+        ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
+        ("FONTSIZE", (0, 0), (-1, -1), 8),
+        ("GRID", (0, 0), (-1, -1), 0.25, colors.grey),
+        ("ROWBACKGROUNDS", (0, 1), (-1, -1), [colors.white, colors.HexColor("#f1f8e9")]),
+    ])
+    generated = datetime.now().strftime("%Y-%m-%d %H:%M")
+
+    pdf = canvas.Canvas(path, pagesize=(page_width, page_height))
+    page_number = 0
+
+    # Cells never wrap, so every row is as tall as the header; fit as many as the
+    # space between the title and the bottom margin holds
+    table_width, table_space = page_width - 2 * margin, page_height - 3 * margin
+    probe = Table([EXPORT_COLUMNS, EXPORT_COLUMNS])
+    probe.setStyle(table_style)
+    row_height = probe.wrapOn(pdf, table_width, table_space)[1] / 2
+    rows_per_page = max(int(table_space // row_height) - 1, 1)
+
+    def draw_page(rows):
+        nonlocal page_number
+        page_number += 1
+        pdf.setFont("Helvetica-Bold", 12)
+        pdf.drawString(margin, page_height - margin, f"NACP - Pending Holder Registrations ({REVIEW_WINDOW_HOURS}h review)")
+        pdf.setFont("Helvetica", 8)
+        pdf.drawRightString(page_width - margin, page_height - margin, f"Generated {generated} - page {page_number}")
+        table = Table([EXPORT_COLUMNS] + rows, repeatRows=1)
+        table.setStyle(table_style)
+        _, table_height = table.wrapOn(pdf, table_width, table_space)
+        table.drawOn(pdf, margin, page_height - 2 * margin - table_height)
+        pdf.showPage()
+
+    with engine.connect() as conn:
+        total = _count_pending(conn)
+        done = 0
+        _write_progress(progress_path, done, total)
+        page_rows = []
+        for batch in _stream_pending_rows(conn):
+            for row in batch:
+                page_rows.append([_format_cell(v) for v in row])
+                if len(page_rows) == rows_per_page:
+                    draw_page(page_rows)
+                    page_rows = []
+            done += len(batch)
+            _write_progress(progress_path, done, total)
+        if page_rows or page_number == 0:
+            draw_page(page_rows)
+
+    pdf.save()
+    return path
+
+# --------------------------------------------------------
+# Dashboard side
+# --------------------------------------------------------
+EXPORT_RUNNERS = {
+    "csv": run_csv_export,
+    "pdf": run_pdf_export,
+}
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            # spawn: workers must not inherit the dashboard's threads or pooled DB connections
+            _executor = ProcessPoolExecutor(max_workers=EXPORT_WORKERS, mp_context=get_context("spawn"))
+        return _executor
+
+
+def submit_export(kind):
+    """Queue a pending-holders export ("csv" or "pdf") and return its job id"""
+    os.makedirs(EXPORT_DIR, exist_ok=True)
+    job_id = uuid.uuid4().hex[:12]
+    filename = f"pending_holders_{datetime.now():%Y%m%d_%H%M%S}_{job_id}.{kind}"
+    path = os.path.join(EXPORT_DIR, filename)
+    progress_path = f"{path}.progress"
+
+    future = _get_executor().submit(EXPORT_RUNNERS[kind], path, progress_path)
+    _jobs[job_id] = {
+        "kind": kind,
+        "filename": filename,
+        "path": path,
+        "progress_path": progress_path,
+        "future": future,
+    }
+    return job_id
+
+
+def get_export_status(job_id):
+    """State ("running", "done", "failed"), progress 0-1 and output path of an export job"""
+    job = _jobs.get(job_id)
+    if job is None:
+        return {"state": "missing", "progress": 0.0}
+
+    status = {"kind": job["kind"], "filename": job["filename"], "path": job["path"]}
+    future = job["future"]
+    if future.done():
+        error = future.exception()
+        if error is not None:
+            return {**status, "state": "failed", "progress": 0.0, "error": str(error)}
+        return {**status, "state": "done", "progress": 1.0}
+
+    try:
+        with open(job["progress_path"]) as f:
+            progress = json.load(f)
+        fraction = progress["done"] / progress["total"] if progress["total"] else 0.0
+    except (OSError, ValueError, KeyError):
+        fraction = 0.0
+    return {**status, "state": "running", "progress": min(fraction, 1.0)}
@@ -0,0 +1,92 @@
+import pandas as pd
+from sqlalchemy import text
+
+from census_app.config import engine, HOLDERS_TABLE, USERS_TABLE, STATUS_PENDING
+
+# --------------------------------------------------------
+# Pending Holder Review (24h agent review window)
+# --------------------------------------------------------
+REVIEW_WINDOW_HOURS = 24
+DUE_SOON_HOURS = 6
+
+URGENCY_OVERDUE = "Overdue"
+URGENCY_DUE_SOON = "Due Soon"
+URGENCY_ON_TRACK = "On Track"
+
+URGENCY_STYLES = {
+    URGENCY_OVERDUE: "background-color: #f8d7da; color: #721c24; font-weight: bold",
+    URGENCY_DUE_SOON: "background-color: #fff3cd; color: #856404; font-weight: bold",
+    URGENCY_ON_TRACK: "background-color: #d4edda; color: #155724",
+}
+
+URGENCY_ICONS = {
+    URGENCY_OVERDUE: "🔴",
+    URGENCY_DUE_SOON: "🟠",
+    URGENCY_ON_TRACK: "🟢",
+}
+
+# Holders without an explicit deadline fall back to submitted_at + the review window
+PENDING_HOLDERS_SQL = f"""
+    WITH pending AS (
+        SELECT h.holder_id,
+               h.name,
+               h.submitted_at,
+               COALESCE(h.agent_review_deadline,
+                        h.submitted_at + make_interval(hours => :window_hours)) AS deadline,
+               u.username AS agent
+        FROM {HOLDERS_TABLE} h
+        LEFT JOIN {USERS_TABLE} u ON u.id = h.assigned_agent_id
+        WHERE h.status = :status
+    )
+    SELECT holder_id AS "Holder ID",
+           name AS "Holder",
+           COALESCE(agent, 'Unassigned') AS "Agent",
+           submitted_at AS "Submitted",
+           deadline AS "Deadline",
+           ROUND((EXTRACT(EPOCH FROM (deadline - now()::timestamp)) / 3600)::numeric, 1) AS "Hours Left",
+           CASE
+               WHEN deadline < now()::timestamp THEN '{URGENCY_OVERDUE}'
+               WHEN deadline < now()::timestamp + make_interval(hours => :due_soon_hours) THEN '{URGENCY_DUE_SOON}'
+               ELSE '{URGENCY_ON_TRACK}'
+           END AS "Urgency"
+    FROM pending
+    ORDER BY deadline, holder_id
+"""
+
+_pending_index_ready = False
+
+
+def ensure_pending_holders_index():
+    """Create the (status, agent_review_deadline) index behind the pending summary once per process"""
+    global _pending_index_ready
+    if _pending_index_ready:
+        return
+    with engine.begin() as conn:
+        conn.execute(text(
+            f"CREATE INDEX IF NOT EXISTS idx_holders_status_review_deadline "
+            f"ON {HOLDERS_TABLE} (status, agent_review_deadline)"
+        ))
+    _pending_index_ready = True
+
+
+def get_pending_holders_summary():
+    """Pending holders with their review deadline and urgency bucket, computed in one query"""
+    ensure_pending_holders_index()
+    with engine.connect() as conn:
+        return pd.read_sql(
+            text(PENDING_HOLDERS_SQL),
+            conn,
+            params={
+                "status": STATUS_PENDING,
+                "window_hours": REVIEW_WINDOW_HOURS,
+                "due_soon_hours": DUE_SOON_HOURS,
+            },
+        )
+
+
+def style_pending_holders(df_pending):
+    """Render the Urgency column as coloured badges in a single vectorized pass"""
+    df_display = df_pending.copy()
+    df_display["Urgency"] = df_display["Urgency"].map(URGENCY_ICONS).fillna("") + " " + df_display["Urgency"]
+    styles = df_pending["Urgency"].map(URGENCY_STYLES).fillna("")
+    return df_display.style.apply(lambda _: styles.values, subset=["Urgency"])
@@ -0,0 +1,177 @@
+"""
+Household roster editing.
+
+An enumerator edits every member of a holding in one grid. On save the grid is
+diffed against the stored roster and the differences are written in a single
+transaction of at most three statements: one DELETE over an id array, one
+UPDATE joined to unnested value arrays and one batched INSERT, instead of a
+round trip per member. The household_summary statement triggers therefore
+recompute the holding at most once per kind of change, not once per member.
+"""
+import pandas as pd
+from sqlalchemy import text
+
+from census_app.config import (
+    engine, HOUSEHOLD_MEMBERS_TABLE,
+    RELATIONSHIP_OPTIONS, SEX_OPTIONS, EDUCATION_OPTIONS, OCCUPATION_OPTIONS, WORKING_TIME_OPTIONS,
+)
+from census_app.household_summary import ensure_household_summary_ready
+
+ROSTER_COLUMNS = [
+    "holder_number", "relationship", "sex", "age", "education",
+    "primary_occupation", "secondary_occupation", "working_time",
+]
+
+ROSTER_OPTIONS = {
+    "relationship": RELATIONSHIP_OPTIONS,
+    "sex": SEX_OPTIONS,
+    "education": EDUCATION_OPTIONS,
+    "primary_occupation": OCCUPATION_OPTIONS,
+    "secondary_occupation": OCCUPATION_OPTIONS,
+    "working_time": WORKING_TIME_OPTIONS,
+}
+
+INTEGER_COLUMNS = {"holder_number", "age"}
+
+MAX_HOLDER_NUMBER = 3
+MAX_AGE = 120
+
+# --------------------------------------------------------
+# Load
+# --------------------------------------------------------
+def load_roster(farm_id):
+    """All members of a holding, one row per member, with their id for diffing"""
+    with engine.connect() as conn:
+        return pd.read_sql(
+            text(f"""
+                SELECT id, {", ".join(ROSTER_COLUMNS)}
+                FROM {HOUSEHOLD_MEMBERS_TABLE}
+                WHERE farm_id = :farm_id
+                ORDER BY holder_number, id
+            """),
+            conn,
+            params={"farm_id": farm_id},
+        )
+
+# --------------------------------------------------------
+# Diff
+# --------------------------------------------------------
+def _clean_row(row):
+    values = {}
+    for column in ROSTER_COLUMNS:
+        value = row.get(column)
+        values[column] = None if pd.isna(value) or value == "" else value
+    return values
+
+
+def validate_roster(edited):
+    """List of error messages for incomplete or out-of-range grid rows (1-based row numbers)"""
+    errors = []
+    for position, (_, row) in enumerate(edited.iterrows(), start=1):
+        values = _clean_row(row)
+        missing = [column for column, value in values.items() if value is None]
+        if missing:
+            errors.append(f"Row {position}: missing {', '.join(missing)}")
+            continue
+        for column, options in ROSTER_OPTIONS.items():
+            if values[column] not in options:
+                errors.append(f"Row {position}: invalid {column} '{values[column]}'")
+        if not 1 <= int(values["holder_number"]) <= MAX_HOLDER_NUMBER:
+            errors.append(f"Row {position}: holder number must be 1-{MAX_HOLDER_NUMBER}")
+        if not 0 <= int(values["age"]) <= MAX_AGE:
+            errors.append(f"Row {position}: age must be 0-{MAX_AGE}")
+    return errors
+
+
+def diff_roster(stored, edited):
+    """(inserts, updates, deletes) turning the stored roster into the edited grid.
+
+    Rows without an id are new; stored ids missing from the grid, or whose row was
+    cleared completely, are deleted; rows whose values changed are updated.
+    Completely empty new rows are ignored.
+    """
+    stored_rows = {int(row["id"]): _clean_row(row) for _, row in stored.iterrows()}
+
+    inserts, updates = [], []
+    kept_ids = set()
+    for _, row in edited.iterrows():
+        values = _clean_row(row)
+        member_id = row.get("id")
+        if pd.isna(member_id):
+            if any(value is not None for value in values.values()):
+                inserts.append(values)
+            continue
+        member_id = int(member_id)
+        if all(value is None for value in values.values()):
+            continue
+        kept_ids.add(member_id)
+        if member_id in stored_rows and values != stored_rows[member_id]:
+            updates.append({"id": member_id, **values})
+
+    deletes = [{"id": member_id} for member_id in stored_rows if member_id not in kept_ids]
+    return inserts, updates, deletes
+
+# --------------------------------------------------------
+# Save
+# --------------------------------------------------------
+def save_roster(farm_id, edited):
+    """Sync the edited grid to household_members in one transaction.
+
+    Returns a dict of inserted / updated / deleted counts. Raises ValueError with
+    the validation messages when the grid has incomplete or invalid rows.
+    """
+    errors = validate_roster(edited.dropna(how="all", subset=ROSTER_COLUMNS))
+    if errors:
+        raise ValueError("\n".join(errors))
+
+    # household_summary follows household_members only once its triggers exist
+    ensure_household_summary_ready()
+    with engine.begin() as conn:
+        stored = pd.read_sql(
+            text(f"""
+                SELECT id, {", ".join(ROSTER_COLUMNS)}
+                FROM {HOUSEHOLD_MEMBERS_TABLE}
+                WHERE farm_id = :farm_id
+                FOR UPDATE
+            """),
+            conn,
+            params={"farm_id": farm_id},
+        )
+        inserts, updates, deletes = diff_roster(stored, edited)
+
+        for params in inserts + updates:
+            params["farm_id"] = farm_id
+            for column in INTEGER_COLUMNS:
+                params[column] = int(params[column])
+
+        if deletes:
+            conn.execute(
+                text(f"DELETE FROM {HOUSEHOLD_MEMBERS_TABLE} WHERE id = ANY(:ids) AND farm_id = :farm_id"),
+                {"ids": [params["id"] for params in deletes], "farm_id": farm_id}
+            )
+        if updates:
+            # One statement for every changed member: the new values arrive as parallel arrays
+            columns = ["id"] + ROSTER_COLUMNS
+            arrays = ", ".join(
+                f"CAST(:{column} AS {'integer' if column in {'id'} | INTEGER_COLUMNS else 'text'}[])"
+                for column in columns
+            )
+            assignments = ", ".join(f"{column} = v.{column}" for column in ROSTER_COLUMNS)
+            conn.execute(
+                text(f"""
+                    UPDATE {HOUSEHOLD_MEMBERS_TABLE} m SET {assignments}
+                    FROM unnest({arrays}) AS v({", ".join(columns)})
+                    WHERE m.id = v.id AND m.farm_id = :farm_id
+                """),
+                {**{column: [params[column] for params in updates] for column in columns}, "farm_id": farm_id}
+            )
+        if inserts:
+            conn.execute(
+                text(f"""
+                    INSERT INTO {HOUSEHOLD_MEMBERS_TABLE} (farm_id, {", ".join(ROSTER_COLUMNS)})
+                    VALUES (:farm_id, {", ".join(f":{column}" for column in ROSTER_COLUMNS)})
+                """),
+                inserts
+            )
+
+    return {"inserted": len(inserts), "updated": len(updates), "deleted": len(deletes)}
@@ -0,0 +1,177 @@
+"""
+household_summary maintenance.
+
+household_summary rows are derived from household_members. Statement-level
+triggers with transition tables collect the farm ids touched by each
+INSERT / UPDATE / DELETE statement and recompute only those households in one
+grouped aggregate, so a bulk load of members costs one recompute per statement
+rather than per row. The triggers are installed on first use (roster saves call
+ensure_household_summary_ready); the CLI rebuilds every summary on demand.
+
+    python -m census_app.household_summary rebuild
+"""
+import argparse
+
+from sqlalchemy import text
+
+from census_app.config import engine, HOUSEHOLD_MEMBERS_TABLE
+
+HOUSEHOLD_SUMMARY_TABLE = "household_summary"
+
+# household_members.working_time: N = not working, F / P* = full or part time on the holding
+NOT_WORKING = "N"
+
+# Household members work on the family holding, so they are counted as unpaid;
+# the *_paid columns are left as entered. household_summary is unique on
+# (holdings_id, holder_number), which the upsert relies on. The person counters
+# on holders are not touched: holders has no holder_number to match a household
+# member to, and every holder shares the default farm_id.
+RECOMPUTE_FUNCTION_SQL = f"""
+CREATE OR REPLACE FUNCTION recompute_household_summaries(farm_ids integer[]) RETURNS void AS $$
+BEGIN
+    CREATE TEMP TABLE IF NOT EXISTS household_summary_agg (
+        farm_id integer,
+        holder_number integer,
+        total_persons integer,
+        under_14_male integer,
+        under_14_female integer,
+        over_14_male integer,
+        over_14_female integer,
+        working_male integer,
+        working_female integer
+    ) ON COMMIT DROP;
+    TRUNCATE household_summary_agg;
+
+    INSERT INTO household_summary_agg
+    SELECT farm_id, holder_number,
+           COUNT(*),
+           COUNT(*) FILTER (WHERE sex = 'Male' AND age < 14),
+           COUNT(*) FILTER (WHERE sex = 'Female' AND age < 14),
+           COUNT(*) FILTER (WHERE sex = 'Male' AND age >= 14),
+           COUNT(*) FILTER (WHERE sex = 'Female' AND age >= 14),
+           COUNT(*) FILTER (WHERE sex = 'Male' AND working_time <> '{NOT_WORKING}'),
+           COUNT(*) FILTER (WHERE sex = 'Female' AND working_time <> '{NOT_WORKING}')
+    FROM {HOUSEHOLD_MEMBERS_TABLE}
+    WHERE farm_ids IS NULL OR farm_id = ANY(farm_ids)
+    GROUP BY farm_id, holder_number;
+
+    INSERT INTO {HOUSEHOLD_SUMMARY_TABLE} (
+        holdings_id, holder_number, total_persons,
+        persons_under_14_male, persons_under_14_female, persons_14plus_male, persons_14plus_female,
+        persons_working_male_paid, persons_working_male_unpaid,
+        persons_working_female_paid, persons_working_female_unpaid
+    )
+    SELECT a.farm_id, a.holder_number, a.total_persons,
+           a.under_14_male, a.under_14_female, a.over_14_male, a.over_14_female,
+           0, a.working_male, 0, a.working_female
+    FROM household_summary_agg a
+    -- household_summary.holdings_id references holdings; members of unknown farms are skipped
+    WHERE EXISTS (SELECT 1 FROM holdings ho WHERE ho.id = a.farm_id)
+    ON CONFLICT (holdings_id, holder_number) DO UPDATE
+    SET total_persons = EXCLUDED.total_persons,
+        persons_under_14_male = EXCLUDED.persons_under_14_male,
+        persons_under_14_female = EXCLUDED.persons_under_14_female,
+        persons_14plus_male = EXCLUDED.persons_14plus_male,
+        persons_14plus_female = EXCLUDED.persons_14plus_female,
+        persons_working_male_unpaid = EXCLUDED.persons_working_male_unpaid,
+        persons_working_female_unpaid = EXCLUDED.persons_working_female_unpaid;
+
+    -- Households whose last member was removed
+    UPDATE {HOUSEHOLD_SUMMARY_TABLE} s
+    SET total_persons = 0,
+        persons_under_14_male = 0, persons_under_14_female = 0,
+        persons_14plus_male = 0, persons_14plus_female = 0,
+        persons_working_male_unpaid = 0, persons_working_female_unpaid = 0
+    WHERE (farm_ids IS NULL OR s.holdings_id = ANY(farm_ids))
+      AND NOT EXISTS (
+          SELECT 1 FROM household_summary_agg a
+          WHERE a.farm_id = s.holdings_id AND a.holder_number = s.holder_number
+      );
+END;
+$$ LANGUAGE plpgsql
+"""
+
+# One trigger per event: PostgreSQL only allows transition tables on single-event triggers
+TRIGGER_FUNCTIONS = {
+    "INSERT": ("household_members_after_insert", "REFERENCING NEW TABLE AS new_rows",
+               "SELECT farm_id FROM new_rows"),
+    "UPDATE": ("household_members_after_update", "REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows",
+               "SELECT farm_id FROM old_rows UNION SELECT farm_id FROM new_rows"),
+    "DELETE": ("household_members_after_delete", "REFERENCING OLD TABLE AS old_rows",
+               "SELECT farm_id FROM old_rows"),
+}
+
+# --------------------------------------------------------
+# Setup
+# --------------------------------------------------------
+def ensure_household_summary_triggers(conn):
+    """Install the recompute function and any missing triggers; returns True if a trigger was added"""
+    conn.execute(text(RECOMPUTE_FUNCTION_SQL))
+    # Creating a trigger locks household_members against writes, so only add the missing ones
+    existing = {row[0] for row in conn.execute(text(
+        "SELECT tgname FROM pg_trigger WHERE tgrelid = to_regclass(:table)"
+    ), {"table": HOUSEHOLD_MEMBERS_TABLE}).all()}
+    created = False
+    for event, (function_name, referencing, farm_ids_sql) in TRIGGER_FUNCTIONS.items():
+        conn.execute(text(f"""
+            CREATE OR REPLACE FUNCTION {function_name}() RETURNS trigger AS $$
+            BEGIN
+                PERFORM recompute_household_summaries(ARRAY(SELECT DISTINCT farm_id FROM ({farm_ids_sql}) changed));
+                RETURN NULL;
+            END;
+            $$ LANGUAGE plpgsql
+        """))
+        if f"trg_{function_name}" in existing:
+            continue
+        conn.execute(text(f"""
+            CREATE TRIGGER trg_{function_name}
+            AFTER {event} ON {HOUSEHOLD_MEMBERS_TABLE}
+            {referencing}
+            FOR EACH STATEMENT EXECUTE FUNCTION {function_name}()
+        """))
+        created = True
+    conn.execute(text(
+        f"CREATE INDEX IF NOT EXISTS idx_household_members_farm ON {HOUSEHOLD_MEMBERS_TABLE} (farm_id, holder_number)"
+    ))
+    return created
+
+
+_triggers_ready = False
+
+
+def ensure_household_summary_ready():
+    """Install the triggers once per process before household_members is written.
+
+    When a trigger had to be added, earlier member changes were not tracked, so
+    every summary is rebuilt in the same transaction.
+    """
+    global _triggers_ready
+    if not _triggers_ready:
+        with engine.begin() as conn:
+            if ensure_household_summary_triggers(conn):
+                conn.execute(text("SELECT recompute_household_summaries(NULL)"))
+        _triggers_ready = True
+
+# --------------------------------------------------------
+# Maintenance API
+# --------------------------------------------------------
+def recompute_households(farm_ids):
+    """Recompute the summaries of specific farms (normally done by the triggers)"""
+    ensure_household_summary_ready()
+    with engine.begin() as conn:
+        conn.execute(text("SELECT recompute_household_summaries(CAST(:ids AS integer[]))"), {"ids": list(farm_ids)})
+
+
+def rebuild_household_summaries():
+    """Install the triggers and rebuild every summary with one grouped aggregate"""
+    with engine.begin() as conn:
+        ensure_household_summary_triggers(conn)
+        conn.execute(text("SELECT recompute_household_summaries(NULL)"))
+        return conn.execute(text(f"SELECT COUNT(*) FROM {HOUSEHOLD_SUMMARY_TABLE}")).scalar()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Maintain household_summary from household_members")
+    parser.add_argument("command", choices=["rebuild"])
+    args = parser.parse_args()
+    print(f"✅ Rebuilt {rebuild_household_summaries()} household summaries")
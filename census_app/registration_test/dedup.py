@@ -0,0 +1,195 @@
+# dedup.py - Duplicate registration detection
+#
+# Candidate pairs come only from shared blocking keys (normalised cell, email,
+# island + last name), so the batch scan stays near-linear in the table size.
+# Each candidate pair is then scored on fuzzy name and address similarity.
+
+import re
+from difflib import SequenceMatcher
+from sqlalchemy import text
+
+from validation import normalize_phone, normalize_email
+
+# =============================
+# SETTINGS
+# =============================
+# Identical name and address alone (0.75) pass; so does a near-identical name
+# plus a shared cell or email. A shared contact with a different name does not.
+MATCH_THRESHOLD = 0.65
+
+# Blocks larger than this (e.g. a shared office email) produce too many pairs to be useful
+MAX_BLOCK_SIZE = 50
+
+WEIGHTS = {
+    "name": 0.45,
+    "address": 0.30,
+    "cell": 0.15,
+    "email": 0.10,
+}
+
+DEDUP_COLUMNS = "id, first_name, last_name, email, cell, island, settlement, street_address, confirmed, created_at"
+
+_NON_DIGITS = re.compile(r"\D")
+_NON_WORD = re.compile(r"[^a-z0-9 ]+")
+_SPACES = re.compile(r"\s+")
+
+# =============================
+# NORMALISATION
+# =============================
+def normalize_cell(cell):
+    """E.164 form of a cell number; bare digits for numbers that are not Bahamian"""
+    return normalize_phone(cell) or _NON_DIGITS.sub("", cell or "") or None
+
+def normalize_text(value):
+    value = _NON_WORD.sub(" ", (value or "").lower())
+    return _SPACES.sub(" ", value).strip()
+
+def blocking_keys(row):
+    """Keys under which two registrations could plausibly be the same farmer"""
+    keys = []
+    cell = normalize_cell(row.get("cell"))
+    if cell:
+        keys.append(("cell", cell))
+    email = normalize_email(row.get("email"))
+    if email:
+        keys.append(("email", email))
+    last_name = normalize_text(row.get("last_name"))
+    island = normalize_text(row.get("island"))
+    if last_name and island:
+        keys.append(("island_last_name", island, last_name))
+    return keys
+
+# =============================
+# PAIR SCORING
+# =============================
+def _similarity(a, b):
+    if not a or not b:
+        return 0.0
+    return SequenceMatcher(None, a, b).ratio()
+
+def score_pair(a, b):
+    """Score how likely two registrations are the same farmer (0-1) and say why"""
+    name_a = normalize_text(f"{a.get('first_name', '')} {a.get('last_name', '')}")
+    name_b = normalize_text(f"{b.get('first_name', '')} {b.get('last_name', '')}")
+    address_a = normalize_text(f"{a.get('street_address', '')} {a.get('settlement', '')}")
+    address_b = normalize_text(f"{b.get('street_address', '')} {b.get('settlement', '')}")
+
+    name_score = _similarity(name_a, name_b)
+    address_score = _similarity(address_a, address_b)
+    cell_match = bool(normalize_cell(a.get("cell"))) and normalize_cell(a.get("cell")) == normalize_cell(b.get("cell"))
+    email_match = bool(normalize_email(a.get("email"))) and normalize_email(a.get("email")) == normalize_email(b.get("email"))
+
+    score = (
+        WEIGHTS["name"] * name_score
+        + WEIGHTS["address"] * address_score
+        + WEIGHTS["cell"] * cell_match
+        + WEIGHTS["email"] * email_match
+    )
+
+    reasons = []
+    if cell_match:
+        reasons.append("same cell")
+    if email_match:
+        reasons.append("same email")
+    if name_score >= 0.85:
+        reasons.append(f"similar name ({name_score:.0%})")
+    if address_score >= 0.8:
+        reasons.append(f"similar address ({address_score:.0%})")
+
+    return round(score, 3), reasons
+
+def candidate_pairs(rows, max_block_size=MAX_BLOCK_SIZE):
+    """Yield each unordered (row_a, row_b) pair that shares at least one blocking key once"""
+    blocks = {}
+    for row in rows:
+        for key in blocking_keys(row):
+            blocks.setdefault(key, []).append(row)
+
+    seen = set()
+    for block in blocks.values():
+        if len(block) < 2 or len(block) > max_block_size:
+            continue
+        for i in range(len(block)):
+            for j in range(i + 1, len(block)):
+                a, b = block[i], block[j]
+                pair = (min(a["id"], b["id"]), max(a["id"], b["id"]))
+                if pair in seen:
+                    continue
+                seen.add(pair)
+                yield a, b
+
+def merge_suggestion(a, b, score, reasons):
+    """Suggest keeping the confirmed (or else older) registration of a duplicate pair"""
+    keep, drop = sorted((a, b), key=lambda r: (not r.get("confirmed"), r["id"]))
+    return {
+        "keep_id": keep["id"],
+        "drop_id": drop["id"],
+        "keep": keep,
+        "drop": drop,
+        "score": score,
+        "reasons": reasons
+    }
+
+def find_duplicates(rows, threshold=MATCH_THRESHOLD):
+    """Batch scan: merge suggestions for every likely duplicate pair, best first"""
+    suggestions = []
+    for a, b in candidate_pairs(rows):
+        score, reasons = score_pair(a, b)
+        if score >= threshold:
+            suggestions.append(merge_suggestion(a, b, score, reasons))
+    suggestions.sort(key=lambda s: s["score"], reverse=True)
+    return suggestions
+
+# =============================
+# DATABASE ACCESS
+# =============================
+def ensure_dedup_indexes(engine):
+    """Indexes backing the submit-time lookup by email, cell and (island, last name)"""
+    with engine.begin() as conn:
+        conn.execute(text("CREATE INDEX IF NOT EXISTS idx_registration_form_email_lower ON registration_form (lower(email))"))
+        conn.execute(text("CREATE INDEX IF NOT EXISTS idx_registration_form_cell ON registration_form (cell)"))
+        conn.execute(text("CREATE INDEX IF NOT EXISTS idx_registration_form_island_last_name ON registration_form (lower(island), lower(last_name))"))
+
+def load_dedup_rows(engine):
+    """Load only the columns the duplicate scan needs"""
+    with engine.begin() as conn:
+        result = conn.execute(text(f"SELECT {DEDUP_COLUMNS} FROM registration_form"))
+        return [dict(row) for row in result.mappings()]
+
+def scan_for_duplicates(engine, threshold=MATCH_THRESHOLD):
+    """Run the batch duplicate scan over the whole registration_form table"""
+    return find_duplicates(load_dedup_rows(engine), threshold)
+
+def find_matches_for(engine, candidate, threshold=MATCH_THRESHOLD, exclude_id=None):
+    """Online check: existing registrations that look like the same farmer as candidate.
+
+    Exact email / cell hits are ranked ahead of the (island, last name) block
+    before the limit, so a common surname cannot push them out.
+    """
+    result_rows = []
+    with engine.begin() as conn:
+        result = conn.execute(text(f"""
+            SELECT {DEDUP_COLUMNS} FROM registration_form
+            WHERE lower(email) = :email
+               OR cell = :cell
+               OR (lower(island) = :island AND lower(last_name) = :last_name)
+            ORDER BY CASE WHEN lower(email) = :email OR cell = :cell THEN 0 ELSE 1 END, id DESC
+            LIMIT :limit
+        """), {
+            "email": normalize_email(candidate.get("email")),
+            "cell": normalize_cell(candidate.get("cell")),
+            "island": (candidate.get("island") or "").lower() or None,
+            "last_name": (candidate.get("last_name") or "").strip().lower() or None,
+            "limit": MAX_BLOCK_SIZE
+        })
+        result_rows = [dict(row) for row in result.mappings()]
+
+    matches = []
+    for row in result_rows:
+        if exclude_id is not None and row["id"] == exclude_id:
+            continue
+        score, reasons = score_pair(candidate, row)
+        if score >= threshold:
+            matches.append({"registration": row, "score": score, "reasons": reasons})
+    matches.sort(key=lambda m: m["score"], reverse=True)
+    return matches
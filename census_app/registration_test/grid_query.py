@@ -0,0 +1,190 @@
+# grid_query.py - Translate AgGrid sort/filter/paging state into SQL on registration_form
+#
+# The admin registrations grid only ever holds one page of rows. Sorting and
+# filtering happen in the database; the grid state is read back from AgGrid and
+# turned into a whitelisted WHERE / ORDER BY / LIMIT query here.
+
+from datetime import datetime, timedelta
+from sqlalchemy import text
+
+# =============================
+# GRID COLUMNS
+# =============================
+# field -> (header, filter type); the field doubles as the SQL column name
+GRID_COLUMNS = {
+    "id": ("ID", "number"),
+    "first_name": ("First Name", "text"),
+    "last_name": ("Last Name", "text"),
+    "email": ("Email", "text"),
+    "cell": ("Cell", "text"),
+    "island": ("Island", "text"),
+    "settlement": ("Settlement", "text"),
+    "confirmed": ("Confirmed", None),
+    "location_source": ("Source", "text"),
+    "created_at": ("Created", "date"),
+}
+
+DEFAULT_ORDER_BY = "id DESC"
+
+TEXT_OPERATORS = {
+    "contains": ("LOWER({col}) LIKE :{p} ESCAPE '\\'", "%{v}%"),
+    "notContains": ("LOWER({col}) NOT LIKE :{p} ESCAPE '\\'", "%{v}%"),
+    "equals": ("LOWER({col}) = :{p}", "{raw}"),
+    "notEqual": ("LOWER({col}) <> :{p}", "{raw}"),
+    "startsWith": ("LOWER({col}) LIKE :{p} ESCAPE '\\'", "{v}%"),
+    "endsWith": ("LOWER({col}) LIKE :{p} ESCAPE '\\'", "%{v}"),
+}
+
+COMPARISON_OPERATORS = {
+    "equals": "=",
+    "notEqual": "<>",
+    "lessThan": "<",
+    "lessThanOrEqual": "<=",
+    "greaterThan": ">",
+    "greaterThanOrEqual": ">=",
+}
+
+# =============================
+# FILTER TRANSLATION
+# =============================
+def _escape_like(value):
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+def _parse_date(value):
+    """AgGrid sends dates as 'YYYY-MM-DD HH:MM:SS'"""
+    if not value:
+        return None
+    try:
+        return datetime.strptime(str(value)[:10], "%Y-%m-%d")
+    except ValueError:
+        return None
+
+def _condition_sql(col, filter_type, condition, params):
+    """Translate one AgGrid filter condition into SQL, or None if unsupported"""
+    op = condition.get("type")
+    p = f"p{len(params)}"
+
+    if op == "blank":
+        return f"{col} IS NULL" if filter_type != "text" else f"({col} IS NULL OR {col} = '')"
+    if op == "notBlank":
+        return f"{col} IS NOT NULL" if filter_type != "text" else f"({col} IS NOT NULL AND {col} <> '')"
+
+    if filter_type == "text":
+        value = condition.get("filter")
+        if value is None or op not in TEXT_OPERATORS:
+            return None
+        sql, pattern = TEXT_OPERATORS[op]
+        raw = str(value).lower()
+        params[p] = pattern.format(v=_escape_like(raw), raw=raw)
+        return sql.format(col=col, p=p)
+
+    if filter_type == "number":
+        try:
+            value = float(condition.get("filter"))
+        except (TypeError, ValueError):
+            return None
+        if op == "inRange":
+            try:
+                value_to = float(condition.get("filterTo"))
+            except (TypeError, ValueError):
+                return None
+            params[p] = value
+            params[f"{p}_to"] = value_to
+            return f"{col} BETWEEN :{p} AND :{p}_to"
+        if op not in COMPARISON_OPERATORS:
+            return None
+        params[p] = value
+        return f"{col} {COMPARISON_OPERATORS[op]} :{p}"
+
+    if filter_type == "date":
+        date_from = _parse_date(condition.get("dateFrom"))
+        if date_from is None:
+            return None
+        next_day = date_from + timedelta(days=1)
+        if op == "equals":
+            params[p], params[f"{p}_to"] = date_from, next_day
+            return f"({col} >= :{p} AND {col} < :{p}_to)"
+        if op == "notEqual":
+            params[p], params[f"{p}_to"] = date_from, next_day
+            return f"({col} < :{p} OR {col} >= :{p}_to)"
+        if op == "lessThan":
+            params[p] = date_from
+            return f"{col} < :{p}"
+        if op == "greaterThan":
+            params[p] = next_day
+            return f"{col} >= :{p}"
+        if op == "inRange":
+            date_to = _parse_date(condition.get("dateTo"))
+            if date_to is None:
+                return None
+            params[p], params[f"{p}_to"] = date_from, date_to + timedelta(days=1)
+            return f"({col} >= :{p} AND {col} < :{p}_to)"
+
+    return None
+
+def build_where_clause(filter_model):
+    """Build a WHERE clause and bind params from an AgGrid filter model"""
+    params = {}
+    clauses = []
+
+    for col, column_filter in (filter_model or {}).items():
+        if col not in GRID_COLUMNS or not GRID_COLUMNS[col][1]:
+            continue
+        filter_type = GRID_COLUMNS[col][1]
+
+        if "conditions" in column_filter:
+            # Two conditions joined with AND / OR in the column filter popup
+            joiner = " OR " if column_filter.get("operator") == "OR" else " AND "
+            parts = [_condition_sql(col, filter_type, c, params) for c in column_filter["conditions"]]
+            parts = [part for part in parts if part]
+            if parts:
+                clauses.append("(" + joiner.join(parts) + ")")
+        else:
+            part = _condition_sql(col, filter_type, column_filter, params)
+            if part:
+                clauses.append(part)
+
+    where_sql = ("WHERE " + " AND ".join(clauses)) if clauses else ""
+    return where_sql, params
+
+def build_order_by(sort_model):
+    """Build an ORDER BY clause from an AgGrid sort model"""
+    parts = []
+    for sort in sort_model or []:
+        col = sort.get("colId")
+        direction = "DESC" if sort.get("sort") == "desc" else "ASC"
+        if col in GRID_COLUMNS:
+            parts.append(f"{col} {direction}")
+    if not any(part.startswith("id ") for part in parts):
+        # Stable paging needs a unique tie-breaker
+        parts.append(DEFAULT_ORDER_BY)
+    return "ORDER BY " + ", ".join(parts)
+
+def grid_state_models(grid_state):
+    """Pull the (filter model, sort model) pair out of an AgGrid grid state"""
+    grid_state = grid_state or {}
+    filter_model = (grid_state.get("filter") or {}).get("filterModel") or {}
+    sort_model = (grid_state.get("sort") or {}).get("sortModel") or []
+    return filter_model, sort_model
+
+# =============================
+# PAGE QUERY
+# =============================
+def count_registrations(engine, filter_model):
+    """Count the rows matching the grid filters"""
+    where_sql, params = build_where_clause(filter_model)
+    with engine.begin() as conn:
+        return conn.execute(text(f"SELECT COUNT(*) FROM registration_form {where_sql}"), params).scalar() or 0
+
+def fetch_registrations_page(engine, filter_model, sort_model, page, page_size):
+    """Fetch one page of grid rows matching the filters, in grid sort order"""
+    where_sql, params = build_where_clause(filter_model)
+    order_sql = build_order_by(sort_model)
+    columns = ", ".join(GRID_COLUMNS.keys())
+
+    with engine.begin() as conn:
+        result = conn.execute(
+            text(f"SELECT {columns} FROM registration_form {where_sql} {order_sql} LIMIT :limit OFFSET :offset"),
+            {**params, "limit": page_size, "offset": max(page - 1, 0) * page_size}
+        )
+        return [dict(row) for row in result.mappings()]
@@ -1,20 +1,39 @@
 # main_app.py - NACP Bahamas Complete Application
 # Complete self-contained version with all features
 
+#
+# Heavy dependencies (pandas, folium, streamlit_folium, st_aggrid, requests and
+# the numpy-based scheduling / routing modules) are imported inside the
+# functions that use them, and the database is connected only for pages that
+# need it, so the landing page renders without paying for either.
+
 import os
 import streamlit as st
-import pandas as pd
-from sqlalchemy import text, create_engine
+from sqlalchemy import text, create_engine, bindparam
 from sqlalchemy.exc import SQLAlchemyError
-import requests
+from streamlit.errors import StreamlitAPIException
 import re
 import time
 import json
-import folium
-from streamlit_folium import folium_static, st_folium
 import math
+import threading
 from datetime import datetime, timedelta
 import io
+import hashlib
+from search import ensure_search_index, search_registrations
+from grid_query import GRID_COLUMNS, count_registrations, fetch_registrations_page, grid_state_models
+from validation import format_phone_number, validate_phone_number, validate_email, normalize_phone, normalize_email, backfill_contact_columns
+from dedup import MATCH_THRESHOLD, ensure_dedup_indexes, find_duplicates, find_matches_for, scan_for_duplicates, score_pair
+
+# =============================
+# STREAMLIT PAGE CONFIG
+# =============================
+st.set_page_config(
+    page_title="NACP Bahamas", 
+    layout="wide",
+    page_icon="🌾",
+    initial_sidebar_state="collapsed"
+)
 
 # =============================
 # DATABASE CONNECTION WITH RENDER POSTGRESQL
@@ -61,18 +80,17 @@ def get_database_connection():
     st.error("❌ All database connection attempts failed. Using in-memory storage.")
     return None, "memory"
 
-# Initialize database connection
-engine, db_type = get_database_connection()
+# Connected lazily by connect_database() for pages that use the database
+engine = None
+db_type = "memory"
 
-# =============================
-# STREAMLIT PAGE CONFIG
-# =============================
-st.set_page_config(
-    page_title="NACP Bahamas", 
-    layout="wide",
-    page_icon="🌾",
-    initial_sidebar_state="collapsed"
-)
+# Pages that render without touching the database
+PAGES_WITHOUT_DATABASE = {"landing", "admin_login"}
+
+def connect_database():
+    """Bind the module-level engine for this script run (the connection itself is cached per process)"""
+    global engine, db_type
+    engine, db_type = get_database_connection()
 
 # =============================
 # SESSION STATE DEFAULTS
@@ -89,6 +107,7 @@ for key, default in {
     "gps_accuracy": None,
     "address_components": {},
     "map_counter": 0,
+    "map_last_click": None,
     "formatted_cell": "",
     "formatted_tel": "",
     "location_source": None,
@@ -100,6 +119,8 @@ for key, default in {
     "map_click_lon": None,
     "manual_coordinates": False,
     "selected_registrations": [],
+    "registrations_grid_state": None,
+    "registrations_grid_page": 1,
     "manual_settlement": "",
     "edit_mode": False,
     "registration_confirmed": False,
@@ -183,38 +204,6 @@ def format_array_for_display(data):
         return ", ".join(str(item) for item in array_data)
     return "None"
 
-def format_phone_number(phone_str):
-    """Format phone number as (242) XXX-XXXX"""
-    if not phone_str:
-        return ""
-    digits = re.sub(r'\D', '', phone_str)
-    if len(digits) == 7:
-        return f"(242) {digits[:3]}-{digits[3:]}"
-    elif len(digits) == 10:
-        return f"({digits[:3]}) {digits[3:6]}-{digits[6:]}"
-    elif len(digits) == 11 and digits[0] == '1':
-        return f"+1 ({digits[1:4]}) {digits[4:7]}-{digits[7:]}"
-    else:
-        return digits
-
-def validate_phone_number(phone_str):
-    """Validate Bahamian phone number format"""
-    if not phone_str:
-        return False
-    digits = re.sub(r'\D', '', phone_str)
-    if len(digits) == 7:
-        return True
-    elif len(digits) == 10 and digits[:3] == '242':
-        return True
-    elif len(digits) == 11 and digits[0] == '1' and digits[1:4] == '242':
-        return True
-    return False
-
-def validate_email(email):
-    """Validate email format"""
-    pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
-    return re.match(pattern, email) is not None
-
 def get_island_zoom_level(island):
     """Get appropriate zoom level for each island"""
     zoom_levels = {
@@ -226,20 +215,66 @@ def get_island_zoom_level(island):
     }
     return zoom_levels.get(island, 10)
 
+# =============================
+# MAP TILE CACHE
+# =============================
+# NACP_TILE_URL is the tile URL template browsers load from: an already running
+# tile cache (e.g. a field laptop running `python tile_cache.py`) or a reverse-proxy
+# path. NACP_TILE_PORT starts the cache inside this process, to sit behind that URL.
+# Without NACP_TILE_URL the maps use OpenStreetMap directly: a localhost URL would
+# resolve on the viewer's machine, not this server.
+TILE_CACHE_URL = os.getenv("NACP_TILE_URL")
+TILE_CACHE_PORT = os.getenv("NACP_TILE_PORT")
+
+@st.cache_resource(show_spinner=False)
+def get_tile_cache():
+    """Create the disk tile cache (and its local proxy, if enabled) once per process"""
+    from tile_cache import TileCache, start_tile_server
+    
+    cache = TileCache()
+    if TILE_CACHE_PORT:
+        try:
+            start_tile_server(cache, port=int(TILE_CACHE_PORT))
+        except OSError:
+            # Another app process already serves this port from the same cache directory
+            pass
+    return cache
+
+def get_map_tiles():
+    """Get the folium tiles/attribution pair, preferring the local tile cache when configured"""
+    from tile_cache import OSM_ATTRIBUTION
+    
+    if TILE_CACHE_URL:
+        if TILE_CACHE_PORT:
+            get_tile_cache()
+        return TILE_CACHE_URL, OSM_ATTRIBUTION
+    return 'OpenStreetMap', None
+
+@st.cache_resource(show_spinner=False)
+def get_tile_seed_jobs():
+    """Holds the process-wide tile seeding job, shared across admin sessions"""
+    return {}
+
 # =============================
 # REVERSE GEOCODING FUNCTIONS
 # =============================
+@st.cache_data(ttl=24 * 3600, max_entries=1000, show_spinner=False)
+def reverse_geocode(lat, lon):
+    """Nominatim reverse lookup, cached per coordinate pair; failures raise and are not cached"""
+    import requests
+
+    url = f"https://nominatim.openstreetmap.org/reverse?format=json&lat={lat}&lon={lon}&zoom=18&addressdetails=1"
+    headers = {
+        'User-Agent': 'NACP Bahamas Agricultural Census/1.0'
+    }
+    response = requests.get(url, headers=headers, timeout=10)
+    response.raise_for_status()
+    return response.json()
+
 def get_address_from_coordinates(lat, lon):
     """Get street address from coordinates using OpenStreetMap Nominatim"""
     try:
-        url = f"https://nominatim.openstreetmap.org/reverse?format=json&lat={lat}&lon={lon}&zoom=18&addressdetails=1"
-        
-        headers = {
-            'User-Agent': 'NACP Bahamas Agricultural Census/1.0'
-        }
-        
-        response = requests.get(url, headers=headers, timeout=10)
-        data = response.json()
+        data = reverse_geocode(lat, lon)
         
         if 'error' not in data:
             address = data.get('display_name', '')
@@ -328,6 +363,32 @@ def auto_fill_address_from_coordinates():
 # =============================
 # DATABASE INITIALIZATION
 # =============================
+def ensure_updated_at_column(conn):
+    """Add the updated_at change-tracking column and its index if missing; returns True if added"""
+    if db_type == "PostgreSQL":
+        result = conn.execute(text("""
+            SELECT EXISTS (
+                SELECT FROM information_schema.columns 
+                WHERE table_name = 'registration_form' AND column_name = 'updated_at'
+            )
+        """))
+        column_exists = result.scalar()
+    else:
+        result = conn.execute(text("PRAGMA table_info(registration_form)"))
+        column_exists = any(row[1] == "updated_at" for row in result.fetchall())
+
+    added = False
+    if not column_exists:
+        # SQLite cannot add a column with a non-constant default, so backfill explicitly
+        conn.execute(text("ALTER TABLE registration_form ADD COLUMN updated_at TIMESTAMP"))
+        conn.execute(text("UPDATE registration_form SET updated_at = COALESCE(created_at, CURRENT_TIMESTAMP)"))
+        if db_type == "PostgreSQL":
+            conn.execute(text("ALTER TABLE registration_form ALTER COLUMN updated_at SET DEFAULT CURRENT_TIMESTAMP"))
+        added = True
+
+    conn.execute(text("CREATE INDEX IF NOT EXISTS idx_registration_form_updated_at ON registration_form (updated_at)"))
+    return added
+
 def initialize_database():
     """Initialize database tables if they don't exist"""
     if engine is None:
@@ -387,7 +448,8 @@ def initialize_database():
                             gps_accuracy DECIMAL(10, 2),
                             location_source VARCHAR(50),
                             confirmed BOOLEAN DEFAULT FALSE,
-                            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
                         )
                     """))
                 else:
@@ -413,9 +475,12 @@ def initialize_database():
                             gps_accuracy DECIMAL(10, 2),
                             location_source VARCHAR(50),
                             confirmed BOOLEAN DEFAULT FALSE,
-                            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
                         )
                     """))
+
+            ensure_updated_at_column(conn)
         
         st.session_state.database_initialized = True
         st.success("✅ Database initialized successfully")
@@ -482,7 +547,8 @@ def restore_tables():
                             gps_accuracy DECIMAL(10, 2),
                             location_source VARCHAR(50),
                             confirmed BOOLEAN DEFAULT FALSE,
-                            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
                         )
                     """))
                 else:
@@ -507,10 +573,13 @@ def restore_tables():
                             gps_accuracy DECIMAL(10, 2),
                             location_source VARCHAR(50),
                             confirmed BOOLEAN DEFAULT FALSE,
-                            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
                         )
                     """))
                 st.success("✅ Table 'registration_form' restored successfully with confirmed column")
+
+            ensure_updated_at_column(conn)
             
             st.session_state.database_initialized = True
             return True
@@ -526,6 +595,9 @@ def fix_database_schema():
         
     try:
         with engine.begin() as conn:
+            if ensure_updated_at_column(conn):
+                st.success("✅ Added missing 'updated_at' column to database")
+
             # Check if confirmed column exists
             try:
                 conn.execute(text("SELECT confirmed FROM registration_form LIMIT 1"))
@@ -549,21 +621,13 @@ def check_database_schema():
         
     try:
         with engine.begin() as conn:
-            # Check if confirmed column exists
-            conn.execute(text("SELECT confirmed FROM registration_form LIMIT 1"))
+            # Check if confirmed and updated_at columns exist
+            conn.execute(text("SELECT confirmed, updated_at FROM registration_form LIMIT 1"))
         return True
     except Exception:
         # Column doesn't exist, try to fix it
         return fix_database_schema()
 
-# Initialize database on startup
-if st.session_state.get("page") == "landing" and engine is not None and not st.session_state.get("database_initialized"):
-    initialize_database()
-
-# Add schema check after database initialization
-if engine is not None and st.session_state.get("database_initialized"):
-    check_database_schema()
-
 # =============================
 # DATA STORAGE FUNCTIONS
 # =============================
@@ -671,13 +735,14 @@ def update_registration_location(registration_id, lat, lon, accuracy=None, sourc
                 sql = """
                     UPDATE registration_form 
                     SET latitude = :lat, longitude = :lon, 
-                        gps_accuracy = :accuracy, location_source = :source
+                        gps_accuracy = :accuracy, location_source = :source,
+                        updated_at = CURRENT_TIMESTAMP
                     WHERE id = :id
                 """
             else:
                 sql = """
                     UPDATE registration_form 
-                    SET latitude = :lat, longitude = :lon
+                    SET latitude = :lat, longitude = :lon, updated_at = CURRENT_TIMESTAMP
                     WHERE id = :id
                 """
             
@@ -779,13 +844,172 @@ def get_all_registrations():
     else:
         return list(st.session_state.get("registration_data", {}).values())
 
+# =============================
+# DASHBOARD DATA CACHE
+# =============================
+ARRAY_FIELDS = ['communication_methods', 'interview_methods', 'available_days', 'available_times']
+
+def decode_registration_row(row):
+    """Convert a database row to a plain dict, decoding SQLite JSON array columns"""
+    row_dict = dict(row)
+    if db_type != "PostgreSQL":
+        for field in ARRAY_FIELDS:
+            if row_dict.get(field):
+                try:
+                    row_dict[field] = json.loads(row_dict[field])
+                except:
+                    row_dict[field] = []
+    return row_dict
+
+def build_registration_directory(registrations):
+    """Build the id -> label index used by the registration selector (newest first)"""
+    return {
+        r.get('id'): f"{r.get('first_name', '')} {r.get('last_name', '')}"
+        for r in registrations
+    }
+
+def get_registration_by_id(registration_id):
+    """Fetch one full registration record by primary key"""
+    if engine is not None:
+        try:
+            with engine.begin() as conn:
+                result = conn.execute(
+                    text("SELECT * FROM registration_form WHERE id = :id"),
+                    {"id": registration_id}
+                )
+                row = result.mappings().fetchone()
+                return decode_registration_row(row) if row else None
+        except Exception as e:
+            st.error(f"Error loading registration: {e}")
+            return None
+    else:
+        return st.session_state.get("registration_data", {}).get(registration_id)
+
+# updated_at is the writing transaction's start time, so an edit can commit after
+# rows stamped later; rows this close to the newest updated_at are always re-checked
+REGISTRATION_WATERMARK_OVERLAP = timedelta(minutes=5)
+
+def _as_datetime(value):
+    # SQLite returns timestamps as text
+    return datetime.fromisoformat(value) if isinstance(value, str) else value
+
+class RegistrationCache:
+    """Registration rows shared by all admin sessions, refreshed only when the table watermark moves.
+
+    The watermark is (max id, max updated_at, row count, (id, updated_at) of rows in the
+    overlap window before max updated_at), so an edit committed late with an earlier
+    updated_at still moves it. New and edited rows are delta-loaded by id and the same
+    window; a count that still disagrees after the delta means rows were deleted, which
+    triggers a full reload.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.watermark = None
+        self.rows = {}
+        self.snapshot = None
+
+    @staticmethod
+    def read_watermark(conn):
+        result = conn.execute(text("SELECT MAX(id), MAX(updated_at), COUNT(*) FROM registration_form"))
+        max_id, max_updated_at, row_count = result.fetchone()
+        recent = ()
+        if max_updated_at is not None:
+            recent = tuple(tuple(row) for row in conn.execute(
+                text("SELECT id, updated_at FROM registration_form WHERE updated_at >= :since ORDER BY id"),
+                {"since": _as_datetime(max_updated_at) - REGISTRATION_WATERMARK_OVERLAP}
+            ))
+        return (max_id or 0, max_updated_at, row_count or 0, recent)
+
+    def _full_load(self, conn):
+        result = conn.execute(text("SELECT * FROM registration_form"))
+        self.rows = {row["id"]: decode_registration_row(row) for row in result.mappings()}
+
+    def _delta_load(self, conn):
+        max_id, max_updated_at, _, _ = self.watermark
+        if max_updated_at is None:
+            result = conn.execute(
+                text("SELECT * FROM registration_form WHERE id > :max_id"),
+                {"max_id": max_id}
+            )
+        else:
+            # Re-read the overlap window so edits committed late with an earlier updated_at are picked up
+            result = conn.execute(
+                text("SELECT * FROM registration_form WHERE id > :max_id OR updated_at >= :since"),
+                {"max_id": max_id, "since": _as_datetime(max_updated_at) - REGISTRATION_WATERMARK_OVERLAP}
+            )
+        for row in result.mappings():
+            self.rows[row["id"]] = decode_registration_row(row)
+
+    def _build_snapshot(self):
+        registrations = sorted(self.rows.values(), key=lambda r: r["id"], reverse=True)
+        located = [r for r in registrations if r.get('latitude') is not None and r.get('longitude') is not None]
+        self.snapshot = {
+            "registrations": registrations,
+            "directory": build_registration_directory(registrations),
+            "located": located,
+            "count": len(registrations),
+            "confirmed_count": sum(1 for r in registrations if r.get('confirmed')),
+            "located_count": len(located)
+        }
+
+    def get(self, engine):
+        """Return the current snapshot; an idle table costs only the watermark query"""
+        with self.lock:
+            with engine.begin() as conn:
+                watermark = self.read_watermark(conn)
+                if watermark == self.watermark and self.snapshot is not None:
+                    return self.snapshot
+
+                if self.watermark is None:
+                    self._full_load(conn)
+                else:
+                    self._delta_load(conn)
+                    if len(self.rows) != watermark[2]:
+                        self._full_load(conn)
+
+            self.watermark = watermark
+            self._build_snapshot()
+            return self.snapshot
+
+    def invalidate(self):
+        with self.lock:
+            self.watermark = None
+            self.rows = {}
+            self.snapshot = None
+
+@st.cache_resource(show_spinner=False)
+def get_registration_cache():
+    """One registration cache per server process, shared across admin sessions"""
+    return RegistrationCache()
+
+def get_dashboard_data():
+    """Get cached registrations and counts for the admin dashboard"""
+    if engine is not None:
+        try:
+            return get_registration_cache().get(engine)
+        except Exception as e:
+            st.error(f"Error loading registrations: {e}")
+            return {"registrations": [], "directory": {}, "located": [], "count": 0, "confirmed_count": 0, "located_count": 0}
+
+    registrations = sorted(st.session_state.get("registration_data", {}).values(), key=lambda r: r.get('id', 0), reverse=True)
+    located = [r for r in registrations if r.get('latitude') and r.get('longitude')]
+    return {
+        "registrations": registrations,
+        "directory": build_registration_directory(registrations),
+        "located": located,
+        "count": len(registrations),
+        "confirmed_count": len([r for r in registrations if r.get('confirmed')]),
+        "located_count": len(located)
+    }
+
 def confirm_registration(registration_id):
     """Mark a registration as confirmed"""
     if engine is not None:
         try:
             with engine.begin() as conn:
                 result = conn.execute(
-                    text("UPDATE registration_form SET confirmed = TRUE WHERE id = :id"),
+                    text("UPDATE registration_form SET confirmed = TRUE, updated_at = CURRENT_TIMESTAMP WHERE id = :id"),
                     {"id": registration_id}
                 )
                 return result.rowcount > 0
@@ -843,7 +1067,7 @@ def update_registration_data(registration_id, data):
                         telephone = :telephone, cell = :cell, communication_methods = :communication_methods,
                         island = :island, settlement = :settlement, street_address = :street_address,
                         interview_methods = :interview_methods, available_days = :available_days,
-                        available_times = :available_times
+                        available_times = :available_times, updated_at = CURRENT_TIMESTAMP
                     WHERE id = :id
                 """), update_data)
                 return result.rowcount > 0
@@ -861,6 +1085,8 @@ def update_registration_data(registration_id, data):
 # =============================
 def get_enhanced_ip_location():
     """Enhanced fallback method using IP geolocation"""
+    import requests
+    
     try:
         st.info("🔍 Detecting approximate location...")
         resp = requests.get("https://ipapi.co/json/", timeout=10)
@@ -943,28 +1169,39 @@ def handle_map_click(click_data):
         return True
     return False
 
-def show_interactive_map():
-    """Display an interactive map for coordinate selection"""
-    lat, lon = get_safe_coordinates()
-    current_island = st.session_state.get("current_island")
+def build_location_picker_base_map(island):
+    """Build a fresh location-picker base map for this run.
 
-    if current_island and current_island in ISLAND_CENTERS:
-        center_lat, center_lon = ISLAND_CENTERS[current_island]
-        zoom_level = get_island_zoom_level(current_island)
-        map_title = f"🗺️ Interactive Map of {current_island}"
+    Not cached: st_folium adds the marker layer to the map it is given, so a
+    shared map would collect every session's markers. A new map costs little,
+    and st_folium normalises folium's element ids, so the component keeps its
+    identity across reruns.
+    """
+    import folium
+    
+    if island in ISLAND_CENTERS:
+        center_lat, center_lon = ISLAND_CENTERS[island]
+        zoom_level = get_island_zoom_level(island)
     else:
-        center_lat, center_lon = lat, lon
+        center_lat, center_lon = 25.0343, -77.3963
         zoom_level = 15
-        map_title = "🗺️ Interactive Location Map"
-
-    st.markdown(f"### {map_title}")
-    st.markdown("**📌 Click anywhere on the map to set your exact location**")
 
+    tiles, attribution = get_map_tiles()
     m = folium.Map(
         location=[center_lat, center_lon],
         zoom_start=zoom_level,
-        tiles='OpenStreetMap'
+        tiles=tiles,
+        attr=attribution
     )
+    m.add_child(folium.LatLngPopup())
+    return m
+
+def build_location_marker_layer():
+    """Build the marker layer for the current selection (the only part that changes per click)"""
+    import folium
+    
+    lat, lon = get_safe_coordinates()
+    marker_layer = folium.FeatureGroup(name="Selected Location")
 
     if st.session_state.get("map_click_lat") and st.session_state.get("map_click_lon"):
         folium.Marker(
@@ -972,24 +1209,57 @@ def show_interactive_map():
             popup="Selected Location",
             tooltip="Your selected location",
             icon=folium.Icon(color='green', icon='ok-sign')
-        ).add_to(m)
+        ).add_to(marker_layer)
     elif st.session_state.get("latitude") and st.session_state.get("longitude"):
         folium.Marker(
             [lat, lon],
             popup="Current Location",
             tooltip="Current detected location",
             icon=folium.Icon(color='blue', icon='info-sign')
-        ).add_to(m)
+        ).add_to(marker_layer)
 
-    m.add_child(folium.LatLngPopup())
+    return marker_layer
+
+def show_interactive_map():
+    """Display an interactive map for coordinate selection"""
+    from streamlit_folium import st_folium
+    
+    lat, lon = get_safe_coordinates()
+    current_island = st.session_state.get("current_island")
 
-    map_data = st_folium(m, width=700, height=500, key=f"interactive_map_{st.session_state.map_counter}")
+    if current_island and current_island in ISLAND_CENTERS:
+        map_title = f"🗺️ Interactive Map of {current_island}"
+        map_center = None
+    else:
+        current_island = None
+        map_title = "🗺️ Interactive Location Map"
+        map_center = (lat, lon)
 
-    if map_data and map_data.get("last_clicked"):
-        if handle_map_click(map_data["last_clicked"]):
-            st.success(f"📍 **Location selected!** Coordinates: {map_data['last_clicked']['lat']:.6f}, {map_data['last_clicked']['lng']:.6f}")
-            st.session_state.map_counter += 1
-            st.rerun()
+    st.markdown(f"### {map_title}")
+    st.markdown("**📌 Click anywhere on the map to set your exact location**")
+
+    # The base map script is identical on every run for an island, so a click
+    # only swaps the marker layer instead of remounting the whole map component
+    m = build_location_picker_base_map(current_island)
+
+    map_data = st_folium(
+        m,
+        width=700,
+        height=500,
+        key=f"location_picker_{current_island or 'default'}",
+        center=map_center,
+        feature_group_to_add=build_location_marker_layer(),
+        returned_objects=["last_clicked"],
+        render=False
+    )
+
+    last_clicked = map_data.get("last_clicked") if map_data else None
+    if last_clicked and last_clicked != st.session_state.get("map_last_click"):
+        # The component keeps returning its last click, so only act on new ones
+        st.session_state.map_last_click = last_clicked
+        if handle_map_click(last_clicked):
+            st.success(f"📍 **Location selected!** Coordinates: {last_clicked['lat']:.6f}, {last_clicked['lng']:.6f}")
+            rerun_fragment()
 
     return map_data
 
@@ -1050,7 +1320,7 @@ def show_coordinate_controls():
             # AUTO-DETECT ADDRESS WHEN MANUAL COORDINATES ARE SET
             auto_detect_and_fill_address()
             st.success("✅ Manual coordinates set!")
-            st.rerun()
+            rerun_fragment()
 
     if st.session_state.get("latitude") or st.session_state.get("longitude"):
         if st.button("🗑️ Clear Coordinates", key="clear_coords"):
@@ -1062,11 +1332,45 @@ def show_coordinate_controls():
             st.session_state.manual_coordinates = False
             st.session_state.reg_street = ""
             st.success("✅ Coordinates cleared!")
-            st.rerun()
+            rerun_fragment()
 
 # =============================
 # RESET SESSION FUNCTION
 # =============================
+def rerun_fragment():
+    """Rerun only the calling fragment; falls back to a full rerun when the fragment is running as part of one"""
+    try:
+        st.rerun(scope="fragment")
+    except StreamlitAPIException:
+        st.rerun()
+
+def checkbox_group(options, key_prefix, format_func=str):
+    """A row of checkboxes; inside a form, toggling one does not rerun the page"""
+    cols = st.columns(len(options))
+    for col, option in zip(cols, options):
+        with col:
+            st.checkbox(format_func(option), key=f"{key_prefix}{option}")
+
+def selected_options(options, key_prefix):
+    """Options ticked in a checkbox_group, read from session state by the enclosing page"""
+    return [option for option in options if st.session_state.get(f"{key_prefix}{option}")]
+
+def set_island_center(island):
+    """Remember the island and point the map at it for the location step"""
+    st.session_state.current_island = island
+    st.session_state.map_counter += 1  # Force map refresh for later pages
+    if island in ISLAND_CENTERS:
+        center_lat, center_lon = ISLAND_CENTERS[island]
+        st.session_state.latitude = center_lat
+        st.session_state.longitude = center_lon
+        st.session_state.location_source = "island_center"
+
+def on_island_change(island_key, settlement_key):
+    """Island selectbox callback: reset the dependent settlement before the page reruns"""
+    st.session_state.pop(settlement_key, None)
+    st.session_state.manual_settlement = ""
+    set_island_center(st.session_state[island_key])
+
 def reset_session():
     """Clear all session state data"""
     keys_to_keep = ["registration_data", "database_initialized"]
@@ -1090,13 +1394,6 @@ def landing_page():
     Your participation helps shape the future of agriculture in The Bahamas.
     """)
 
-    if engine is None:
-        st.warning("⚠️ Running in offline mode - data will be stored temporarily in browser")
-    elif not st.session_state.get("database_initialized"):
-        if st.button("🔄 Initialize Database"):
-            if initialize_database():
-                st.rerun()
-
     st.divider()
 
     st.markdown("### 📍 Location Setup")
@@ -1153,191 +1450,181 @@ def registration_form():
             st.rerun()
         return
 
-    st.markdown("### 👤 Personal Information")
-    col1, col2 = st.columns(2)
-
-    with col1:
-        first_name = st.text_input("First Name *", key="reg_fname")
-        last_name = st.text_input("Last Name *", key="reg_lname")
-        email = st.text_input("Email *", key="reg_email")
-
-    with col2:
-        cell_raw = st.text_input("Cell Number (Primary Contact) *",
-                                 key="reg_cell",
-                                 placeholder="e.g., 2424567890 or 4567890")
-        telephone_raw = st.text_input("Alternate Number (Optional)",
-                                      key="reg_tel",
-                                      placeholder="e.g., 2424567890")
-
-    st.markdown("### 📍 Address Information")
+    # Island and settlement sit outside the form: the settlement list depends on
+    # the island, and form widgets cannot run callbacks. Everything else is
+    # batched in the form and sent to the server only on submit.
+    st.markdown("### 📍 Island & Settlement")
     col1, col2 = st.columns(2)
     with col1:
-        # Store previous island selection to detect changes
-        previous_island = st.session_state.get("current_island")
-        
         island_selected = st.selectbox(
             "Island *",
             list(ISLAND_SETTLEMENTS.keys()),
-            key="reg_island"
+            key="reg_island",
+            on_change=on_island_change,
+            args=("reg_island", "reg_settlement")
         )
-        
-        # Update current island in session state
-        st.session_state.current_island = island_selected
-        
-        # If island changed, update map view for later use
-        if previous_island != island_selected:
-            st.session_state.map_counter += 1  # Force map refresh for later pages
-            if island_selected in ISLAND_CENTERS:
-                center_lat, center_lon = ISLAND_CENTERS[island_selected]
-                st.session_state.latitude = center_lat
-                st.session_state.longitude = center_lon
-                st.session_state.location_source = "island_center"
+        if st.session_state.get("current_island") is None:
+            set_island_center(island_selected)
 
-        settlements = ISLAND_SETTLEMENTS.get(island_selected, [])
+    with col2:
         # Add "Other" option to settlements
-        settlement_options = settlements + ["Other"]
-        
+        settlement_options = ISLAND_SETTLEMENTS.get(island_selected, []) + ["Other"]
         settlement_selected = st.selectbox(
             "Settlement/District *",
             settlement_options,
             key="reg_settlement"
         )
-        
-        # Show manual input if "Other" is selected
-        if settlement_selected == "Other":
-            manual_settlement = st.text_input(
-                "Enter Settlement Name *",
-                value=st.session_state.get("manual_settlement", ""),
-                key="manual_settlement_input",
-                placeholder="Enter your settlement name"
-            )
-            if manual_settlement:
-                settlement_selected = manual_settlement
-                st.session_state.manual_settlement = manual_settlement
-        else:
-            st.session_state.manual_settlement = ""
 
-    with col2:
-        # Auto-fill street address if coordinates are available
-        auto_detected_address = ""
-        if st.session_state.get("latitude") and st.session_state.get("longitude"):
-            auto_detected_address = get_address_from_coordinates(
-                st.session_state.latitude, 
-                st.session_state.longitude
-            )
-        
-        street_address = st.text_input(
-            "Street Address *",
-            value=st.session_state.get("reg_street", auto_detected_address),
-            key="reg_street",
-            placeholder="e.g., 123 Main Street, Coral Harbour"
-        )
-        
-        # Show auto-detection status
-        if st.session_state.get("latitude") and st.session_state.get("longitude"):
-            if auto_detected_address and auto_detected_address != f"Near {st.session_state.latitude:.6f}, {st.session_state.longitude:.6f}":
-                st.caption(f"📍 Address auto-detected from your location")
-            else:
-                st.caption("📍 Set your location first to auto-detect address")
+    with st.form("registration"):
+        st.markdown("### 👤 Personal Information")
+        col1, col2 = st.columns(2)
 
-    # REMOVED: The interactive map section from registration
-    # Only show a simple location info message instead
-    st.markdown("### 📍 Location Setup")
-    st.info("""
-    **Your location will be set in the next step.** 
-    After saving your basic information, you'll be able to:
-    - 🗺️ Click on an interactive map to set your exact location
-    - 🌐 Use automatic location detection  
-    - ✏️ Enter coordinates manually
-    - 🏠 Auto-detect your street address from coordinates
-    """)
+        with col1:
+            first_name = st.text_input("First Name *", key="reg_fname")
+            last_name = st.text_input("Last Name *", key="reg_lname")
+            email = st.text_input("Email *", key="reg_email")
 
-    st.markdown("### 💬 Preferred Communication Methods")
-    comm_methods = ["WhatsApp", "Phone Call", "Email", "Text Message"]
-    selected_methods = []
-    cols = st.columns(4)
-    for i, method in enumerate(comm_methods):
-        with cols[i]:
-            if st.checkbox(method, key=f"comm_{method}"):
-                selected_methods.append(method)
-
-    st.markdown("### 🗣️ Preferred Interview Method")
-    interview_methods = ["In-person Interview", "Phone Interview", "Self Reporting"]
-    interview_selected = []
-    cols = st.columns(3)
-    for i, method in enumerate(interview_methods):
-        with cols[i]:
-            if st.checkbox(method, key=f"interview_{method}"):
-                interview_selected.append(method)
+        with col2:
+            cell_raw = st.text_input("Cell Number (Primary Contact) *",
+                                     key="reg_cell",
+                                     placeholder="e.g., 2424567890 or 4567890")
+            telephone_raw = st.text_input("Alternate Number (Optional)",
+                                          key="reg_tel",
+                                          placeholder="e.g., 2424567890")
 
-    st.divider()
+        st.markdown("### 📍 Address Information")
+        col1, col2 = st.columns(2)
+        with col1:
+            # Show manual input if "Other" is selected
+            manual_settlement = ""
+            if settlement_selected == "Other":
+                manual_settlement = st.text_input(
+                    "Enter Settlement Name *",
+                    value=st.session_state.get("manual_settlement", ""),
+                    key="manual_settlement_input",
+                    placeholder="Enter your settlement name"
+                )
 
-    col_back, col_save = st.columns([1, 2])
-    with col_back:
-        if st.button("← Back to Home"):
-            st.session_state.page = "landing"
-            st.rerun()
+        with col2:
+            # Filled from the coordinates in the location step; no lookup while typing
+            street_address = st.text_input(
+                "Street Address *",
+                key="reg_street",
+                placeholder="e.g., 123 Main Street, Coral Harbour"
+            )
+            if st.session_state.get("reg_street") and st.session_state.get("location_source") not in (None, "island_center"):
+                st.caption("📍 Address auto-detected from your location")
+            else:
+                st.caption("📍 Set your location in the next steps to auto-detect your address")
 
-    with col_save:
-        if st.button("💾 Save & Continue to Availability", type="primary", use_container_width=True):
-            # Validation
-            if not all([first_name, last_name, cell_raw, email, island_selected, settlement_selected, street_address]):
-                st.error("⚠️ Please complete all required fields marked with *")
-                return
+        # REMOVED: The interactive map section from registration
+        # Only show a simple location info message instead
+        st.markdown("### 📍 Location Setup")
+        st.info("""
+        **Your location will be set in the next step.** 
+        After saving your basic information, you'll be able to:
+        - 🗺️ Click on an interactive map to set your exact location
+        - 🌐 Use automatic location detection  
+        - ✏️ Enter coordinates manually
+        - 🏠 Auto-detect your street address from coordinates
+        """)
 
-            if settlement_selected == "Other" and not st.session_state.get("manual_settlement"):
-                st.error("⚠️ Please enter your settlement name")
-                return
+        st.markdown("### 💬 Preferred Communication Methods")
+        comm_methods = ["WhatsApp", "Phone Call", "Email", "Text Message"]
+        checkbox_group(comm_methods, "comm_")
 
-            if not validate_phone_number(cell_raw):
-                st.error("⚠️ Please enter a valid Bahamian cell number (7 or 10 digits).")
-                return
+        st.markdown("### 🗣️ Preferred Interview Method")
+        interview_methods = ["In-person Interview", "Phone Interview", "Self Reporting"]
+        checkbox_group(interview_methods, "interview_")
 
-            if telephone_raw and not validate_phone_number(telephone_raw):
-                st.error("⚠️ Please enter a valid telephone number (7 or 10 digits).")
-                return
+        submitted = st.form_submit_button("💾 Save & Continue to Availability", type="primary", use_container_width=True)
 
-            if not validate_email(email):
-                st.error("⚠️ Please enter a valid email address.")
-                return
+    if st.button("← Back to Home"):
+        st.session_state.page = "landing"
+        st.rerun()
 
-            if not selected_methods:
-                st.error("⚠️ Please select at least one communication method.")
-                return
+    if submitted:
+        selected_methods = selected_options(comm_methods, "comm_")
+        interview_selected = selected_options(interview_methods, "interview_")
 
-            if not interview_selected:
-                st.error("⚠️ Please select at least one interview method.")
+        # Validation
+        if not all([first_name, last_name, cell_raw, email, island_selected, settlement_selected, street_address]):
+            st.error("⚠️ Please complete all required fields marked with *")
+            return
+
+        if settlement_selected == "Other":
+            if not manual_settlement:
+                st.error("⚠️ Please enter your settlement name")
                 return
+            settlement_selected = manual_settlement
+        st.session_state.manual_settlement = manual_settlement
+
+        if not validate_phone_number(cell_raw):
+            st.error("⚠️ Please enter a valid Bahamian cell number (7 or 10 digits).")
+            return
+
+        if telephone_raw and not validate_phone_number(telephone_raw):
+            st.error("⚠️ Please enter a valid telephone number (7 or 10 digits).")
+            return
+
+        if not validate_email(email):
+            st.error("⚠️ Please enter a valid email address.")
+            return
+
+        if not selected_methods:
+            st.error("⚠️ Please select at least one communication method.")
+            return
+
+        if not interview_selected:
+            st.error("⚠️ Please select at least one interview method.")
+            return
+
+        formatted_cell = normalize_phone(cell_raw)
+        formatted_telephone = normalize_phone(telephone_raw) if telephone_raw else None
+        email = normalize_email(email)
+
+        registration_data = {
+            "consent": st.session_state["consent_bool"],
+            "first_name": first_name,
+            "last_name": last_name,
+            "email": email,
+            "telephone": formatted_telephone,
+            "cell": formatted_cell,
+            "communication_methods": selected_methods,
+            "island": island_selected,
+            "settlement": settlement_selected,
+            "street_address": street_address,
+            "interview_methods": interview_selected,
+            "available_days": [],
+            "available_times": [],
+            "latitude": st.session_state.get("latitude"),
+            "longitude": st.session_state.get("longitude"),
+            "gps_accuracy": st.session_state.get("gps_accuracy"),
+            "location_source": st.session_state.get("location_source")
+        }
 
-            formatted_cell = format_phone_number(cell_raw)
-            formatted_telephone = format_phone_number(telephone_raw) if telephone_raw else None
-
-            registration_data = {
-                "consent": st.session_state["consent_bool"],
-                "first_name": first_name,
-                "last_name": last_name,
-                "email": email,
-                "telephone": formatted_telephone,
-                "cell": formatted_cell,
-                "communication_methods": selected_methods,
-                "island": island_selected,
-                "settlement": settlement_selected,
-                "street_address": street_address,
-                "interview_methods": interview_selected,
-                "available_days": [],
-                "available_times": [],
-                "latitude": st.session_state.get("latitude"),
-                "longitude": st.session_state.get("longitude"),
-                "gps_accuracy": st.session_state.get("gps_accuracy"),
-                "location_source": st.session_state.get("location_source")
-            }
+        # Warn once about a likely double submission; a second click saves anyway
+        duplicates = check_for_duplicates(registration_data)
+        duplicate_ids = sorted(match["registration"]["id"] for match in duplicates)
+        if duplicates and st.session_state.get("acknowledged_duplicate_ids") != duplicate_ids:
+            st.session_state.acknowledged_duplicate_ids = duplicate_ids
+            st.warning("⚠️ This looks like an existing registration:")
+            for match in duplicates[:3]:
+                existing = match["registration"]
+                st.write(
+                    f"• {existing['first_name']} {existing['last_name']} ({existing['island']}) - "
+                    f"{', '.join(match['reasons']) or 'similar details'}"
+                )
+            st.info("If this is a new registration, click **Save & Continue** again to submit it.")
+            return
 
-            if save_registration_data(registration_data):
-                st.success("✅ Registration information saved successfully!")
-                st.session_state.page = "availability"
-                st.rerun()
-            else:
-                st.error("❌ Failed to save registration. Please try again.")
+        if save_registration_data(registration_data):
+            st.session_state.pop("acknowledged_duplicate_ids", None)
+            st.success("✅ Registration information saved successfully!")
+            st.session_state.page = "availability"
+            st.rerun()
+        else:
+            st.error("❌ Failed to save registration. Please try again.")
 
 def availability_form():
     # Security check: Prevent access if no current registration
@@ -1361,115 +1648,78 @@ def availability_form():
 
     st.title("🕒 Availability Preferences")
 
-    st.markdown("### 📅 Preferred Days")
     days = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
-    selected_days = []
-    cols = st.columns(7)
-    for i, day in enumerate(days):
-        with cols[i]:
-            if st.checkbox(day[:3], key=f"day_{day}"):
-                selected_days.append(day)
-
-    st.markdown("### ⏰ Preferred Time Slots")
     time_slots = ["Morning (7-10am)", "Midday (11-1pm)", "Afternoon (2-5pm)", "Evening (6-8pm)"]
-    selected_times = []
-    cols = st.columns(4)
-    for i, time_slot in enumerate(time_slots):
-        with cols[i]:
-            if st.checkbox(time_slot, key=f"time_{time_slot}"):
-                selected_times.append(time_slot)
+    with st.form("availability"):
+        st.markdown("### 📅 Preferred Days")
+        checkbox_group(days, "day_", format_func=lambda day: day[:3])
 
-    st.divider()
+        st.markdown("### ⏰ Preferred Time Slots")
+        checkbox_group(time_slots, "time_")
 
-    col_back, col_save = st.columns([1, 2])
-    with col_back:
-        if st.button("← Back to Registration"):
-            st.session_state.page = "registration"
-            st.rerun()
+        submitted = st.form_submit_button("💾 Save Availability & Continue to Location", type="primary")
 
-    with col_save:
-        if st.button("💾 Save Availability & Continue to Location", type="primary"):
-            if not selected_days or not selected_times:
-                st.error("⚠️ Please select at least one day and one time slot.")
-                return
+    if st.button("← Back to Registration"):
+        st.session_state.page = "registration"
+        st.rerun()
 
-            registration_id = st.session_state.get("current_registration_id")
-            if registration_id:
-                if engine is not None:
-                    try:
-                        with engine.begin() as conn:
-                            # Update availability data
-                            if db_type == "PostgreSQL":
-                                conn.execute(text("""
-                                    UPDATE registration_form 
-                                    SET available_days = :days, available_times = :times
-                                    WHERE id = :id
-                                """), {
-                                    "days": selected_days,
-                                    "times": selected_times,
-                                    "id": registration_id
-                                })
-                            else:
-                                conn.execute(text("""
-                                    UPDATE registration_form 
-                                    SET available_days = :days, available_times = :times
-                                    WHERE id = :id
-                                """), {
-                                    "days": json.dumps(selected_days),
-                                    "times": json.dumps(selected_times),
-                                    "id": registration_id
-                                })
-                    except Exception as e:
-                        st.error(f"❌ Database update error: {e}")
-                        return
-                
-                if registration_id in st.session_state.get("registration_data", {}):
-                    st.session_state.registration_data[registration_id]['available_days'] = selected_days
-                    st.session_state.registration_data[registration_id]['available_times'] = selected_times
-                
-                st.success("✅ Availability information saved successfully!")
-                st.session_state.page = "location_confirmation"
-                st.rerun()
-            else:
-                st.error("❌ No registration found. Please start over.")
+    if submitted:
+        selected_days = selected_options(days, "day_")
+        selected_times = selected_options(time_slots, "time_")
+        if not selected_days or not selected_times:
+            st.error("⚠️ Please select at least one day and one time slot.")
+            return
 
-def location_confirmation_page():
-    # Security check: Prevent access if no current registration
-    registration_id = st.session_state.get("current_registration_id")
-    if not registration_id:
-        st.error("❌ No active registration found. Please start a new registration.")
-        if st.button("🏠 Back to Home"):
-            st.session_state.page = "landing"
+        registration_id = st.session_state.get("current_registration_id")
+        if registration_id:
+            if engine is not None:
+                try:
+                    with engine.begin() as conn:
+                        # Update availability data
+                        if db_type == "PostgreSQL":
+                            conn.execute(text("""
+                                UPDATE registration_form 
+                                SET available_days = :days, available_times = :times,
+                                    updated_at = CURRENT_TIMESTAMP
+                                WHERE id = :id
+                            """), {
+                                "days": selected_days,
+                                "times": selected_times,
+                                "id": registration_id
+                            })
+                        else:
+                            conn.execute(text("""
+                                UPDATE registration_form 
+                                SET available_days = :days, available_times = :times,
+                                    updated_at = CURRENT_TIMESTAMP
+                                WHERE id = :id
+                            """), {
+                                "days": json.dumps(selected_days),
+                                "times": json.dumps(selected_times),
+                                "id": registration_id
+                            })
+                except Exception as e:
+                    st.error(f"❌ Database update error: {e}")
+                    return
+            
+            if registration_id in st.session_state.get("registration_data", {}):
+                st.session_state.registration_data[registration_id]['available_days'] = selected_days
+                st.session_state.registration_data[registration_id]['available_times'] = selected_times
+            
+            st.success("✅ Availability information saved successfully!")
+            st.session_state.page = "location_confirmation"
             st.rerun()
-        return
-    
-    # Additional check: If registration is already confirmed, redirect
-    reg = get_latest_registration()
-    if reg and reg.get('confirmed'):
-        st.error("✅ This registration has already been confirmed and submitted.")
-        st.info("Your registration is complete. Please start a new registration if needed.")
-        if st.button("🏠 Back to Home"):
-            st.session_state.page = "landing"
-            st.rerun()
-        return
-
-    st.title("📍 Confirm Your Location")
-
-    st.markdown("""
-    ### 🎯 Set Your Exact Location
-    
-    **Choose your method:**
-    - 🗺️ **Click on the map** below to select your exact location
-    - 🌐 **Use IP** for approximate location  
-    - ✏️ **Enter manually** if you know your coordinates
-    - 🏠 **Auto-detect address** from your coordinates
-    """)
+        else:
+            st.error("❌ No registration found. Please start over.")
 
+@st.fragment
+def location_picker():
+    """Map, coordinate controls and detected address: map clicks and coordinate edits rerun only this part"""
     col1, col2 = st.columns(2)
     with col1:
         if st.button("🌐 **DETECT LOCATION**", use_container_width=True, type="primary"):
             get_enhanced_ip_location()
-            st.rerun()
+            rerun_fragment()
     with col2:
         if st.button("🗑️ **CLEAR LOCATION**", use_container_width=True):
             st.session_state.latitude = None
@@ -1480,7 +1730,7 @@ def location_confirmation_page():
             st.session_state.manual_coordinates = False
             st.session_state.reg_street = ""
             st.success("✅ Location cleared!")
-            st.rerun()
+            rerun_fragment()
 
     st.divider()
 
@@ -1515,6 +1765,40 @@ def location_confirmation_page():
         else:
             st.warning("⚠️ Could not detect specific address from these coordinates. Please enter manually in the registration form.")
 
+def location_confirmation_page():
+    # Security check: Prevent access if no current registration
+    registration_id = st.session_state.get("current_registration_id")
+    if not registration_id:
+        st.error("❌ No active registration found. Please start a new registration.")
+        if st.button("🏠 Back to Home"):
+            st.session_state.page = "landing"
+            st.rerun()
+        return
+    
+    # Additional check: If registration is already confirmed, redirect
+    reg = get_latest_registration()
+    if reg and reg.get('confirmed'):
+        st.error("✅ This registration has already been confirmed and submitted.")
+        st.info("Your registration is complete. Please start a new registration if needed.")
+        if st.button("🏠 Back to Home"):
+            st.session_state.page = "landing"
+            st.rerun()
+        return
+
+    st.title("📍 Confirm Your Location")
+
+    st.markdown("""
+    ### 🎯 Set Your Exact Location
+    
+    **Choose your method:**
+    - 🗺️ **Click on the map** below to select your exact location
+    - 🌐 **Use IP** for approximate location  
+    - ✏️ **Enter manually** if you know your coordinates
+    - 🏠 **Auto-detect address** from your coordinates
+    """)
+
+    location_picker()
+
     st.divider()
 
     col_back, col_save, col_continue = st.columns([1, 1, 1])
@@ -1525,14 +1809,14 @@ def location_confirmation_page():
             st.rerun()
     
     with col_save:
-        if st.session_state.get("latitude") and st.session_state.get("longitude"):
-            if st.button("💾 Save Location", type="primary", use_container_width=True):
-                if save_current_location_to_registration():
-                    st.success("✅ Location saved to your registration!")
-                else:
-                    st.error("❌ Failed to save location. Please try again.")
-        else:
-            st.button("💾 Save Location", disabled=True, use_container_width=True)
+        # Always enabled: the picker fragment changes the location without rerunning this part of the page
+        if st.button("💾 Save Location", type="primary", use_container_width=True):
+            if not (st.session_state.get("latitude") and st.session_state.get("longitude")):
+                st.warning("⚠️ Please set your location first")
+            elif save_current_location_to_registration():
+                st.success("✅ Location saved to your registration!")
+            else:
+                st.error("❌ Failed to save location. Please try again.")
     
     with col_continue:
         if st.button("✅ Continue", type="primary", use_container_width=True):
@@ -1546,6 +1830,35 @@ def location_confirmation_page():
 def edit_registration_form(reg):
     """Allow candidates to edit their registration before final submission"""
     st.markdown("### ✏️ Edit Your Registration")
+
+    # Outside the form so the settlement list follows the island immediately
+    st.markdown("#### 📍 Island & Settlement")
+    col1, col2 = st.columns(2)
+    with col1:
+        island_selected = st.selectbox(
+            "Island *",
+            list(ISLAND_SETTLEMENTS.keys()),
+            index=list(ISLAND_SETTLEMENTS.keys()).index(reg.get('island', 'New Providence')) if reg.get('island') in ISLAND_SETTLEMENTS else 0,
+            key="edit_island",
+            on_change=on_island_change,
+            args=("edit_island", "edit_settlement")
+        )
+
+    with col2:
+        settlements = ISLAND_SETTLEMENTS.get(island_selected, [])
+        settlement_options = settlements + ["Other"]
+
+        current_settlement = reg.get('settlement', '')
+        if island_selected != reg.get('island'):
+            current_settlement = ""
+        settlement_index = settlement_options.index(current_settlement) if current_settlement in settlement_options else 0
+
+        settlement_selected = st.selectbox(
+            "Settlement/District *",
+            settlement_options,
+            index=settlement_index,
+            key="edit_settlement"
+        )
     
     with st.form("edit_registration"):
         st.markdown("#### 👤 Personal Information")
@@ -1558,13 +1871,13 @@ def edit_registration_form(reg):
 
         with col2:
             # Extract digits from formatted phone number for editing
-            cell_digits = re.sub(r'\D', '', reg.get('cell', ''))
+            cell_digits = re.sub(r'\D', '', format_phone_number(reg.get('cell', '')))
             cell_raw = st.text_input("Cell Number (Primary Contact) *",
                                      value=cell_digits,
                                      key="edit_cell",
                                      placeholder="e.g., 2424567890 or 4567890")
             
-            telephone_digits = re.sub(r'\D', '', reg.get('telephone', '')) if reg.get('telephone') else ""
+            telephone_digits = re.sub(r'\D', '', format_phone_number(reg.get('telephone'))) if reg.get('telephone') else ""
             telephone_raw = st.text_input("Alternate Number (Optional)",
                                           value=telephone_digits,
                                           key="edit_tel",
@@ -1573,41 +1886,7 @@ def edit_registration_form(reg):
         st.markdown("#### 📍 Address Information")
         col1, col2 = st.columns(2)
         with col1:
-            # Store previous island selection to detect changes
-            previous_island = st.session_state.get("current_island")
-            
-            island_selected = st.selectbox(
-                "Island *",
-                list(ISLAND_SETTLEMENTS.keys()),
-                index=list(ISLAND_SETTLEMENTS.keys()).index(reg.get('island', 'New Providence')) if reg.get('island') in ISLAND_SETTLEMENTS else 0,
-                key="edit_island"
-            )
-            
-            # Update current island in session state
-            st.session_state.current_island = island_selected
-            
-            # If island changed, update map view
-            if previous_island != island_selected:
-                st.session_state.map_counter += 1  # Force map refresh
-                if island_selected in ISLAND_CENTERS:
-                    center_lat, center_lon = ISLAND_CENTERS[island_selected]
-                    st.session_state.latitude = center_lat
-                    st.session_state.longitude = center_lon
-                    st.session_state.location_source = "island_center"
-
-            settlements = ISLAND_SETTLEMENTS.get(island_selected, [])
-            settlement_options = settlements + ["Other"]
-            
-            current_settlement = reg.get('settlement', '')
-            settlement_index = settlement_options.index(current_settlement) if current_settlement in settlement_options else 0
-            
-            settlement_selected = st.selectbox(
-                "Settlement/District *",
-                settlement_options,
-                index=settlement_index,
-                key="edit_settlement"
-            )
-            
+            manual_settlement = ""
             if settlement_selected == "Other":
                 manual_settlement = st.text_input(
                     "Enter Settlement Name *",
@@ -1715,8 +1994,9 @@ def edit_registration_form(reg):
                 return
 
             # Format phone numbers
-            formatted_cell = format_phone_number(cell_raw)
-            formatted_telephone = format_phone_number(telephone_raw) if telephone_raw else None
+            formatted_cell = normalize_phone(cell_raw)
+            formatted_telephone = normalize_phone(telephone_raw) if telephone_raw else None
+            email = normalize_email(email)
 
             # Update registration data
             registration_id = st.session_state.get("current_registration_id")
@@ -1844,9 +2124,9 @@ def final_confirmation_page():
             st.markdown("#### 👤 Personal Information")
             st.write(f"**Name:** {reg.get('first_name', '')} {reg.get('last_name', '')}")
             st.write(f"**Email:** {reg.get('email', '')}")
-            st.write(f"**Cell:** {reg.get('cell', '')}")
+            st.write(f"**Cell:** {format_phone_number(reg.get('cell', ''))}")
             if reg.get('telephone'):
-                st.write(f"**Alternate:** {reg.get('telephone', '')}")
+                st.write(f"**Alternate:** {format_phone_number(reg.get('telephone', ''))}")
             
             st.markdown("#### 📍 Address")
             st.write(f"**Island:** {reg.get('island', '')}")
@@ -1997,348 +2277,777 @@ def admin_login():
         st.session_state.page = "landing"
         st.rerun()
 
-def admin_dashboard():
-    if not st.session_state.get("admin_logged_in"):
-        st.error("❌ Access denied. Please log in.")
-        st.session_state.page = "admin_login"
-        st.rerun()
+@st.cache_resource(show_spinner=False)
+def prepare_dedup_indexes():
+    """Create the duplicate lookup indexes once per process"""
+    if engine is None:
+        return False
+    try:
+        ensure_dedup_indexes(engine)
+        return True
+    except Exception:
+        return False
+
+def check_for_duplicates(registration_data):
+    """Existing registrations that look like the same farmer as a new submission"""
+    if engine is None:
+        matches = []
+        for existing in st.session_state.get("registration_data", {}).values():
+            score, reasons = score_pair(registration_data, existing)
+            if score >= MATCH_THRESHOLD:
+                matches.append({"registration": existing, "score": score, "reasons": reasons})
+        return sorted(matches, key=lambda m: m["score"], reverse=True)
+    prepare_dedup_indexes()
+    try:
+        return find_matches_for(engine, registration_data)
+    except Exception:
+        # A failed lookup must never block a registration
+        return []
+
+MERGE_FILL_COLUMNS = [
+    "telephone", "email", "street_address", "latitude", "longitude",
+    "gps_accuracy", "location_source"
+]
+
+def merge_registrations(keep_id, drop_id):
+    """Fill gaps in the kept registration from its duplicate, then delete the duplicate"""
+    if engine is None:
+        registrations = st.session_state.get("registration_data", {})
+        keep, drop = registrations.get(keep_id), registrations.get(drop_id)
+        if keep is None or drop is None:
+            return False
+        for column in MERGE_FILL_COLUMNS:
+            if not keep.get(column) and drop.get(column):
+                keep[column] = drop[column]
+        del registrations[drop_id]
+        return True
+
+    fill_sql = ", ".join(
+        f"{column} = COALESCE(NULLIF(registration_form.{column}, ''), (SELECT d.{column} FROM registration_form d WHERE d.id = :drop_id))"
+        if column in ("telephone", "email", "street_address", "location_source") else
+        f"{column} = COALESCE(registration_form.{column}, (SELECT d.{column} FROM registration_form d WHERE d.id = :drop_id))"
+        for column in MERGE_FILL_COLUMNS
+    )
+    try:
+        with engine.begin() as conn:
+            conn.execute(
+                text(f"UPDATE registration_form SET {fill_sql}, updated_at = CURRENT_TIMESTAMP WHERE id = :keep_id"),
+                {"keep_id": keep_id, "drop_id": drop_id}
+            )
+            result = conn.execute(text("DELETE FROM registration_form WHERE id = :id"), {"id": drop_id})
+            return result.rowcount > 0
+    except Exception as e:
+        st.error(f"Merge error: {e}")
+        return False
+
+@st.fragment
+def show_duplicate_suggestions():
+    """Run the batch duplicate scan on demand and list merge suggestions"""
+    st.markdown("### 👥 Possible Duplicate Registrations")
+    st.caption("Candidates are grouped by cell, email and island + last name, then scored on name and address similarity.")
+
+    if st.button("🔎 Scan for Duplicates", use_container_width=True):
+        with st.spinner("Scanning registrations..."):
+            if engine is not None:
+                prepare_dedup_indexes()
+                st.session_state.duplicate_suggestions = scan_for_duplicates(engine)
+            else:
+                rows = list(st.session_state.get("registration_data", {}).values())
+                st.session_state.duplicate_suggestions = find_duplicates(rows)
+
+    suggestions = st.session_state.get("duplicate_suggestions")
+    if suggestions is None:
+        st.info("ℹ️ Run a scan to look for duplicate registrations.")
+        return
+    if not suggestions:
+        st.success("✅ No likely duplicates found")
         return
+
+    st.write(f"**{len(suggestions)} possible duplicate pair(s)**")
+    for i, suggestion in enumerate(suggestions):
+        keep, drop = suggestion["keep"], suggestion["drop"]
+        with st.expander(
+            f"{suggestion['score']:.0%} - #{keep['id']} {keep['first_name']} {keep['last_name']} / "
+            f"#{drop['id']} {drop['first_name']} {drop['last_name']}"
+        ):
+            st.write(f"**Why:** {', '.join(suggestion['reasons']) or 'similar details'}")
+            col1, col2 = st.columns(2)
+            for col, label, reg in ((col1, "Keep", keep), (col2, "Merge into kept", drop)):
+                with col:
+                    st.markdown(f"**{label}: #{reg['id']}**{' ✅' if reg.get('confirmed') else ''}")
+                    st.write(f"{reg['first_name']} {reg['last_name']}")
+                    st.write(f"📞 {format_phone_number(reg.get('cell')) or 'N/A'} | 📧 {reg.get('email') or 'N/A'}")
+                    st.write(f"📍 {reg.get('street_address') or ''}, {reg.get('settlement') or ''}, {reg.get('island') or ''}")
+
+            if st.button(f"🔗 Merge #{drop['id']} into #{keep['id']}", key=f"merge_duplicate_{i}"):
+                if merge_registrations(keep["id"], drop["id"]):
+                    st.session_state.duplicate_suggestions = [
+                        s for s in suggestions if drop["id"] not in (s["keep_id"], s["drop_id"])
+                    ]
+                    st.success(f"✅ Merged registration #{drop['id']} into #{keep['id']}")
+                    st.rerun()
+                else:
+                    st.error("❌ Merge failed")
+
+@st.fragment
+def show_interview_scheduler(registrations):
+    """Build a weekly interview calendar from confirmed registrations and enumerator capacity"""
+    import pandas as pd
+    from scheduling import DAYS, TIME_SLOTS, build_schedule, next_week_start
     
-    st.title("📊 Admin Dashboard")
+    st.markdown("### 📅 Interview Schedule")
+    st.caption("Confirmed registrations are matched to their available days and time slots. "
+               "In-person interviews use the island's enumerators; phone interviews use the phone team.")
+
+    week_start = st.date_input("Week starting", value=next_week_start())
+    col1, col2 = st.columns(2)
+    with col1:
+        interviews_per_slot = st.number_input("Interviews per agent per time slot", min_value=1, value=2)
+    with col2:
+        phone_agents = st.number_input("Phone interview agents", min_value=0, value=2)
+
+    st.markdown("**Enumerators per island**")
+    capacity_df = st.data_editor(
+        pd.DataFrame({"Island": list(ISLAND_CENTERS.keys()), "Enumerators": 0}),
+        hide_index=True,
+        disabled=["Island"],
+        key="interview_capacity_editor",
+        use_container_width=True
+    )
+
+    if st.button("📅 Generate Schedule", type="primary", use_container_width=True):
+        agents_per_island = dict(zip(capacity_df["Island"], capacity_df["Enumerators"].fillna(0).astype(int)))
+        st.session_state.interview_schedule = build_schedule(
+            registrations, agents_per_island, int(phone_agents), int(interviews_per_slot), week_start
+        )
+
+    if "interview_schedule" not in st.session_state:
+        return
+    scheduled, unscheduled = st.session_state.interview_schedule
+
+    col1, col2 = st.columns(2)
+    col1.metric("Scheduled Interviews", len(scheduled))
+    col2.metric("Could Not Schedule", len(unscheduled))
+
+    if scheduled:
+        schedule_df = pd.DataFrame(scheduled)
+        calendar = (
+            schedule_df.pivot_table(index="time_slot", columns="day", values="id", aggfunc="count", fill_value=0)
+            .reindex(index=TIME_SLOTS, columns=DAYS, fill_value=0)
+        )
+        st.markdown("**Interviews per slot**")
+        st.dataframe(calendar, use_container_width=True)
+
+        schedule_df["cell"] = schedule_df["cell"].map(format_phone_number)
+        schedule_df = schedule_df[["date", "day", "time_slot", "pool", "agent", "method", "id", "name", "island", "cell"]]
+        st.dataframe(schedule_df, hide_index=True, use_container_width=True)
+        st.download_button(
+            "📥 Download Schedule CSV",
+            schedule_df.to_csv(index=False),
+            file_name=f"interview_schedule_{week_start}.csv",
+            mime="text/csv"
+        )
+
+    if unscheduled:
+        with st.expander(f"⚠️ {len(unscheduled)} registration(s) not scheduled"):
+            st.dataframe(pd.DataFrame(unscheduled), hide_index=True, use_container_width=True)
+
+@st.fragment
+def show_route_planner(located_registrations):
+    """Plan an enumerator's visiting order for a day and export a day sheet and map"""
+    import folium
+    import pandas as pd
+    from streamlit_folium import folium_static
+    from routing import plan_route, day_sheet_html
+    from scheduling import IN_PERSON
     
-    tab1, tab2, tab3, tab4 = st.tabs(["📋 Registrations", "🗺️ Map View", "⚙️ Database", "🗑️ Delete Management"])
+    st.markdown("### 🧭 Enumerator Route Planner")
+    by_id = {reg["id"]: reg for reg in located_registrations if reg.get("confirmed")}
+
+    schedule = st.session_state.get("interview_schedule")
+    if schedule:
+        # Stops come from the generated interview schedule: one enumerator, one day
+        visits = [s for s in schedule[0] if s["method"] == IN_PERSON and s["id"] in by_id]
+        if not visits:
+            st.info("ℹ️ The current interview schedule has no in-person visits with GPS locations.")
+            return
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            island = st.selectbox("Island", sorted({v["pool"] for v in visits}), key="route_island")
+        with col2:
+            dates = sorted({v["date"] for v in visits if v["pool"] == island})
+            visit_date = st.selectbox("Date", dates, format_func=lambda d: d.strftime("%A %d %b"), key="route_date")
+        with col3:
+            agents = sorted({v["agent"] for v in visits if v["pool"] == island and v["date"] == visit_date})
+            agent = st.selectbox("Enumerator", agents, format_func=lambda a: f"Enumerator {a}", key="route_agent")
+        day_visits = [v for v in visits if v["pool"] == island and v["date"] == visit_date and v["agent"] == agent]
+        title = f"{island} - Enumerator {agent} - {visit_date:%A %d %B %Y}"
+    else:
+        # No schedule yet: route every confirmed, located registration on one island
+        st.caption("Generate an interview schedule to plan routes per enumerator and day.")
+        islands = sorted({reg["island"] for reg in by_id.values() if reg.get("island")})
+        if not islands:
+            st.info("ℹ️ No confirmed registrations with GPS locations yet.")
+            return
+        island = st.selectbox("Island", islands, key="route_island")
+        day_visits = [{"id": reg_id, "time_slot": ""} for reg_id, reg in by_id.items() if reg.get("island") == island]
+        title = f"{island} - All confirmed registrations"
+
+    stops = [
+        {
+            **by_id[v["id"]],
+            "name": f"{by_id[v['id']]['first_name']} {by_id[v['id']]['last_name']}",
+            "time_slot": v.get("time_slot", ""),
+        }
+        for v in day_visits
+    ]
+    start_from_center = st.checkbox("Start from island centre", value=False, key="route_start_center")
+    start = ISLAND_CENTERS.get(island) if start_from_center else None
+
+    ordered, total_km = plan_route(stops, start=start)
+    st.metric("Route length (straight-line)", f"{total_km} km", help=f"{len(ordered)} stops")
+
+    route_df = pd.DataFrame(ordered)[
+        ["stop", "time_slot", "name", "cell", "settlement", "street_address", "leg_km", "cumulative_km"]
+    ].assign(cell=lambda d: d["cell"].map(format_phone_number))
+    st.dataframe(route_df, hide_index=True, use_container_width=True)
+
+    tiles, attr = get_map_tiles()
+    route_map = folium.Map(location=[ordered[0]["latitude"], ordered[0]["longitude"]], zoom_start=12, tiles=tiles, attr=attr)
+    path = ([list(start)] if start else []) + [[stop["latitude"], stop["longitude"]] for stop in ordered]
+    folium.PolyLine(path, color="#2e7d32", weight=3).add_to(route_map)
+    for stop in ordered:
+        folium.Marker(
+            [stop["latitude"], stop["longitude"]],
+            tooltip=f"{stop['stop']}. {stop['name']}",
+            icon=folium.DivIcon(html=(
+                f'<div style="background:#2e7d32;color:white;border-radius:50%;width:22px;height:22px;'
+                f'text-align:center;line-height:22px;font-size:11px;font-weight:bold">{stop["stop"]}</div>'
+            ))
+        ).add_to(route_map)
+    route_map.fit_bounds(path)
+    folium_static(route_map, width=700, height=450)
+
+    file_stem = re.sub(r"[^A-Za-z0-9]+", "_", title).strip("_").lower()
+    col1, col2 = st.columns(2)
+    with col1:
+        st.download_button(
+            "🖨️ Download Day Sheet",
+            day_sheet_html(title, ordered, total_km),
+            file_name=f"day_sheet_{file_stem}.html",
+            mime="text/html",
+            use_container_width=True
+        )
+    with col2:
+        st.download_button(
+            "🗺️ Download Route Map",
+            route_map.get_root().render(),
+            file_name=f"route_map_{file_stem}.html",
+            mime="text/html",
+            use_container_width=True
+        )
+
+@st.cache_resource(show_spinner=False)
+def prepare_search_index():
+    """Build the registration search indexes once per process"""
+    if engine is None:
+        return False
+    try:
+        return ensure_search_index(engine, db_type)
+    except Exception:
+        return False
+
+def show_registration_search():
+    """Search box with ranked, paginated results over names, contacts and addresses"""
+    import pandas as pd
     
-    with tab1:
-        st.markdown("### 📋 All Registrations")
-        
-        if engine is not None:
-            try:
-                with engine.begin() as conn:
-                    result = conn.execute(text("SELECT COUNT(*) FROM registration_form"))
-                    count = result.scalar()
-                    st.metric("Total Registrations", count)
-                    
-                    result_confirmed = conn.execute(text("SELECT COUNT(*) FROM registration_form WHERE confirmed = TRUE"))
-                    confirmed_count = result_confirmed.scalar()
-                    st.metric("Confirmed Registrations", confirmed_count)
-            except Exception as e:
-                st.error(f"Database error: {e}")
-                count = 0
-                confirmed_count = 0
-        else:
-            count = len(st.session_state.get("registration_data", {}))
-            confirmed_count = len([r for r in st.session_state.get("registration_data", {}).values() if r.get('confirmed')])
-            st.metric("Total Registrations", count)
-            st.metric("Confirmed Registrations", confirmed_count)
-        
-        if count > 0:
-            registrations = get_all_registrations()
-            
-            # Table with delete checkboxes
-            if registrations:
-                # Create a DataFrame for selection
-                df_data = []
-                for reg in registrations:
-                    df_data.append({
-                        "Delete": False,
-                        "ID": reg.get('id'),
-                        "Name": f"{reg.get('first_name', '')} {reg.get('last_name', '')}",
-                        "Email": reg.get('email', ''),
-                        "Cell": reg.get('cell', ''),
-                        "Island": reg.get('island', ''),
-                        "Settlement": reg.get('settlement', ''),
-                        "Confirmed": "✅" if reg.get('confirmed') else "❌",
-                        "Location": "📍" if reg.get('latitude') else "❓",
-                        "Created": reg.get('created_at', ''),
-                        "Source": reg.get('location_source', 'unknown')
-                    })
-                
-                df = pd.DataFrame(df_data)
-                
-                # Display the dataframe with selection
-                edited_df = st.data_editor(
-                    df,
-                    column_config={
-                        "Delete": st.column_config.CheckboxColumn(
-                            "Delete",
-                            help="Select to delete",
-                            default=False,
-                        ),
-                        "Confirmed": st.column_config.TextColumn("Status"),
-                        "Location": st.column_config.TextColumn("GPS")
-                    },
-                    hide_index=True,
-                    use_container_width=True
-                )
-                
-                # Get selected rows for deletion
-                selected_rows = edited_df[edited_df["Delete"] == True]
-                
-                if not selected_rows.empty:
-                    st.warning(f"⚠️ {len(selected_rows)} registration(s) selected for deletion")
-                    if st.button("🗑️ Delete Selected", type="secondary"):
-                        deleted_count = 0
-                        for _, row in selected_rows.iterrows():
-                            if delete_registration(row["ID"]):
-                                deleted_count += 1
-                        
-                        if deleted_count > 0:
-                            st.success(f"✅ Successfully deleted {deleted_count} registration(s)")
-                            st.rerun()
-                        else:
-                            st.error("❌ Failed to delete registrations")
-                
-                # Show detailed view
-                st.markdown("### 👤 Registration Details")
-                selected_id = st.selectbox(
-                    "Select registration to view details:",
-                    options=[r.get('id') for r in registrations],
-                    format_func=lambda x: f"ID {x}: {next((f'{r.get('first_name')} {r.get('last_name')}' for r in registrations if r.get('id') == x), 'Unknown')}"
-                )
-                
-                if selected_id:
-                    selected_reg = next((r for r in registrations if r.get('id') == selected_id), None)
-                    if selected_reg:
-                        col1, col2 = st.columns(2)
-                        
-                        with col1:
-                            st.markdown("#### Personal Information")
-                            st.write(f"**Name:** {selected_reg.get('first_name', '')} {selected_reg.get('last_name', '')}")
-                            st.write(f"**Email:** {selected_reg.get('email', '')}")
-                            st.write(f"**Cell:** {selected_reg.get('cell', '')}")
-                            if selected_reg.get('telephone'):
-                                st.write(f"**Telephone:** {selected_reg.get('telephone', '')}")
-                            
-                            st.markdown("#### Address")
-                            st.write(f"**Island:** {selected_reg.get('island', '')}")
-                            st.write(f"**Settlement:** {selected_reg.get('settlement', '')}")
-                            st.write(f"**Street:** {selected_reg.get('street_address', '')}")
-                        
-                        with col2:
-                            st.markdown("#### Preferences")
-                            st.write(f"**Communication:** {format_array_for_display(selected_reg.get('communication_methods'))}")
-                            st.write(f"**Interview:** {format_array_for_display(selected_reg.get('interview_methods'))}")
-                            st.write(f"**Days:** {format_array_for_display(selected_reg.get('available_days'))}")
-                            st.write(f"**Times:** {format_array_for_display(selected_reg.get('available_times'))}")
-                            
-                            st.markdown("#### Location Data")
-                            if selected_reg.get('latitude') and selected_reg.get('longitude'):
-                                st.write(f"**Coordinates:** {selected_reg.get('latitude'):.6f}, {selected_reg.get('longitude'):.6f}")
-                                st.write(f"**Source:** {selected_reg.get('location_source', 'unknown')}")
-                                if selected_reg.get('gps_accuracy'):
-                                    st.write(f"**Accuracy:** {selected_reg.get('gps_accuracy')}m")
-                            else:
-                                st.write("**Coordinates:** Not set")
-                            
-                            st.write(f"**Created:** {selected_reg.get('created_at', 'Unknown')}")
-                            st.write(f"**Confirmed:** {'✅ Yes' if selected_reg.get('confirmed') else '❌ No'}")
-            
-            else:
-                st.info("📭 No registrations found")
-        else:
-            st.info("📭 No registrations in the system")
+    query = st.text_input(
+        "🔍 Search registrations",
+        key="registration_search_query",
+        placeholder="Name, email, cell, settlement or street address"
+    )
+    if not query or not query.strip():
+        return
+
+    page_size = 20
+    page = st.session_state.get("registration_search_page", 1)
+    if st.session_state.get("registration_search_last_query") != query:
+        st.session_state.registration_search_last_query = query
+        page = 1
+
+    if engine is not None:
+        try:
+            results, total = search_registrations(engine, db_type, query, page=page, page_size=page_size, indexed=prepare_search_index())
+        except Exception as e:
+            st.error(f"Search error: {e}")
+            return
+    else:
+        needle = query.strip().lower()
+        matches = [
+            r for r in st.session_state.get("registration_data", {}).values()
+            if needle in " ".join(str(r.get(field, '')) for field in ["first_name", "last_name", "email", "cell", "settlement", "street_address"]).lower()
+        ]
+        total = len(matches)
+        results = matches[(page - 1) * page_size:page * page_size]
+
+    if not results:
+        st.info("No registrations match your search")
+        return
+
+    page_count = max(math.ceil(total / page_size), 1)
+    st.caption(f"{total} match(es) · page {page} of {page_count}")
+    st.dataframe(
+        pd.DataFrame([{
+            "ID": r.get('id'),
+            "Name": f"{r.get('first_name', '')} {r.get('last_name', '')}",
+            "Email": r.get('email', ''),
+            "Cell": format_phone_number(r.get('cell', '')),
+            "Island": r.get('island', ''),
+            "Settlement": r.get('settlement', ''),
+            "Street": r.get('street_address', ''),
+            "Confirmed": "✅" if r.get('confirmed') else "❌"
+        } for r in results]),
+        hide_index=True,
+        use_container_width=True
+    )
+
+    col_prev, col_next = st.columns(2)
+    with col_prev:
+        if page > 1 and st.button("← Previous results"):
+            st.session_state.registration_search_page = page - 1
+            st.rerun()
+    with col_next:
+        if page < page_count and st.button("Next results →"):
+            st.session_state.registration_search_page = page + 1
+            st.rerun()
+    st.session_state.registration_search_page = page
+
+def show_registrations_grid(registrations):
+    """Show one page of registrations in AgGrid, pushing sort/filter/paging down to SQL"""
+    import pandas as pd
+    from st_aggrid import AgGrid, GridOptionsBuilder
     
-    with tab2:
-        st.markdown("### 🗺️ Registration Map View")
-        
-        located_registrations = []
-        if engine is not None:
-            try:
-                with engine.begin() as conn:
-                    result = conn.execute(
-                        text("""
-                            SELECT first_name, last_name, island, settlement, street_address,
-                                   latitude, longitude, location_source, confirmed
-                            FROM registration_form 
-                            WHERE latitude IS NOT NULL AND longitude IS NOT NULL
-                        """)
-                    )
-                    located_registrations = result.mappings().fetchall()
-            except Exception as e:
-                st.error(f"Error loading location data: {e}")
+    grid_state = st.session_state.get("registrations_grid_state")
+    filter_model, sort_model = grid_state_models(grid_state)
+
+    col_size, col_page, col_total = st.columns([1, 1, 2])
+    with col_size:
+        page_size = st.selectbox("Rows per page", [25, 50, 100, 250], key="registrations_grid_page_size")
+
+    if engine is not None:
+        try:
+            total = count_registrations(engine, filter_model)
+        except Exception as e:
+            st.error(f"Error loading registrations: {e}")
+            return
+    else:
+        total = len(registrations)
+
+    page_count = max(math.ceil(total / page_size), 1)
+    if st.session_state.pop("registrations_grid_reset_page", False):
+        st.session_state.registrations_grid_page = 1
+    st.session_state.registrations_grid_page = min(st.session_state.registrations_grid_page, page_count)
+    with col_page:
+        page = st.number_input("Page", min_value=1, max_value=page_count, key="registrations_grid_page")
+    with col_total:
+        st.caption(f"{total} matching registration(s) · page {page} of {page_count}")
+
+    if engine is not None:
+        rows = fetch_registrations_page(engine, filter_model, sort_model, page, page_size)
+    else:
+        rows = [{field: r.get(field) for field in GRID_COLUMNS} for r in registrations]
+        rows = rows[(page - 1) * page_size:page * page_size]
+
+    df = pd.DataFrame(rows, columns=list(GRID_COLUMNS.keys()))
+    df["confirmed"] = df["confirmed"].map(lambda v: "✅" if v else "❌")
+    df["cell"] = df["cell"].map(format_phone_number)
+
+    selected_ids = set(st.session_state.get("selected_registrations", []))
+    page_ids = [int(i) for i in df["id"].tolist()]
+
+    gb = GridOptionsBuilder.from_dataframe(df)
+    for field, (header, filter_type) in GRID_COLUMNS.items():
+        filter_name = {"text": "agTextColumnFilter", "number": "agNumberColumnFilter", "date": "agDateColumnFilter"}.get(filter_type, False)
+        gb.configure_column(field, header_name=header, filter=filter_name, sortable=True)
+    gb.configure_selection(
+        "multiple",
+        use_checkbox=True,
+        header_checkbox=True,
+        pre_selected_rows=[i for i, row_id in enumerate(page_ids) if row_id in selected_ids]
+    )
+    grid_options = gb.build()
+    if grid_state:
+        # Re-apply the user's sort/filter so the grid matches the SQL-ordered page
+        # Merge: configure_selection put this page's rowSelection in initialState
+        grid_options.setdefault("initialState", {}).update(
+            {k: v for k, v in grid_state.items() if k in ("sort", "filter")}
+        )
+
+    # A new key per page/sort/filter starts a fresh component, so a stale response
+    # from the previous page can never overwrite this page's selection
+    state_key = json.dumps([filter_model, sort_model, page, page_size], sort_keys=True, default=str)
+    response = AgGrid(
+        df,
+        gridOptions=grid_options,
+        update_on=["selectionChanged", "sortChanged", "filterChanged"],
+        height=420,
+        key=f"registrations_grid_{hashlib.md5(state_key.encode()).hexdigest()[:12]}",
+        show_download_button=False
+    )
+
+    if response.grid_state is not None:
+        new_filter_model, new_sort_model = grid_state_models(response.grid_state)
+        if (new_filter_model, new_sort_model) != (filter_model, sort_model):
+            st.session_state.registrations_grid_state = response.grid_state
+            st.session_state.registrations_grid_reset_page = True
+            st.rerun()
+
+        selected_rows = response.selected_rows
+        selected_on_page = set() if selected_rows is None else {int(i) for i in selected_rows["id"].tolist()}
+        selected_ids = (selected_ids - set(page_ids)) | selected_on_page
+        st.session_state.selected_registrations = sorted(selected_ids)
+
+    if selected_ids:
+        st.warning(f"⚠️ {len(selected_ids)} registration(s) selected for deletion")
+        col_delete, col_clear = st.columns(2)
+        with col_delete:
+            if st.button("🗑️ Delete Selected", type="secondary"):
+                deleted_count = delete_registrations(sorted(selected_ids))
+                st.session_state.selected_registrations = []
+                if deleted_count:
+                    st.success(f"✅ Successfully deleted {deleted_count} registration(s)")
+                    st.rerun()
+                else:
+                    st.error("❌ Failed to delete registrations")
+        with col_clear:
+            if st.button("✖️ Clear Selection"):
+                st.session_state.selected_registrations = []
+                st.rerun()
+
+# =============================
+# ADMIN DASHBOARD TABS
+# =============================
+# Each tab is a fragment: its widgets rerun only that tab, against the data
+# passed in from the last full run. Actions that change registrations call
+# st.rerun() so every tab reloads.
+@st.fragment
+def registrations_tab(dashboard_data):
+    """Counts, search, paged grid and the details of one registration"""
+    st.markdown("### 📋 All Registrations")
+
+    count = dashboard_data["count"]
+    confirmed_count = dashboard_data["confirmed_count"]
+    st.metric("Total Registrations", count)
+    st.metric("Confirmed Registrations", confirmed_count)
+
+    if count > 0:
+        registrations = dashboard_data["registrations"]
+
+        show_registration_search()
+
+        # Paged grid with delete checkboxes (sort, filter and paging run in SQL)
+        if registrations:
+            show_registrations_grid(registrations)
+
+            # Show detailed view
+            st.markdown("### 👤 Registration Details")
+            directory = dashboard_data["directory"]
+            selected_id = st.selectbox(
+                "Select registration to view details:",
+                options=list(directory.keys()),
+                format_func=lambda x: f"ID {x}: {directory.get(x, 'Unknown')}"
+            )
+
+            if selected_id:
+                # Only the selected record is loaded in full
+                selected_reg = get_registration_by_id(selected_id)
+                if selected_reg:
+                    col1, col2 = st.columns(2)
+
+                    with col1:
+                        st.markdown("#### Personal Information")
+                        st.write(f"**Name:** {selected_reg.get('first_name', '')} {selected_reg.get('last_name', '')}")
+                        st.write(f"**Email:** {selected_reg.get('email', '')}")
+                        st.write(f"**Cell:** {format_phone_number(selected_reg.get('cell', ''))}")
+                        if selected_reg.get('telephone'):
+                            st.write(f"**Telephone:** {format_phone_number(selected_reg.get('telephone', ''))}")
+
+                        st.markdown("#### Address")
+                        st.write(f"**Island:** {selected_reg.get('island', '')}")
+                        st.write(f"**Settlement:** {selected_reg.get('settlement', '')}")
+                        st.write(f"**Street:** {selected_reg.get('street_address', '')}")
+
+                    with col2:
+                        st.markdown("#### Preferences")
+                        st.write(f"**Communication:** {format_array_for_display(selected_reg.get('communication_methods'))}")
+                        st.write(f"**Interview:** {format_array_for_display(selected_reg.get('interview_methods'))}")
+                        st.write(f"**Days:** {format_array_for_display(selected_reg.get('available_days'))}")
+                        st.write(f"**Times:** {format_array_for_display(selected_reg.get('available_times'))}")
+
+                        st.markdown("#### Location Data")
+                        if selected_reg.get('latitude') and selected_reg.get('longitude'):
+                            st.write(f"**Coordinates:** {selected_reg.get('latitude'):.6f}, {selected_reg.get('longitude'):.6f}")
+                            st.write(f"**Source:** {selected_reg.get('location_source', 'unknown')}")
+                            if selected_reg.get('gps_accuracy'):
+                                st.write(f"**Accuracy:** {selected_reg.get('gps_accuracy')}m")
+                        else:
+                            st.write("**Coordinates:** Not set")
+
+                        st.write(f"**Created:** {selected_reg.get('created_at', 'Unknown')}")
+                        st.write(f"**Confirmed:** {'✅ Yes' if selected_reg.get('confirmed') else '❌ No'}")
+
         else:
-            located_registrations = [
-                r for r in st.session_state.get("registration_data", {}).values() 
-                if r.get('latitude') and r.get('longitude')
-            ]
-        
-        if located_registrations:
-            # Create map centered on The Bahamas
-            m = folium.Map(location=[25.0343, -77.3963], zoom_start=7, tiles='OpenStreetMap')
-            
-            # Add markers for each registration
+            st.info("📭 No registrations found")
+    else:
+        st.info("📭 No registrations in the system")
+
+@st.fragment
+def registration_map_tab(located_registrations):
+    """Map of every registration with coordinates"""
+    st.markdown("### 🗺️ Registration Map View")
+
+    if located_registrations:
+        import folium
+        from streamlit_folium import folium_static
+
+        # Create map centered on The Bahamas
+        tiles, attribution = get_map_tiles()
+        m = folium.Map(location=[25.0343, -77.3963], zoom_start=7, tiles=tiles, attr=attribution)
+
+        # Add markers for each registration
+        for reg in located_registrations:
+            lat = reg.get('latitude')
+            lon = reg.get('longitude')
+
+            if lat and lon:
+                # Different colors for confirmed vs unconfirmed
+                color = 'green' if reg.get('confirmed') else 'blue'
+                icon = 'ok-sign' if reg.get('confirmed') else 'info-sign'
+
+                popup_text = f"""
+                <b>{reg.get('first_name', '')} {reg.get('last_name', '')}</b><br>
+                <i>{reg.get('island', '')}, {reg.get('settlement', '')}</i><br>
+                {reg.get('street_address', '')}<br>
+                Status: {'✅ Confirmed' if reg.get('confirmed') else '❌ Pending'}
+                """
+
+                folium.Marker(
+                    [lat, lon],
+                    popup=folium.Popup(popup_text, max_width=300),
+                    tooltip=f"{reg.get('first_name', '')} {reg.get('last_name', '')}",
+                    icon=folium.Icon(color=color, icon=icon)
+                ).add_to(m)
+
+        # Display the map
+        folium_static(m, width=800, height=600)
+
+        st.markdown("#### 📊 Location Statistics")
+        col1, col2, col3 = st.columns(3)
+
+        with col1:
+            st.metric("Located Registrations", len(located_registrations))
+
+        with col2:
+            confirmed_located = len([r for r in located_registrations if r.get('confirmed')])
+            st.metric("Confirmed & Located", confirmed_located)
+
+        with col3:
+            sources = {}
             for reg in located_registrations:
-                lat = reg.get('latitude')
-                lon = reg.get('longitude')
-                
-                if lat and lon:
-                    # Different colors for confirmed vs unconfirmed
-                    color = 'green' if reg.get('confirmed') else 'blue'
-                    icon = 'ok-sign' if reg.get('confirmed') else 'info-sign'
-                    
-                    popup_text = f"""
-                    <b>{reg.get('first_name', '')} {reg.get('last_name', '')}</b><br>
-                    <i>{reg.get('island', '')}, {reg.get('settlement', '')}</i><br>
-                    {reg.get('street_address', '')}<br>
-                    Status: {'✅ Confirmed' if reg.get('confirmed') else '❌ Pending'}
-                    """
-                    
-                    folium.Marker(
-                        [lat, lon],
-                        popup=folium.Popup(popup_text, max_width=300),
-                        tooltip=f"{reg.get('first_name', '')} {reg.get('last_name', '')}",
-                        icon=folium.Icon(color=color, icon=icon)
-                    ).add_to(m)
-            
-            # Display the map
-            folium_static(m, width=800, height=600)
-            
-            st.markdown("#### 📊 Location Statistics")
-            col1, col2, col3 = st.columns(3)
-            
-            with col1:
-                st.metric("Located Registrations", len(located_registrations))
-            
-            with col2:
-                confirmed_located = len([r for r in located_registrations if r.get('confirmed')])
-                st.metric("Confirmed & Located", confirmed_located)
-            
-            with col3:
-                sources = {}
-                for reg in located_registrations:
-                    source = reg.get('location_source', 'unknown')
-                    sources[source] = sources.get(source, 0) + 1
-                
-                if sources:
-                    main_source = max(sources.items(), key=lambda x: x[1])
-                    st.metric("Main Source", f"{main_source[0]} ({main_source[1]})")
-        
+                source = reg.get('location_source', 'unknown')
+                sources[source] = sources.get(source, 0) + 1
+
+            if sources:
+                main_source = max(sources.items(), key=lambda x: x[1])
+                st.metric("Main Source", f"{main_source[0]} ({main_source[1]})")
+
+    else:
+        st.info("🗺️ No registrations with location data available")
+
+@st.fragment
+def database_tab(dashboard_data):
+    """Connection status, record counts and maintenance actions"""
+    st.markdown("### ⚙️ Database Management")
+
+    col1, col2 = st.columns(2)
+
+    with col1:
+        st.markdown("#### Database Status")
+        if engine is None:
+            st.error("❌ No database connection")
+            st.write("**Mode:** In-memory storage only")
         else:
-            st.info("🗺️ No registrations with location data available")
-    
-    with tab3:
-        st.markdown("### ⚙️ Database Management")
-        
-        col1, col2 = st.columns(2)
-        
-        with col1:
-            st.markdown("#### Database Status")
-            if engine is None:
-                st.error("❌ No database connection")
-                st.write("**Mode:** In-memory storage only")
-            else:
-                st.success(f"✅ Connected to {db_type}")
-                st.write(f"**Type:** {db_type}")
-                
-                if db_type == "PostgreSQL":
-                    if "render.com" in str(engine.url):
-                        st.write("**Host:** Render PostgreSQL")
-                    else:
-                        st.write("**Host:** Local PostgreSQL")
+            st.success(f"✅ Connected to {db_type}")
+            st.write(f"**Type:** {db_type}")
+
+            if db_type == "PostgreSQL":
+                if "render.com" in str(engine.url):
+                    st.write("**Host:** Render PostgreSQL")
                 else:
-                    st.write("**Host:** SQLite file")
-            
-            # Database statistics
-            if engine is not None:
-                try:
-                    with engine.begin() as conn:
-                        result = conn.execute(text("SELECT COUNT(*) FROM registration_form"))
-                        total_count = result.scalar()
-                        
-                        result_confirmed = conn.execute(text("SELECT COUNT(*) FROM registration_form WHERE confirmed = TRUE"))
-                        confirmed_count = result_confirmed.scalar()
-                        
-                        result_located = conn.execute(text("SELECT COUNT(*) FROM registration_form WHERE latitude IS NOT NULL"))
-                        located_count = result_located.scalar()
-                    
-                    st.metric("Total Records", total_count)
-                    st.metric("Confirmed", confirmed_count)
-                    st.metric("With Location", located_count)
-                    
-                except Exception as e:
-                    st.error(f"Error getting statistics: {e}")
-        
-        with col2:
-            st.markdown("#### Maintenance Actions")
-            
-            if st.button("🔄 Initialize/Restore Tables", use_container_width=True):
-                if restore_tables():
-                    st.success("✅ Tables restored successfully")
+                    st.write("**Host:** Local PostgreSQL")
+            else:
+                st.write("**Host:** SQLite file")
+
+        # Database statistics
+        if engine is not None:
+            st.metric("Total Records", dashboard_data["count"])
+            st.metric("Confirmed", dashboard_data["confirmed_count"])
+            st.metric("With Location", dashboard_data["located_count"])
+
+    with col2:
+        st.markdown("#### Maintenance Actions")
+
+        if st.button("🔄 Initialize/Restore Tables", use_container_width=True):
+            if restore_tables():
+                st.success("✅ Tables restored successfully")
+                st.rerun()
+            else:
+                st.error("❌ Failed to restore tables")
+
+        if st.button("🔧 Fix Schema", use_container_width=True):
+            if fix_database_schema():
+                st.success("✅ Schema fixed successfully")
+                st.rerun()
+            else:
+                st.error("❌ Failed to fix schema")
+
+        if st.button("📤 Export Data", use_container_width=True):
+            export_data()
+
+        if engine is not None and st.button("📞 Normalize Contacts", use_container_width=True):
+            with st.spinner("Normalizing phone numbers and emails..."):
+                counts = backfill_contact_columns(engine)
+            st.success(f"✅ Normalized {counts['updated']} registration(s)")
+            if counts["invalid"]:
+                st.warning(f"⚠️ {counts['invalid']} registration(s) have a phone or email that could not be parsed")
+            if counts["updated"]:
+                st.rerun()
+
+        if TILE_CACHE_PORT:
+            seed_jobs = get_tile_seed_jobs()
+            seed_job = seed_jobs.get("islands")
+            seeding = seed_job is not None and seed_job.is_alive()
+            if st.button("🗺️ Pre-seed Map Tiles", use_container_width=True, disabled=seeding):
+                from tile_cache import SeedJob
+                seed_job = SeedJob(get_tile_cache(), ISLAND_CENTERS, get_island_zoom_level)
+                seed_job.start()
+                seed_jobs["islands"] = seed_job
+                seeding = True
+                st.info("🗺️ Downloading map tiles for every island in the background")
+            if seed_job is not None:
+                if seed_job.error:
+                    st.warning(f"⚠️ Tile seeding stopped: {seed_job.error}")
+                elif seeding:
+                    st.caption(f"🗺️ Seeding tiles: {seed_job.islands_done} / {seed_job.islands_total} islands, {seed_job.tiles_fetched} new tiles")
                 else:
-                    st.error("❌ Failed to restore tables")
-            
-            if st.button("🔧 Fix Schema", use_container_width=True):
-                if fix_database_schema():
-                    st.success("✅ Schema fixed successfully")
+                    st.caption(f"🗺️ Last seeding cached {seed_job.tiles_fetched} new tiles")
+            stats = get_tile_cache().stats()
+            st.caption(f"🗺️ Tile cache: {stats['tiles']} tiles, {stats['size_mb']} / {stats['max_mb']} MB")
+
+        if st.button("🧹 Clear All Data", use_container_width=True, type="secondary"):
+            st.warning("⚠️ This will delete ALL registration data permanently!")
+            if st.checkbox("I understand this action cannot be undone"):
+                if clear_all_data():
+                    st.success("✅ All data cleared successfully")
+                    st.rerun()
                 else:
-                    st.error("❌ Failed to fix schema")
-            
-            if st.button("📤 Export Data", use_container_width=True):
-                export_data()
-            
-            if st.button("🧹 Clear All Data", use_container_width=True, type="secondary"):
-                st.warning("⚠️ This will delete ALL registration data permanently!")
-                if st.checkbox("I understand this action cannot be undone"):
-                    if clear_all_data():
-                        st.success("✅ All data cleared successfully")
+                    st.error("❌ Failed to clear data")
+
+@st.fragment
+def delete_management_tab():
+    """Bulk deletion by criteria"""
+    st.markdown("### 🗑️ Delete Management")
+
+    st.warning("⚠️ **Danger Zone** - Use with caution!")
+
+    col1, col2 = st.columns(2)
+
+    with col1:
+        st.markdown("#### Delete by Criteria")
+
+        delete_option = st.selectbox(
+            "Select deletion criteria:",
+            [
+                "Select...",
+                "Unconfirmed registrations only",
+                "Registrations without location data",
+                "Registrations older than...",
+                "All registrations"
+            ]
+        )
+
+        if delete_option == "Registrations older than...":
+            days_old = st.number_input("Delete registrations older than (days):", min_value=1, value=7)
+
+        if st.button("🗑️ Delete by Criteria", type="secondary", use_container_width=True):
+            if delete_option != "Select...":
+                count = delete_registrations_by_criteria(delete_option, days_old if 'days_old' in locals() else None)
+                if count is not None:
+                    if count > 0:
+                        st.success(f"✅ Deleted {count} registration(s)")
                         st.rerun()
                     else:
-                        st.error("❌ Failed to clear data")
+                        st.info("ℹ️ No registrations matched the criteria")
+            else:
+                st.error("❌ Please select deletion criteria")
+
+    with col2:
+        st.markdown("#### Quick Actions")
+
+        if st.button("🗑️ Delete All Unconfirmed", use_container_width=True, type="secondary"):
+            count = delete_registrations_by_criteria("Unconfirmed registrations only")
+            if count is not None and count > 0:
+                st.success(f"✅ Deleted {count} unconfirmed registration(s)")
+                st.rerun()
+            else:
+                st.info("ℹ️ No unconfirmed registrations found")
+
+        if st.button("🗑️ Delete Without Location", use_container_width=True, type="secondary"):
+            count = delete_registrations_by_criteria("Registrations without location data")
+            if count is not None and count > 0:
+                st.success(f"✅ Deleted {count} registration(s) without location")
+                st.rerun()
+            else:
+                st.info("ℹ️ No registrations without location data")
+
+def admin_dashboard():
+    if not st.session_state.get("admin_logged_in"):
+        st.error("❌ Access denied. Please log in.")
+        st.session_state.page = "admin_login"
+        st.rerun()
+        return
     
+    st.title("📊 Admin Dashboard")
+    
+    tab1, tab2, tab3, tab4, tab5, tab6, tab7 = st.tabs([
+        "📋 Registrations", "🗺️ Map View", "⚙️ Database", "🗑️ Delete Management", "👥 Duplicates",
+        "📅 Interviews", "🧭 Routes"
+    ])
+    
+    # One watermark query per full rerun; rows are only re-read when the table changes.
+    # Interactions inside a tab rerun just that tab's fragment.
+    dashboard_data = get_dashboard_data()
+
+    with tab1:
+        registrations_tab(dashboard_data)
+
+    with tab2:
+        registration_map_tab(dashboard_data["located"])
+
+    with tab3:
+        database_tab(dashboard_data)
+
     with tab4:
-        st.markdown("### 🗑️ Delete Management")
-        
-        st.warning("⚠️ **Danger Zone** - Use with caution!")
-        
-        col1, col2 = st.columns(2)
-        
-        with col1:
-            st.markdown("#### Delete by Criteria")
-            
-            delete_option = st.selectbox(
-                "Select deletion criteria:",
-                [
-                    "Select...",
-                    "Unconfirmed registrations only",
-                    "Registrations without location data",
-                    "Registrations older than...",
-                    "All registrations"
-                ]
-            )
-            
-            if delete_option == "Registrations older than...":
-                days_old = st.number_input("Delete registrations older than (days):", min_value=1, value=7)
-            
-            if st.button("🗑️ Delete by Criteria", type="secondary", use_container_width=True):
-                if delete_option != "Select...":
-                    count = delete_registrations_by_criteria(delete_option, days_old if 'days_old' in locals() else None)
-                    if count is not None:
-                        if count > 0:
-                            st.success(f"✅ Deleted {count} registration(s)")
-                            st.rerun()
-                        else:
-                            st.info("ℹ️ No registrations matched the criteria")
-                else:
-                    st.error("❌ Please select deletion criteria")
-        
-        with col2:
-            st.markdown("#### Quick Actions")
-            
-            if st.button("🗑️ Delete All Unconfirmed", use_container_width=True, type="secondary"):
-                count = delete_registrations_by_criteria("Unconfirmed registrations only")
-                if count is not None and count > 0:
-                    st.success(f"✅ Deleted {count} unconfirmed registration(s)")
-                    st.rerun()
-                else:
-                    st.info("ℹ️ No unconfirmed registrations found")
-            
-            if st.button("🗑️ Delete Without Location", use_container_width=True, type="secondary"):
-                count = delete_registrations_by_criteria("Registrations without location data")
-                if count is not None and count > 0:
-                    st.success(f"✅ Deleted {count} registration(s) without location")
-                    st.rerun()
-                else:
-                    st.info("ℹ️ No registrations without location data")
+        delete_management_tab()
+
+    with tab5:
+        show_duplicate_suggestions()
+
+    with tab6:
+        show_interview_scheduler(dashboard_data["registrations"])
+
+    with tab7:
+        show_route_planner(dashboard_data["located"])
     
     st.divider()
     
@@ -2367,6 +3076,28 @@ def delete_registration(registration_id):
             return True
         return False
 
+def delete_registrations(registration_ids):
+    """Delete several registrations by id in one statement"""
+    if not registration_ids:
+        return 0
+    if engine is not None:
+        try:
+            with engine.begin() as conn:
+                result = conn.execute(
+                    text("DELETE FROM registration_form WHERE id IN :ids").bindparams(bindparam("ids", expanding=True)),
+                    {"ids": list(registration_ids)}
+                )
+                return result.rowcount
+        except Exception as e:
+            st.error(f"Delete error: {e}")
+            return 0
+    else:
+        deleted_count = 0
+        for registration_id in registration_ids:
+            if st.session_state.get("registration_data", {}).pop(registration_id, None) is not None:
+                deleted_count += 1
+        return deleted_count
+
 def delete_registrations_by_criteria(criteria, days_old=None):
     """Delete registrations based on criteria"""
     if engine is not None:
@@ -2435,6 +3166,8 @@ def clear_all_data():
 
 def export_data():
     """Export registration data to CSV"""
+    import pandas as pd
+    
     registrations = get_all_registrations()
     if not registrations:
         st.info("📭 No data to export")
@@ -2448,8 +3181,8 @@ def export_data():
             "First Name": reg.get('first_name', ''),
             "Last Name": reg.get('last_name', ''),
             "Email": reg.get('email', ''),
-            "Cell": reg.get('cell', ''),
-            "Telephone": reg.get('telephone', ''),
+            "Cell": format_phone_number(reg.get('cell', '')),
+            "Telephone": format_phone_number(reg.get('telephone', '')),
             "Communication Methods": format_array_for_display(reg.get('communication_methods')),
             "Island": reg.get('island', ''),
             "Settlement": reg.get('settlement', ''),
@@ -2485,9 +3218,17 @@ def export_data():
 # MAIN APPLICATION
 # =============================
 def main():
-    # Initialize database if needed
-    if engine is not None and not st.session_state.get("database_initialized"):
-        initialize_database()
+    current_page = st.session_state.get("page", "landing")
+
+    # Connect and initialize the database only for pages that use it
+    if current_page not in PAGES_WITHOUT_DATABASE:
+        connect_database()
+        if engine is None:
+            st.warning("⚠️ Running in offline mode - data will be stored temporarily in browser")
+        elif not st.session_state.get("database_initialized"):
+            initialize_database()
+        else:
+            check_database_schema()
     
     # Page routing
     pages = {
@@ -2500,8 +3241,6 @@ def main():
         "admin_dashboard": admin_dashboard
     }
     
-    current_page = st.session_state.get("page", "landing")
-    
     # Display the current page
     if current_page in pages:
         pages[current_page]()
@@ -0,0 +1,137 @@
+# routing.py - Offline visiting-order planner for enumerator day sheets
+#
+# Builds a haversine distance matrix over the day's stops, seeds a route with
+# nearest-neighbour from the start point, then improves it with 2-opt segment
+# reversals until no reversal shortens it. Routes are open paths: the
+# enumerator does not need to return to the start.
+
+import html
+import numpy as np
+
+EARTH_RADIUS_KM = 6371.0
+MAX_TWO_OPT_PASSES = 50
+
+# =============================
+# DISTANCES
+# =============================
+def haversine_matrix(coords):
+    """Pairwise great-circle distances in km for an N x 2 array of lat/lon degrees"""
+    lat = np.radians(coords[:, 0])
+    lon = np.radians(coords[:, 1])
+    dlat = lat[:, None] - lat[None, :]
+    dlon = lon[:, None] - lon[None, :]
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat)[:, None] * np.cos(lat)[None, :] * np.sin(dlon / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+# =============================
+# ROUTE CONSTRUCTION
+# =============================
+def nearest_neighbour_route(dist, start=0):
+    """Greedy route: always walk to the closest unvisited stop"""
+    n = len(dist)
+    visited = np.zeros(n, dtype=bool)
+    route = [start]
+    visited[start] = True
+    for _ in range(n - 1):
+        candidates = np.where(visited, np.inf, dist[route[-1]])
+        nxt = int(np.argmin(candidates))
+        route.append(nxt)
+        visited[nxt] = True
+    return np.array(route)
+
+def two_opt(route, dist):
+    """Improve an open route (first stop fixed) by reversing segments while it gets shorter"""
+    route = route.copy()
+    n = len(route)
+    if n < 4:
+        return route
+    for _ in range(MAX_TWO_OPT_PASSES):
+        improved = False
+        for i in range(1, n - 1):
+            a, b = route[i - 1], route[i]
+            # Reverse route[i..j] for every j > i at once
+            c = route[i + 1:]
+            d = np.append(route[i + 2:], -1)
+            removed = dist[a, b] + np.where(d >= 0, dist[c, np.maximum(d, 0)], 0.0)
+            added = dist[a, c] + np.where(d >= 0, dist[b, np.maximum(d, 0)], 0.0)
+            delta = added - removed
+            k = int(np.argmin(delta))
+            if delta[k] < -1e-9:
+                j = i + 1 + k
+                route[i:j + 1] = route[i:j + 1][::-1]
+                improved = True
+        if not improved:
+            break
+    return route
+
+def route_length(route, dist):
+    return float(dist[route[:-1], route[1:]].sum()) if len(route) > 1 else 0.0
+
+def plan_route(stops, start=None):
+    """Order stops (dicts with latitude/longitude) into a short visiting route.
+
+    start is an optional (lat, lon) the enumerator sets out from; otherwise the
+    route starts at the first stop. Returns (ordered stops with leg_km and
+    cumulative_km, total km).
+    """
+    if not stops:
+        return [], 0.0
+
+    coords = np.array([[s["latitude"], s["longitude"]] for s in stops], dtype=float)
+    if start is not None:
+        coords = np.vstack([np.array(start, dtype=float), coords])
+    dist = haversine_matrix(coords)
+
+    route = two_opt(nearest_neighbour_route(dist, 0), dist)
+    legs = np.concatenate([[0.0], dist[route[:-1], route[1:]]])
+    cumulative = np.cumsum(legs)
+
+    offset = 1 if start is not None else 0
+    ordered = []
+    for node, leg, total in zip(route, legs, cumulative):
+        if node < offset:
+            continue
+        ordered.append({
+            **stops[node - offset],
+            "stop": len(ordered) + 1,
+            "leg_km": round(float(leg), 2),
+            "cumulative_km": round(float(total), 2),
+        })
+    return ordered, round(route_length(route, dist), 2)
+
+# =============================
+# DAY SHEET
+# =============================
+def day_sheet_html(title, ordered_stops, total_km):
+    """Printable HTML day sheet for a planned route"""
+    rows = "\n".join(
+        "<tr>" + "".join(f"<td>{html.escape(str(value))}</td>" for value in (
+            stop["stop"],
+            stop.get("time_slot") or "",
+            stop.get("name") or "",
+            stop.get("cell") or "",
+            ", ".join(part for part in (stop.get("street_address"), stop.get("settlement")) if part),
+            f"{stop['latitude']:.5f}, {stop['longitude']:.5f}",
+            stop["leg_km"],
+            stop["cumulative_km"],
+        )) + "<td></td></tr>"
+        for stop in ordered_stops
+    )
+    return f"""<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>{html.escape(title)}</title>
+<style>
+body {{ font-family: Arial, sans-serif; font-size: 12px; margin: 20px; }}
+h1 {{ font-size: 18px; margin-bottom: 4px; }}
+table {{ border-collapse: collapse; width: 100%; }}
+th, td {{ border: 1px solid #999; padding: 4px 6px; text-align: left; }}
+th {{ background: #2e7d32; color: white; }}
+tr:nth-child(even) {{ background: #f1f8e9; }}
+@media print {{ body {{ margin: 0; }} }}
+</style></head><body>
+<h1>{html.escape(title)}</h1>
+<p>{len(ordered_stops)} stops &middot; {total_km} km straight-line route</p>
+<table>
+<tr><th>#</th><th>Time</th><th>Farmer</th><th>Cell</th><th>Address</th><th>GPS</th><th>Leg km</th><th>Total km</th><th>Done</th></tr>
+{rows}
+</table>
+</body></html>"""
@@ -0,0 +1,139 @@
+# scheduling.py - Weekly interview calendar for confirmed registrations
+#
+# Each farmer's availability is a 28-bit day x slot mask (bit = day * 4 + slot).
+# In-person interviews draw on the enumerator capacity of the farmer's island;
+# phone interviews draw on a shared call-centre pool. The solver is greedy:
+# most constrained farmers first, each into their available slot with the most
+# spare capacity, which spreads load across the week.
+
+from datetime import date, timedelta
+import numpy as np
+
+# =============================
+# CALENDAR ENCODING
+# =============================
+DAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+TIME_SLOTS = ["Morning (7-10am)", "Midday (11-1pm)", "Afternoon (2-5pm)", "Evening (6-8pm)"]
+SLOT_COUNT = len(DAYS) * len(TIME_SLOTS)
+
+IN_PERSON = "In-person Interview"
+PHONE = "Phone Interview"
+SELF_REPORTING = "Self Reporting"
+
+PHONE_POOL = "Phone"
+
+def availability_mask(available_days, available_times):
+    """Encode the chosen days x time slots as one integer bitmask"""
+    mask = 0
+    for day in available_days or []:
+        if day not in DAYS:
+            continue
+        for time_slot in available_times or []:
+            if time_slot in TIME_SLOTS:
+                mask |= 1 << (DAYS.index(day) * len(TIME_SLOTS) + TIME_SLOTS.index(time_slot))
+    return mask
+
+def mask_slots(mask):
+    """Slot indexes set in a mask, as a NumPy array"""
+    return np.flatnonzero((mask >> np.arange(SLOT_COUNT)) & 1)
+
+def slot_label(slot):
+    day, time_slot = divmod(int(slot), len(TIME_SLOTS))
+    return DAYS[day], TIME_SLOTS[time_slot]
+
+def next_week_start(today=None):
+    """The Monday after today"""
+    today = today or date.today()
+    return today + timedelta(days=7 - today.weekday())
+
+# =============================
+# SOLVER
+# =============================
+def interview_pool(registration, pools):
+    """Capacity pool a registration draws on, or None if no interview is needed.
+
+    In-person is preferred; farmers who also accept a phone interview fall back
+    to the phone pool when their island has no enumerators.
+    """
+    methods = registration.get("interview_methods") or []
+    island = registration.get("island")
+    if IN_PERSON in methods and pools.get(island):
+        return island
+    if PHONE in methods:
+        return PHONE_POOL
+    if IN_PERSON in methods:
+        return island
+    return None
+
+def build_schedule(registrations, agents_per_island, phone_agents, interviews_per_slot, week_start=None):
+    """Assign confirmed registrations to interview slots for one week.
+
+    agents_per_island maps island -> in-person enumerators; phone_agents staff the
+    phone pool; each agent can hold interviews_per_slot interviews in one time slot.
+    Returns (scheduled, unscheduled) lists of dicts.
+    """
+    week_start = week_start or next_week_start()
+    pools = {island: agents for island, agents in agents_per_island.items() if agents > 0}
+    if phone_agents > 0:
+        pools[PHONE_POOL] = phone_agents
+    pool_index = {pool: i for i, pool in enumerate(pools)}
+    # remaining[pool, slot] = interviews still available in that slot
+    remaining = np.repeat(
+        (np.array(list(pools.values()), dtype=int) * interviews_per_slot).reshape(-1, 1), SLOT_COUNT, axis=1
+    )
+    booked = np.zeros_like(remaining)
+
+    candidates = []
+    unscheduled = []
+    for reg in registrations:
+        if not reg.get("confirmed"):
+            continue
+        pool = interview_pool(reg, pools)
+        if pool is None:
+            continue
+        mask = availability_mask(reg.get("available_days"), reg.get("available_times"))
+        if not mask:
+            unscheduled.append({**_summary(reg, pool), "reason": "No availability given"})
+            continue
+        if pool not in pool_index:
+            reason = "No phone agents" if pool == PHONE_POOL else "No enumerators on island"
+            unscheduled.append({**_summary(reg, pool), "reason": reason})
+            continue
+        candidates.append((bin(mask).count("1"), reg["id"], reg, pool, mask_slots(mask)))
+
+    # Fewest available slots first: they have the least room to move
+    candidates.sort(key=lambda c: (c[0], c[1]))
+
+    scheduled = []
+    for _, _, reg, pool, slots in candidates:
+        p = pool_index[pool]
+        spare = remaining[p, slots]
+        if spare.max() <= 0:
+            unscheduled.append({**_summary(reg, pool), "reason": "All available slots full"})
+            continue
+        slot = int(slots[np.argmax(spare)])
+        remaining[p, slot] -= 1
+        booked[p, slot] += 1
+
+        day, time_slot = slot_label(slot)
+        scheduled.append({
+            **_summary(reg, pool),
+            "date": week_start + timedelta(days=DAYS.index(day)),
+            "day": day,
+            "time_slot": time_slot,
+            # Spread a slot's interviews round-robin over that pool's agents
+            "agent": int((booked[p, slot] - 1) % pools[pool]) + 1,
+        })
+
+    scheduled.sort(key=lambda s: (s["date"], TIME_SLOTS.index(s["time_slot"]), s["pool"], s["agent"]))
+    return scheduled, unscheduled
+
+def _summary(reg, pool):
+    return {
+        "id": reg["id"],
+        "name": f"{reg.get('first_name', '')} {reg.get('last_name', '')}".strip(),
+        "island": reg.get("island"),
+        "cell": reg.get("cell"),
+        "method": PHONE if pool == PHONE_POOL else IN_PERSON,
+        "pool": pool,
+    }
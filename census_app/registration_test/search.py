@@ -0,0 +1,191 @@
+# search.py - Indexed full-text and fuzzy search over registrations
+#
+# PostgreSQL: pg_trgm (fuzzy / substring) and tsvector (word) GIN indexes over one
+# normalised search document per registration.
+# SQLite: an FTS5 trigram table kept in sync with registration_form by triggers.
+
+import re
+from sqlalchemy import text
+
+# =============================
+# SEARCH DOCUMENT
+# =============================
+# name, email, cell (digits only, so partial numbers match), settlement and street
+PG_SEARCH_DOCUMENT = """lower(
+    coalesce(first_name, '') || ' ' || coalesce(last_name, '') || ' ' ||
+    coalesce(email, '') || ' ' || regexp_replace(coalesce(cell, ''), '[^0-9]', '', 'g') || ' ' ||
+    coalesce(settlement, '') || ' ' || coalesce(street_address, '')
+)"""
+
+SQLITE_CELL_DIGITS = "replace(replace(replace(replace(replace(coalesce({row}.cell, ''), '(', ''), ')', ''), '-', ''), ' ', ''), '+', '')"
+
+SEARCH_COLUMNS = "r.id, r.first_name, r.last_name, r.email, r.cell, r.island, r.settlement, r.street_address, r.confirmed"
+
+MIN_TRIGRAM_TERM = 3
+
+_DIGITS_ONLY = re.compile(r"^[\d\s()+.-]+$")
+_NON_DIGITS = re.compile(r"\D")
+_TERM_SPLIT = re.compile(r"\s+")
+
+def normalize_query(query):
+    """Lowercase and trim a search box query; phone-looking queries are reduced to digits"""
+    query = (query or "").strip().lower()
+    if _DIGITS_ONLY.match(query):
+        return _NON_DIGITS.sub("", query)
+    return query
+
+# =============================
+# INDEX SETUP
+# =============================
+def _sqlite_document_values(row):
+    cell_digits = SQLITE_CELL_DIGITS.format(row=row)
+    return (
+        f"lower(coalesce({row}.first_name, '') || ' ' || coalesce({row}.last_name, ''))",
+        f"lower(coalesce({row}.email, '') || ' ' || {cell_digits})",
+        f"lower(coalesce({row}.settlement, '') || ' ' || coalesce({row}.street_address, ''))"
+    )
+
+def ensure_search_index(engine, db_type):
+    """Create the search indexes (idempotent); returns False if they could not be built"""
+    if db_type == "PostgreSQL":
+        with engine.begin() as conn:
+            try:
+                conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+                trigram_available = True
+            except Exception:
+                trigram_available = False
+
+        with engine.begin() as conn:
+            conn.execute(text(
+                f"CREATE INDEX IF NOT EXISTS idx_registration_search_tsv "
+                f"ON registration_form USING gin (to_tsvector('simple', {PG_SEARCH_DOCUMENT}))"
+            ))
+            if trigram_available:
+                conn.execute(text(
+                    f"CREATE INDEX IF NOT EXISTS idx_registration_search_trgm "
+                    f"ON registration_form USING gin (({PG_SEARCH_DOCUMENT}) gin_trgm_ops)"
+                ))
+        return trigram_available
+
+    name_new, contact_new, place_new = _sqlite_document_values("new")
+    name_src, contact_src, place_src = _sqlite_document_values("r")
+    try:
+        with engine.begin() as conn:
+            exists = conn.execute(text(
+                "SELECT name FROM sqlite_master WHERE type='table' AND name='registration_search'"
+            )).fetchone() is not None
+            if exists:
+                return True
+
+            conn.execute(text(
+                "CREATE VIRTUAL TABLE registration_search USING fts5(name, contact, place, tokenize='trigram')"
+            ))
+            conn.execute(text(f"""
+                INSERT INTO registration_search (rowid, name, contact, place)
+                SELECT r.id, {name_src}, {contact_src}, {place_src} FROM registration_form r
+            """))
+            conn.execute(text(f"""
+                CREATE TRIGGER IF NOT EXISTS registration_search_ai AFTER INSERT ON registration_form BEGIN
+                    INSERT INTO registration_search (rowid, name, contact, place)
+                    VALUES (new.id, {name_new}, {contact_new}, {place_new});
+                END
+            """))
+            conn.execute(text("""
+                CREATE TRIGGER IF NOT EXISTS registration_search_ad AFTER DELETE ON registration_form BEGIN
+                    DELETE FROM registration_search WHERE rowid = old.id;
+                END
+            """))
+            conn.execute(text(f"""
+                CREATE TRIGGER IF NOT EXISTS registration_search_au AFTER UPDATE ON registration_form BEGIN
+                    DELETE FROM registration_search WHERE rowid = old.id;
+                    INSERT INTO registration_search (rowid, name, contact, place)
+                    VALUES (new.id, {name_new}, {contact_new}, {place_new});
+                END
+            """))
+        return True
+    except Exception:
+        # SQLite builds older than 3.34 have no trigram tokenizer; search falls back to LIKE
+        return False
+
+# =============================
+# SEARCH API
+# =============================
+def _search_postgres(conn, query, limit, offset, fuzzy=True):
+    # Without pg_trgm only the word (tsvector) and substring matches are available
+    similarity_score = f"word_similarity(:q, {PG_SEARCH_DOCUMENT})," if fuzzy else ""
+    similarity_match = f"{PG_SEARCH_DOCUMENT} %> :q OR" if fuzzy else ""
+    result = conn.execute(text(f"""
+        SELECT {SEARCH_COLUMNS},
+               GREATEST(
+                   {similarity_score}
+                   ts_rank(to_tsvector('simple', {PG_SEARCH_DOCUMENT}), plainto_tsquery('simple', :q)),
+                   CASE WHEN {PG_SEARCH_DOCUMENT} LIKE :like THEN 1.0 ELSE 0 END
+               ) AS score,
+               COUNT(*) OVER () AS total
+        FROM registration_form r
+        WHERE {similarity_match}
+              {PG_SEARCH_DOCUMENT} LIKE :like
+           OR to_tsvector('simple', {PG_SEARCH_DOCUMENT}) @@ plainto_tsquery('simple', :q)
+        ORDER BY score DESC, r.id DESC
+        LIMIT :limit OFFSET :offset
+    """), {"q": query, "like": f"%{_escape_like(query)}%", "limit": limit, "offset": offset})
+    return [dict(row) for row in result.mappings()]
+
+def _search_sqlite_fts(conn, terms, limit, offset):
+    match = " AND ".join('"' + term.replace('"', '""') + '"' for term in terms)
+    result = conn.execute(text(f"""
+        WITH hits AS (
+            SELECT rowid AS id, bm25(registration_search) AS rank
+            FROM registration_search
+            WHERE registration_search MATCH :match
+        )
+        SELECT {SEARCH_COLUMNS}, -hits.rank AS score, COUNT(*) OVER () AS total
+        FROM hits
+        JOIN registration_form r ON r.id = hits.id
+        ORDER BY hits.rank, r.id DESC
+        LIMIT :limit OFFSET :offset
+    """), {"match": match, "limit": limit, "offset": offset})
+    return [dict(row) for row in result.mappings()]
+
+def _search_like(conn, query, limit, offset):
+    """Unindexed fallback for very short queries or databases without search indexes"""
+    result = conn.execute(text(f"""
+        SELECT {SEARCH_COLUMNS}, 0 AS score, COUNT(*) OVER () AS total
+        FROM registration_form r
+        WHERE lower(coalesce(r.first_name, '') || ' ' || coalesce(r.last_name, '') || ' ' ||
+                    coalesce(r.email, '') || ' ' || coalesce(r.cell, '') || ' ' ||
+                    coalesce(r.settlement, '') || ' ' || coalesce(r.street_address, '')) LIKE :like ESCAPE '\\'
+        ORDER BY r.id DESC
+        LIMIT :limit OFFSET :offset
+    """), {"like": f"%{_escape_like(query)}%", "limit": limit, "offset": offset})
+    return [dict(row) for row in result.mappings()]
+
+def _escape_like(value):
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+def search_registrations(engine, db_type, query, page=1, page_size=20, indexed=True):
+    """Ranked, paginated search; returns (rows, total) with best matches first.
+
+    indexed is the result of ensure_search_index(): without it PostgreSQL skips the
+    trigram similarity match and SQLite falls back to a LIKE scan.
+    """
+    query = normalize_query(query)
+    if not query:
+        return [], 0
+
+    limit = page_size
+    offset = max(page - 1, 0) * page_size
+    terms = [term for term in _TERM_SPLIT.split(query) if len(term) >= MIN_TRIGRAM_TERM]
+
+    with engine.begin() as conn:
+        if db_type == "PostgreSQL":
+            rows = _search_postgres(conn, query, limit, offset, fuzzy=indexed)
+        elif indexed and terms:
+            rows = _search_sqlite_fts(conn, terms, limit, offset)
+        else:
+            rows = _search_like(conn, query, limit, offset)
+
+    total = rows[0]["total"] if rows else 0
+    for row in rows:
+        row.pop("total", None)
+    return rows, total
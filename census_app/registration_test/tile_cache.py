@@ -0,0 +1,283 @@
+# tile_cache.py - Local map tile cache and proxy for field enumerators
+#
+# Serves OpenStreetMap tiles from a disk cache with LRU eviction so repeat map
+# loads on slow Family Island links are answered locally.
+#
+#   python tile_cache.py                 # serve on 127.0.0.1:8765
+#   NACP_TILE_PORT=8765 NACP_TILE_URL=/tiles/{z}/{x}/{y}.png streamlit run main_app.py
+#
+# The second form serves from inside the app; NACP_TILE_URL is the address
+# browsers load tiles from, e.g. a reverse-proxy path forwarding to the port.
+
+import os
+import math
+import time
+import threading
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+# =============================
+# SETTINGS
+# =============================
+OSM_TILE_URL = "https://tile.openstreetmap.org/{z}/{x}/{y}.png"
+OSM_ATTRIBUTION = '&copy; <a href="https://www.openstreetmap.org/copyright">OpenStreetMap</a> contributors'
+USER_AGENT = "NACP Bahamas Agricultural Census/1.0"
+
+DEFAULT_CACHE_DIR = os.getenv("NACP_TILE_CACHE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "tile_cache"))
+DEFAULT_MAX_BYTES = int(os.getenv("NACP_TILE_CACHE_MB", 512)) * 1024 * 1024
+DEFAULT_HOST = os.getenv("NACP_TILE_HOST", "127.0.0.1")
+DEFAULT_PORT = int(os.getenv("NACP_TILE_PORT", 8765))
+
+MAX_ZOOM = 19
+
+# =============================
+# TILE MATH
+# =============================
+def lat_lon_to_tile(lat, lon, zoom):
+    """Convert coordinates to slippy-map tile x/y at a zoom level"""
+    lat_rad = math.radians(lat)
+    n = 2 ** zoom
+    x = int((lon + 180.0) / 360.0 * n)
+    y = int((1.0 - math.asinh(math.tan(lat_rad)) / math.pi) / 2.0 * n)
+    return min(max(x, 0), n - 1), min(max(y, 0), n - 1)
+
+def tiles_around(lat, lon, zoom, radius):
+    """List the (z, x, y) tiles in a square of the given radius around a point"""
+    center_x, center_y = lat_lon_to_tile(lat, lon, zoom)
+    n = 2 ** zoom
+    tiles = []
+    for x in range(center_x - radius, center_x + radius + 1):
+        for y in range(center_y - radius, center_y + radius + 1):
+            if 0 <= x < n and 0 <= y < n:
+                tiles.append((zoom, x, y))
+    return tiles
+
+# =============================
+# DISK CACHE WITH LRU EVICTION
+# =============================
+class TileCache:
+    """Disk-backed tile store that evicts least recently used tiles past a size budget"""
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES, upstream_url=OSM_TILE_URL):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.upstream_url = upstream_url
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._session = requests.Session()
+        self._session.headers.update({"User-Agent": USER_AGENT})
+        # path -> size in bytes, oldest access first
+        self._index = OrderedDict()
+        self._total_bytes = 0
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self._load_index()
+
+    def _load_index(self):
+        """Rebuild the LRU order from file access times left by a previous run"""
+        entries = []
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if not name.endswith(".png"):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, path, stat.st_size))
+
+        for _, path, size in sorted(entries):
+            self._index[path] = size
+            self._total_bytes += size
+        self._evict()
+
+    def _tile_path(self, z, x, y):
+        return os.path.join(self.cache_dir, str(z), str(x), f"{y}.png")
+
+    def _touch(self, path):
+        self._index.move_to_end(path)
+        try:
+            os.utime(path, None)
+        except OSError:
+            pass
+
+    def _evict(self):
+        while self._total_bytes > self.max_bytes and self._index:
+            path, size = self._index.popitem(last=False)
+            self._total_bytes -= size
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def _store(self, path, content):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+
+        if path in self._index:
+            self._total_bytes -= self._index[path]
+        self._index[path] = len(content)
+        self._index.move_to_end(path)
+        self._total_bytes += len(content)
+        self._evict()
+
+    def contains(self, z, x, y):
+        with self._lock:
+            return self._tile_path(z, x, y) in self._index
+
+    def get(self, z, x, y):
+        """Return tile bytes from disk, fetching and caching them on a miss"""
+        path = self._tile_path(z, x, y)
+        with self._lock:
+            if path in self._index:
+                try:
+                    with open(path, "rb") as f:
+                        content = f.read()
+                    self._touch(path)
+                    self.hits += 1
+                    return content
+                except OSError:
+                    self._total_bytes -= self._index.pop(path)
+
+        response = self._session.get(self.upstream_url.format(z=z, x=x, y=y), timeout=10)
+        response.raise_for_status()
+        content = response.content
+
+        with self._lock:
+            self.misses += 1
+            self._store(path, content)
+        return content
+
+    def stats(self):
+        with self._lock:
+            return {
+                "tiles": len(self._index),
+                "size_mb": round(self._total_bytes / (1024 * 1024), 1),
+                "max_mb": round(self.max_bytes / (1024 * 1024), 1),
+                "hits": self.hits,
+                "misses": self.misses
+            }
+
+# =============================
+# PRE-SEEDING
+# =============================
+def seed_island(cache, center, zoom, radius=3, extra_zoom_levels=1, delay=0.1):
+    """Pre-fetch tiles around an island centre at its map zoom level and the next levels in"""
+    lat, lon = center
+    fetched = 0
+    for level in range(zoom, min(zoom + extra_zoom_levels, MAX_ZOOM) + 1):
+        # Keep roughly the same ground area covered as the zoom increases
+        level_radius = radius * (2 ** (level - zoom))
+        for z, x, y in tiles_around(lat, lon, level, level_radius):
+            if cache.contains(z, x, y):
+                continue
+            try:
+                cache.get(z, x, y)
+                fetched += 1
+            except requests.RequestException:
+                continue
+            # Stay well inside the OSM tile usage policy while bulk seeding
+            time.sleep(delay)
+    return fetched
+
+def seed_islands(cache, island_centers, zoom_for_island, radius=3, extra_zoom_levels=1):
+    """Pre-seed every island in island_centers; zoom_for_island maps an island name to its zoom"""
+    results = {}
+    for island, center in island_centers.items():
+        results[island] = seed_island(
+            cache, center, zoom_for_island(island),
+            radius=radius, extra_zoom_levels=extra_zoom_levels
+        )
+    return results
+
+class SeedJob(threading.Thread):
+    """Pre-seed islands on a daemon thread so the admin request returns immediately"""
+
+    def __init__(self, cache, island_centers, zoom_for_island, radius=3, extra_zoom_levels=1):
+        super().__init__(name="nacp-tile-seeder", daemon=True)
+        self.cache = cache
+        self.island_centers = dict(island_centers)
+        self.zoom_for_island = zoom_for_island
+        self.radius = radius
+        self.extra_zoom_levels = extra_zoom_levels
+        self.islands_done = 0
+        self.tiles_fetched = 0
+        self.error = None
+
+    @property
+    def islands_total(self):
+        return len(self.island_centers)
+
+    def run(self):
+        try:
+            for island, center in self.island_centers.items():
+                self.tiles_fetched += seed_island(
+                    self.cache, center, self.zoom_for_island(island),
+                    radius=self.radius, extra_zoom_levels=self.extra_zoom_levels
+                )
+                self.islands_done += 1
+        except Exception as e:
+            self.error = str(e)
+
+# =============================
+# HTTP PROXY
+# =============================
+class TileRequestHandler(BaseHTTPRequestHandler):
+    """Serve /{z}/{x}/{y}.png from the tile cache"""
+
+    cache = None
+
+    def do_GET(self):
+        parts = self.path.split("?", 1)[0].strip("/").split("/")
+        try:
+            z, x, y = int(parts[0]), int(parts[1]), int(parts[2].replace(".png", ""))
+        except (IndexError, ValueError):
+            self.send_error(404, "Expected /{z}/{x}/{y}.png")
+            return
+
+        if not (0 <= z <= MAX_ZOOM and 0 <= x < 2 ** z and 0 <= y < 2 ** z):
+            self.send_error(404, "Tile out of range")
+            return
+
+        try:
+            content = self.cache.get(z, x, y)
+        except requests.RequestException:
+            self.send_error(502, "Upstream tile server unavailable")
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "image/png")
+        self.send_header("Content-Length", str(len(content)))
+        self.send_header("Cache-Control", "public, max-age=604800")
+        self.send_header("Access-Control-Allow-Origin", "*")
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, format, *args):
+        pass
+
+def start_tile_server(cache, host=DEFAULT_HOST, port=DEFAULT_PORT):
+    """Start the tile proxy on a daemon thread and return the server"""
+    handler = type("BoundTileRequestHandler", (TileRequestHandler,), {"cache": cache})
+    server = ThreadingHTTPServer((host, port), handler)
+    thread = threading.Thread(target=server.serve_forever, name="nacp-tile-server", daemon=True)
+    thread.start()
+    return server
+
+if __name__ == "__main__":
+    tile_cache = TileCache()
+    print(f"🗺️ Serving cached tiles from {tile_cache.cache_dir} on http://{DEFAULT_HOST}:{DEFAULT_PORT}/{{z}}/{{x}}/{{y}}.png")
+    tile_server = ThreadingHTTPServer(
+        (DEFAULT_HOST, DEFAULT_PORT),
+        type("BoundTileRequestHandler", (TileRequestHandler,), {"cache": tile_cache})
+    )
+    try:
+        tile_server.serve_forever()
+    except KeyboardInterrupt:
+        pass
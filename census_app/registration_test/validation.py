@@ -0,0 +1,172 @@
+# validation.py - Contact validation and normalisation
+#
+# Phones are stored in E.164 (+1242XXXXXXX) and emails trimmed and lowercased,
+# so dedup lookups, imports and unique indexes can compare stored values
+# directly. Every pattern is compiled once at import. The batch functions run
+# the same rules over whole pandas Series with Arrow compute kernels, for
+# imports and the backfill of existing rows; pandas and pyarrow are imported
+# there so the form path stays light.
+
+import re
+
+from sqlalchemy import text
+
+# =============================
+# SETTINGS
+# =============================
+COUNTRY_CODE = "1"
+BAHAMAS_AREA_CODE = "242"
+
+BACKFILL_BATCH_SIZE = 1000
+
+_NON_DIGITS = re.compile(r"\D")
+EMAIL_PATTERN = re.compile(r"[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}")
+
+# =============================
+# SINGLE VALUES
+# =============================
+def normalize_phone(phone_str):
+    """E.164 form of a Bahamian number (+1242XXXXXXX), or None when it is not one.
+
+    Accepts a 7-digit local number, 242XXXXXXX or 1242XXXXXXX in any punctuation.
+    """
+    digits = _NON_DIGITS.sub("", phone_str or "")
+    if len(digits) == 7:
+        return f"+{COUNTRY_CODE}{BAHAMAS_AREA_CODE}{digits}"
+    if len(digits) == 10 and digits.startswith(BAHAMAS_AREA_CODE):
+        return f"+{COUNTRY_CODE}{digits}"
+    if len(digits) == 11 and digits.startswith(COUNTRY_CODE + BAHAMAS_AREA_CODE):
+        return f"+{digits}"
+    return None
+
+def validate_phone_number(phone_str):
+    """Validate Bahamian phone number format"""
+    return normalize_phone(phone_str) is not None
+
+def format_phone_number(phone_str):
+    """Format phone number for display as (242) XXX-XXXX"""
+    if not phone_str:
+        return ""
+    e164 = normalize_phone(phone_str)
+    if e164 is None:
+        return _NON_DIGITS.sub("", phone_str)
+    local = e164[2:]
+    return f"({local[:3]}) {local[3:6]}-{local[6:]}"
+
+def normalize_email(email):
+    email = (email or "").strip().lower()
+    return email or None
+
+def validate_email(email):
+    """Validate email format"""
+    return EMAIL_PATTERN.fullmatch((email or "").strip()) is not None
+
+# =============================
+# BATCH (pandas Series)
+# =============================
+def _arrow_strings(values):
+    import pyarrow as pa
+
+    return pa.array(values.astype(object), type=pa.string(), from_pandas=True)
+
+def _to_series(array, index):
+    import pandas as pd
+
+    return pd.Series(array.to_numpy(zero_copy_only=False), index=index)
+
+def normalize_phones(phones):
+    """Vectorised normalize_phone: E.164 strings, None where the number is missing or invalid"""
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    digits = pc.replace_substring_regex(_arrow_strings(phones), _NON_DIGITS.pattern, "")
+    length = pc.utf8_length(digits)
+    prefix = COUNTRY_CODE + BAHAMAS_AREA_CODE
+    e164 = pc.if_else(
+        pc.equal(length, 7),
+        pc.binary_join_element_wise("+" + prefix, digits, ""),
+        pc.if_else(
+            pc.and_(pc.equal(length, 10), pc.starts_with(digits, BAHAMAS_AREA_CODE)),
+            pc.binary_join_element_wise("+" + COUNTRY_CODE, digits, ""),
+            pc.if_else(
+                pc.and_(pc.equal(length, 11), pc.starts_with(digits, prefix)),
+                pc.binary_join_element_wise("+", digits, ""),
+                pa.scalar(None, pa.string()),
+            ),
+        ),
+    )
+    return _to_series(e164, phones.index)
+
+def normalize_emails(emails):
+    """Vectorised normalize_email"""
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    trimmed = pc.utf8_lower(pc.utf8_trim_whitespace(_arrow_strings(emails)))
+    return _to_series(pc.if_else(pc.equal(trimmed, ""), pa.scalar(None, pa.string()), trimmed), emails.index)
+
+def valid_emails(emails):
+    """Boolean Series: does each value look like an email address"""
+    import pyarrow.compute as pc
+
+    matched = pc.match_substring_regex(
+        pc.utf8_trim_whitespace(_arrow_strings(emails)), f"^{EMAIL_PATTERN.pattern}$"
+    )
+    return _to_series(pc.fill_null(matched, False), emails.index).astype(bool)
+
+def validate_contacts(df):
+    """Normalised cell / telephone / email plus per-row validity flags for a batch of registrations"""
+    import pandas as pd
+
+    result = pd.DataFrame(index=df.index)
+    result["cell"] = normalize_phones(df["cell"])
+    result["cell_valid"] = result["cell"].notna()
+    result["telephone"] = normalize_phones(df["telephone"])
+    # The alternate number is optional: only a non-empty, unparseable value is invalid
+    telephone_given = df["telephone"].notna() & (df["telephone"].astype(str).str.strip() != "")
+    result["telephone_valid"] = result["telephone"].notna() | ~telephone_given
+    result["email"] = normalize_emails(df["email"])
+    result["email_valid"] = valid_emails(df["email"])
+    return result
+
+# =============================
+# BACKFILL
+# =============================
+def backfill_contact_columns(engine, batch_size=BACKFILL_BATCH_SIZE):
+    """Rewrite stored cell, telephone and email values in canonical form.
+
+    Values that cannot be parsed are left as they are and counted as invalid.
+    Returns {"updated": rows changed, "invalid": rows with an unparseable value}.
+    """
+    import pandas as pd
+
+    with engine.begin() as conn:
+        df = pd.read_sql(text("SELECT id, cell, telephone, email FROM registration_form"), conn)
+    if df.empty:
+        return {"updated": 0, "invalid": 0}
+
+    checked = validate_contacts(df)
+    invalid = ~(checked["cell_valid"] & checked["telephone_valid"] & checked["email_valid"])
+
+    # Keep the stored value wherever the canonical form is unavailable
+    canonical = pd.DataFrame({
+        "id": df["id"],
+        "cell": checked["cell"].where(checked["cell_valid"], df["cell"]),
+        "telephone": checked["telephone"].where(checked["telephone"].notna(), df["telephone"]),
+        "email": checked["email"].where(checked["email_valid"], df["email"]),
+    })
+    changed = (
+        canonical[["cell", "telephone", "email"]].fillna("")
+        != df[["cell", "telephone", "email"]].fillna("")
+    ).any(axis=1)
+    updates = canonical[changed].astype(object).where(canonical[changed].notna(), None).to_dict("records")
+
+    with engine.begin() as conn:
+        for start in range(0, len(updates), batch_size):
+            conn.execute(text("""
+                UPDATE registration_form
+                SET cell = :cell, telephone = :telephone, email = :email, updated_at = CURRENT_TIMESTAMP
+                WHERE id = :id
+            """), updates[start:start + batch_size])
+
+    return {"updated": len(updates), "invalid": int(invalid.sum())}
@@ -0,0 +1,214 @@
+"""
+Agent reminder pipeline.
+
+Overdue pending holders are grouped per assigned agent into one digest email,
+sent over a single SMTP connection, and logged so each holder is reminded once
+per review deadline no matter how many schedulers or admins trigger a run.
+
+Run from cron / a worker:
+    python -m census_app.reminders --once
+    python -m census_app.reminders               # loop every REMINDER_INTERVAL_MINUTES
+
+Local testing against an SMTP stand-in:
+    python -m aiosmtpd -n -l 127.0.0.1:1025
+    SMTP_HOST=127.0.0.1 SMTP_PORT=1025 SMTP_USE_TLS=0 python -m census_app.reminders --once
+"""
+import argparse
+import smtplib
+import threading
+import time
+from email.message import EmailMessage
+
+from sqlalchemy import text
+
+from census_app.config import (
+    engine, HOLDERS_TABLE, USERS_TABLE, AGENT_REMINDER_LOG_TABLE, STATUS_PENDING,
+    EMAIL_USER, EMAIL_PASS, SMTP_HOST, SMTP_PORT, SMTP_USE_TLS, REMINDER_INTERVAL_MINUTES
+)
+from census_app.helpers import REVIEW_WINDOW_HOURS
+
+# Arbitrary key for pg_try_advisory_lock so only one batch runs at a time
+REMINDER_LOCK_KEY = 734201
+
+# --------------------------------------------------------
+# Reminder Log
+# --------------------------------------------------------
+def ensure_reminder_log_table(conn):
+    conn.execute(text(f"""
+        CREATE TABLE IF NOT EXISTS {AGENT_REMINDER_LOG_TABLE} (
+            id SERIAL PRIMARY KEY,
+            agent_id INTEGER NOT NULL,
+            holder_id INTEGER NOT NULL,
+            deadline TIMESTAMP NOT NULL,
+            sent_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            UNIQUE (holder_id, deadline)
+        )
+    """))
+
+
+def collect_due_reminders(conn):
+    """Overdue pending holders not yet reminded for their current deadline, grouped by agent"""
+    rows = conn.execute(text(f"""
+        SELECT h.holder_id, h.name, h.submitted_at, d.deadline,
+               u.id AS agent_id, u.username AS agent_name, u.email AS agent_email
+        FROM {HOLDERS_TABLE} h
+        JOIN {USERS_TABLE} u ON u.id = h.assigned_agent_id
+        CROSS JOIN LATERAL (
+            SELECT COALESCE(h.agent_review_deadline,
+                            h.submitted_at + make_interval(hours => :window_hours)) AS deadline
+        ) d
+        WHERE h.status = :status
+          AND d.deadline < now()::timestamp
+          AND u.email IS NOT NULL
+          AND NOT EXISTS (
+              SELECT 1 FROM {AGENT_REMINDER_LOG_TABLE} r
+              WHERE r.holder_id = h.holder_id AND r.deadline = d.deadline
+          )
+        ORDER BY u.id, d.deadline
+    """), {"status": STATUS_PENDING, "window_hours": REVIEW_WINDOW_HOURS}).mappings()
+
+    digests = {}
+    for row in rows:
+        digest = digests.setdefault(row["agent_id"], {
+            "agent_id": row["agent_id"],
+            "agent_name": row["agent_name"],
+            "agent_email": row["agent_email"],
+            "holders": []
+        })
+        digest["holders"].append(dict(row))
+    return list(digests.values())
+
+
+def build_digest_message(digest, sender=EMAIL_USER):
+    """One email listing every overdue holder assigned to the agent"""
+    holders = digest["holders"]
+    lines = [
+        f"Hello {digest['agent_name']},",
+        "",
+        f"The following {len(holders)} holder registration(s) have passed their {REVIEW_WINDOW_HOURS}h review deadline:",
+        "",
+    ]
+    for holder in holders:
+        lines.append(f"  - #{holder['holder_id']} {holder['name']} (due {holder['deadline']:%Y-%m-%d %H:%M})")
+    lines += ["", "Please log in to the NACP portal to review them.", "", "NACP Census Team"]
+
+    msg = EmailMessage()
+    msg["Subject"] = f"NACP: {len(holders)} holder review(s) overdue"
+    msg["From"] = sender
+    msg["To"] = digest["agent_email"]
+    msg.set_content("\n".join(lines))
+    return msg
+
+
+def record_sent(conn, digest):
+    conn.execute(
+        text(f"""
+            INSERT INTO {AGENT_REMINDER_LOG_TABLE} (agent_id, holder_id, deadline)
+            VALUES (:agent_id, :holder_id, :deadline)
+            ON CONFLICT (holder_id, deadline) DO NOTHING
+        """),
+        [{"agent_id": digest["agent_id"], "holder_id": h["holder_id"], "deadline": h["deadline"]}
+         for h in digest["holders"]]
+    )
+
+# --------------------------------------------------------
+# Batch Send
+# --------------------------------------------------------
+def open_smtp(host=SMTP_HOST, port=SMTP_PORT, use_tls=SMTP_USE_TLS, user=EMAIL_USER, password=EMAIL_PASS):
+    smtp = smtplib.SMTP(host, port, timeout=30)
+    if use_tls:
+        smtp.starttls()
+    if password:
+        smtp.login(user, password)
+    return smtp
+
+
+def send_agent_reminders(smtp_factory=open_smtp):
+    """Send one digest per agent for overdue holders; returns the number of digests sent.
+
+    Safe to call from several processes: a Postgres advisory lock lets only one
+    batch run, and the reminder log skips holders already reminded for their deadline.
+    """
+    with engine.begin() as conn:
+        ensure_reminder_log_table(conn)
+
+    with engine.connect() as lock_conn:
+        if not lock_conn.execute(text("SELECT pg_try_advisory_lock(:key)"), {"key": REMINDER_LOCK_KEY}).scalar():
+            return 0
+        try:
+            with engine.begin() as conn:
+                digests = collect_due_reminders(conn)
+            if not digests:
+                return 0
+
+            sent = 0
+            smtp = smtp_factory()
+            try:
+                for digest in digests:
+                    try:
+                        smtp.send_message(build_digest_message(digest))
+                    except smtplib.SMTPRecipientsRefused as e:
+                        print(f"❌ [Reminders] {digest['agent_email']} refused: {e}")
+                        continue
+                    with engine.begin() as conn:
+                        record_sent(conn, digest)
+                    sent += 1
+            finally:
+                smtp.quit()
+            return sent
+        finally:
+            lock_conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": REMINDER_LOCK_KEY})
+            lock_conn.commit()
+
+# --------------------------------------------------------
+# Scheduler
+# --------------------------------------------------------
+class ReminderScheduler(threading.Thread):
+    """Background thread that runs the reminder batch every interval, or sooner when triggered"""
+
+    def __init__(self, interval_minutes=REMINDER_INTERVAL_MINUTES):
+        super().__init__(name="nacp-agent-reminders", daemon=True)
+        self.interval = interval_minutes * 60
+        self._wake = threading.Event()
+        self.last_run = None
+        self.last_sent = 0
+        self.last_error = None
+
+    def trigger(self):
+        """Run a batch as soon as possible without waiting for the interval"""
+        self._wake.set()
+
+    def run_once(self):
+        try:
+            self.last_sent = send_agent_reminders()
+            self.last_error = None
+        except Exception as e:
+            self.last_error = str(e)
+            print(f"❌ [Reminders] Batch failed: {e}")
+        self.last_run = time.time()
+
+    def run(self):
+        while True:
+            self.run_once()
+            self._wake.wait(self.interval)
+            self._wake.clear()
+
+
+def start_reminder_scheduler(interval_minutes=REMINDER_INTERVAL_MINUTES):
+    scheduler = ReminderScheduler(interval_minutes)
+    scheduler.start()
+    return scheduler
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Send overdue-holder digests to agents")
+    parser.add_argument("--once", action="store_true", help="run a single batch and exit")
+    parser.add_argument("--interval", type=int, default=REMINDER_INTERVAL_MINUTES, help="minutes between batches")
+    args = parser.parse_args()
+
+    if args.once:
+        print(f"📧 [Reminders] Sent {send_agent_reminders()} digest(s)")
+    else:
+        while True:
+            print(f"📧 [Reminders] Sent {send_agent_reminders()} digest(s)")
+            time.sleep(args.interval * 60)
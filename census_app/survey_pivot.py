@@ -0,0 +1,265 @@
+"""
+Wide analytical projection of survey_responses.
+
+survey_responses is entity-attribute-value: one row per (holder, question).
+survey_responses_wide holds one row per holder and one typed column per
+survey_questions entry (s<section>_q<question_no>), built with a single
+conditional-aggregation pass. A trigger records which holders changed so
+refreshes only re-pivot those holders; a change in the question set triggers
+a full rebuild.
+
+    python -m census_app.survey_pivot refresh
+    python -m census_app.survey_pivot rebuild
+    python -m census_app.survey_pivot export survey_wide.csv
+"""
+import argparse
+import re
+
+from sqlalchemy import text
+
+from census_app.config import engine
+
+SURVEY_RESPONSES_TABLE = "survey_responses"
+SURVEY_QUESTIONS_TABLE = "survey_questions"
+WIDE_TABLE = "survey_responses_wide"
+WIDE_COLUMNS_TABLE = "survey_responses_wide_columns"
+DIRTY_TABLE = "survey_responses_dirty"
+
+NUMERIC_PATTERN = r"^\s*-?[0-9]+(\.[0-9]+)?\s*$"
+
+# --------------------------------------------------------
+# Change tracking
+# --------------------------------------------------------
+def ensure_change_tracking(conn):
+    conn.execute(text(f"""
+        CREATE TABLE IF NOT EXISTS {DIRTY_TABLE} (
+            holder_id INTEGER PRIMARY KEY,
+            changed_at TIMESTAMP DEFAULT now()
+        )
+    """))
+    conn.execute(text(f"""
+        CREATE TABLE IF NOT EXISTS {WIDE_COLUMNS_TABLE} (
+            question_id INTEGER PRIMARY KEY,
+            column_name TEXT NOT NULL,
+            data_type TEXT NOT NULL
+        )
+    """))
+    # Recreating the trigger locks survey_responses, so only create it when missing
+    trigger_exists = conn.execute(text("""
+        SELECT 1 FROM pg_trigger
+        WHERE tgname = 'trg_survey_responses_dirty' AND tgrelid = to_regclass(:table)
+    """), {"table": SURVEY_RESPONSES_TABLE}).first() is not None
+    if not trigger_exists:
+        conn.execute(text(f"""
+            CREATE OR REPLACE FUNCTION mark_survey_holder_dirty() RETURNS trigger AS $$
+            BEGIN
+                IF TG_OP IN ('UPDATE', 'DELETE') THEN
+                    INSERT INTO {DIRTY_TABLE} (holder_id) VALUES (OLD.holder_id)
+                    ON CONFLICT (holder_id) DO UPDATE SET changed_at = now();
+                END IF;
+                IF TG_OP IN ('INSERT', 'UPDATE') THEN
+                    INSERT INTO {DIRTY_TABLE} (holder_id) VALUES (NEW.holder_id)
+                    ON CONFLICT (holder_id) DO UPDATE SET changed_at = now();
+                END IF;
+                RETURN NULL;
+            END;
+            $$ LANGUAGE plpgsql
+        """))
+        conn.execute(text(f"""
+            CREATE TRIGGER trg_survey_responses_dirty
+            AFTER INSERT OR UPDATE OR DELETE ON {SURVEY_RESPONSES_TABLE}
+            FOR EACH ROW EXECUTE FUNCTION mark_survey_holder_dirty()
+        """))
+    conn.execute(text(
+        f"CREATE INDEX IF NOT EXISTS idx_survey_responses_holder ON {SURVEY_RESPONSES_TABLE} (holder_id, question_id)"
+    ))
+
+# --------------------------------------------------------
+# Column typing
+# --------------------------------------------------------
+def _infer_column_types(conn):
+    """One scan of survey_responses deciding numeric / boolean / text per question"""
+    rows = conn.execute(text(f"""
+        SELECT q.id, q.section_id, q.question_no,
+               COUNT(r.option_response) AS answered,
+               COUNT(r.option_response) FILTER (WHERE r.option_response ~ :numeric) AS numeric_answers,
+               COUNT(r.option_response) FILTER (WHERE lower(trim(r.option_response)) IN ('yes', 'no')) AS yes_no_answers
+        FROM {SURVEY_QUESTIONS_TABLE} q
+        LEFT JOIN {SURVEY_RESPONSES_TABLE} r ON r.question_id = q.id
+        GROUP BY q.id, q.section_id, q.question_no
+        ORDER BY q.section_id, q.question_no, q.id
+    """), {"numeric": NUMERIC_PATTERN}).all()
+
+    columns = []
+    used_names = set()
+    for question_id, section_id, question_no, answered, numeric_answers, yes_no_answers in rows:
+        if answered and numeric_answers == answered:
+            data_type = "numeric"
+        elif answered and yes_no_answers == answered:
+            data_type = "boolean"
+        else:
+            data_type = "text"
+        name = f"s{section_id}_q{question_no}"
+        if name in used_names:
+            name = f"{name}_{question_id}"
+        used_names.add(name)
+        columns.append((question_id, name, data_type))
+    return columns
+
+
+def _typed_value_sql(data_type, value):
+    if data_type == "numeric":
+        return f"CASE WHEN {value} ~ '{NUMERIC_PATTERN}' THEN trim({value})::numeric END"
+    if data_type == "boolean":
+        return f"CASE lower(trim({value})) WHEN 'yes' THEN true WHEN 'no' THEN false END"
+    return value
+
+
+def _pivot_select_sql(columns, holder_filter=""):
+    aggregates = ",\n".join(
+        f"{_typed_value_sql(data_type, f'MAX(option_response) FILTER (WHERE question_id = {question_id})')} AS {name}"
+        for question_id, name, data_type in columns
+    )
+    return f"""
+        SELECT holder_id{"," if aggregates else ""}
+        {aggregates}
+        FROM {SURVEY_RESPONSES_TABLE}
+        {holder_filter}
+        GROUP BY holder_id
+    """
+
+
+def _insert_sql(columns, holder_filter=""):
+    column_list = ", ".join(["holder_id"] + [name for _, name, _ in columns])
+    return f"INSERT INTO {WIDE_TABLE} ({column_list}) {_pivot_select_sql(columns, holder_filter)}"
+
+
+def _stored_columns(conn):
+    rows = conn.execute(text(
+        f"SELECT question_id, column_name, data_type FROM {WIDE_COLUMNS_TABLE} ORDER BY column_name"
+    )).all()
+    return [tuple(row) for row in rows]
+
+# --------------------------------------------------------
+# Build / refresh
+# --------------------------------------------------------
+def _has_type_mismatch(conn, holder_ids):
+    """True when a changed holder answered a numeric/boolean question with something else"""
+    return conn.execute(text(f"""
+        SELECT EXISTS (
+            SELECT 1 FROM {SURVEY_RESPONSES_TABLE} r
+            JOIN {WIDE_COLUMNS_TABLE} c ON c.question_id = r.question_id
+            WHERE r.holder_id = ANY(:ids)
+              AND r.option_response IS NOT NULL
+              AND ((c.data_type = 'numeric' AND r.option_response !~ :numeric)
+                   OR (c.data_type = 'boolean' AND lower(trim(r.option_response)) NOT IN ('yes', 'no')))
+        )
+    """), {"ids": holder_ids, "numeric": NUMERIC_PATTERN}).scalar()
+
+
+def _rebuild(conn):
+    columns = _infer_column_types(conn)
+
+    conn.execute(text(f"DROP TABLE IF EXISTS {WIDE_TABLE}"))
+    column_defs = "".join(f", {name} {data_type}" for _, name, data_type in columns)
+    conn.execute(text(f"CREATE TABLE {WIDE_TABLE} (holder_id INTEGER PRIMARY KEY{column_defs})"))
+    conn.execute(text(_insert_sql(columns)))
+
+    conn.execute(text(f"DELETE FROM {WIDE_COLUMNS_TABLE}"))
+    if columns:
+        conn.execute(
+            text(f"INSERT INTO {WIDE_COLUMNS_TABLE} (question_id, column_name, data_type) VALUES (:q, :n, :t)"),
+            [{"q": q, "n": n, "t": t} for q, n, t in columns]
+        )
+    # Everything is current now
+    conn.execute(text(f"DELETE FROM {DIRTY_TABLE}"))
+    return conn.execute(text(f"SELECT COUNT(*) FROM {WIDE_TABLE}")).scalar()
+
+
+def rebuild_wide_table():
+    """Re-infer column types and rebuild the whole wide table"""
+    with engine.begin() as conn:
+        ensure_change_tracking(conn)
+        return _rebuild(conn)
+
+
+def refresh_wide_table():
+    """Re-pivot only holders whose responses changed; returns the number of holders refreshed.
+
+    Falls back to a full rebuild when the wide table is missing, the question set changed
+    or a changed answer no longer fits its column's type.
+    """
+    with engine.begin() as conn:
+        ensure_change_tracking(conn)
+        wide_exists = conn.execute(text("SELECT to_regclass(:table)"), {"table": WIDE_TABLE}).scalar() is not None
+        stored = _stored_columns(conn)
+        question_ids = {row[0] for row in conn.execute(text(f"SELECT id FROM {SURVEY_QUESTIONS_TABLE}")).all()}
+
+    if not wide_exists or question_ids != {question_id for question_id, _, _ in stored}:
+        return rebuild_wide_table()
+
+    with engine.begin() as conn:
+        holder_ids = [row[0] for row in conn.execute(text(
+            f"DELETE FROM {DIRTY_TABLE} RETURNING holder_id"
+        )).all()]
+        if not holder_ids:
+            return 0
+        if _has_type_mismatch(conn, holder_ids):
+            # Re-infer types so the new answer is kept (as text) rather than written as NULL
+            return _rebuild(conn)
+        conn.execute(text(f"DELETE FROM {WIDE_TABLE} WHERE holder_id = ANY(:ids)"), {"ids": holder_ids})
+        conn.execute(
+            text(_insert_sql(stored, "WHERE holder_id = ANY(:ids)")),
+            {"ids": holder_ids}
+        )
+        return len(holder_ids)
+
+# --------------------------------------------------------
+# Export
+# --------------------------------------------------------
+def export_wide_csv(path, columns=None):
+    """Stream the wide table (optionally a subset of columns) to CSV with COPY"""
+    if columns:
+        for column in columns:
+            if not re.fullmatch(r"[a-z0-9_]+", column):
+                raise ValueError(f"Invalid column name: {column}")
+        select = f"(SELECT holder_id, {', '.join(columns)} FROM {WIDE_TABLE} ORDER BY holder_id)"
+    else:
+        select = f"(SELECT * FROM {WIDE_TABLE} ORDER BY holder_id)"
+
+    raw = engine.raw_connection()
+    try:
+        with open(path, "w", encoding="utf-8", newline="") as f:
+            raw.cursor().copy_expert(f"COPY {select} TO STDOUT WITH (FORMAT csv, HEADER)", f)
+    finally:
+        raw.close()
+    return path
+
+
+def get_wide_columns():
+    """Column name, type and question text of every wide-table column, for analysts"""
+    with engine.connect() as conn:
+        rows = conn.execute(text(f"""
+            SELECT c.column_name, c.data_type, q.section_id, q.question_no, q.question_text
+            FROM {WIDE_COLUMNS_TABLE} c
+            JOIN {SURVEY_QUESTIONS_TABLE} q ON q.id = c.question_id
+            ORDER BY q.section_id, q.question_no
+        """)).mappings().all()
+    return [dict(row) for row in rows]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Maintain the wide survey_responses table")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("refresh", help="re-pivot holders whose responses changed")
+    sub.add_parser("rebuild", help="rebuild the whole table")
+    export = sub.add_parser("export", help="export the wide table to CSV")
+    export.add_argument("path")
+    args = parser.parse_args()
+
+    if args.command == "refresh":
+        print(f"✅ Refreshed {refresh_wide_table()} holder(s)")
+    elif args.command == "rebuild":
+        print(f"✅ Rebuilt {WIDE_TABLE} with {rebuild_wide_table()} holder(s)")
+    else:
+        print(f"✅ Exported {export_wide_csv(args.path)}")
@@ -0,0 +1,189 @@
+"""
+Survey progress bitmaps.
+
+Each holder carries a survey_progress_bits integer with bit (section_id - 1)
+set when that section is completed. A trigger on holder_survey_progress keeps
+it current on every section save, so "which sections are left" is one column
+read and completion analytics are a single aggregate over holders.
+"""
+from sqlalchemy import text
+
+from census_app.config import engine, HOLDERS_TABLE, USERS_TABLE, HOLDER_SURVEY_PROGRESS_TABLE, TOTAL_SURVEY_SECTIONS
+
+FULL_MASK = (1 << TOTAL_SURVEY_SECTIONS) - 1
+
+# --------------------------------------------------------
+# Bit helpers
+# --------------------------------------------------------
+def section_bit(section_id):
+    return 1 << (section_id - 1)
+
+
+def completed_sections(bits):
+    return [s for s in range(1, TOTAL_SURVEY_SECTIONS + 1) if bits & section_bit(s)]
+
+
+def remaining_sections(bits):
+    return [s for s in range(1, TOTAL_SURVEY_SECTIONS + 1) if not bits & section_bit(s)]
+
+
+def next_incomplete_section(bits):
+    """Lowest-numbered section still to do, or None when the survey is complete"""
+    remaining = (~bits) & FULL_MASK
+    if not remaining:
+        return None
+    return (remaining & -remaining).bit_length()
+
+# --------------------------------------------------------
+# Schema
+# --------------------------------------------------------
+def ensure_progress_bitmap(conn):
+    """Add the bitmap column, backfill it, and install the maintenance trigger (idempotent)"""
+    column_exists = conn.execute(text("""
+        SELECT 1 FROM information_schema.columns
+        WHERE table_name = :table AND column_name = 'survey_progress_bits'
+    """), {"table": HOLDERS_TABLE}).first() is not None
+
+    if not column_exists:
+        conn.execute(text(f"ALTER TABLE {HOLDERS_TABLE} ADD COLUMN survey_progress_bits integer NOT NULL DEFAULT 0"))
+        conn.execute(text(f"""
+            UPDATE {HOLDERS_TABLE} h
+            SET survey_progress_bits = p.bits
+            FROM (
+                SELECT holder_id, bit_or(1 << (section_id - 1)) AS bits
+                FROM {HOLDER_SURVEY_PROGRESS_TABLE}
+                WHERE completed
+                GROUP BY holder_id
+            ) p
+            WHERE h.holder_id = p.holder_id
+        """))
+
+    # Recreating the trigger locks holder_survey_progress, so only create it when missing
+    trigger_exists = conn.execute(text("""
+        SELECT 1 FROM pg_trigger
+        WHERE tgname = 'trg_holder_progress_bits' AND tgrelid = to_regclass(:table)
+    """), {"table": HOLDER_SURVEY_PROGRESS_TABLE}).first() is not None
+    if not trigger_exists:
+        conn.execute(text(f"""
+            CREATE OR REPLACE FUNCTION refresh_holder_progress_bits() RETURNS trigger AS $$
+            BEGIN
+                IF TG_OP IN ('UPDATE', 'DELETE') THEN
+                    UPDATE {HOLDERS_TABLE}
+                    SET survey_progress_bits = COALESCE((
+                        SELECT bit_or(1 << (section_id - 1)) FROM {HOLDER_SURVEY_PROGRESS_TABLE}
+                        WHERE holder_id = OLD.holder_id AND completed
+                    ), 0)
+                    WHERE holder_id = OLD.holder_id;
+                END IF;
+                IF TG_OP IN ('INSERT', 'UPDATE') THEN
+                    UPDATE {HOLDERS_TABLE}
+                    SET survey_progress_bits = COALESCE((
+                        SELECT bit_or(1 << (section_id - 1)) FROM {HOLDER_SURVEY_PROGRESS_TABLE}
+                        WHERE holder_id = NEW.holder_id AND completed
+                    ), 0)
+                    WHERE holder_id = NEW.holder_id;
+                END IF;
+                RETURN NULL;
+            END;
+            $$ LANGUAGE plpgsql
+        """))
+        conn.execute(text(f"""
+            CREATE TRIGGER trg_holder_progress_bits
+            AFTER INSERT OR UPDATE OR DELETE ON {HOLDER_SURVEY_PROGRESS_TABLE}
+            FOR EACH ROW EXECUTE FUNCTION refresh_holder_progress_bits()
+        """))
+    # Covers the analytics aggregate so it can run as an index-only scan
+    conn.execute(text(f"""
+        CREATE INDEX IF NOT EXISTS idx_holders_progress_bits
+        ON {HOLDERS_TABLE} (assigned_agent_id) INCLUDE (farm_id, survey_progress_bits)
+    """))
+
+
+_bitmap_ready = False
+
+
+def _ensure_ready():
+    global _bitmap_ready
+    if not _bitmap_ready:
+        with engine.begin() as conn:
+            ensure_progress_bitmap(conn)
+        _bitmap_ready = True
+
+# --------------------------------------------------------
+# Section saves
+# --------------------------------------------------------
+def save_section_progress(holder_id, section_id, completed=True):
+    """Record a section as (in)complete; returns the holder's updated bitmap"""
+    _ensure_ready()
+    with engine.begin() as conn:
+        conn.execute(text(f"""
+            INSERT INTO {HOLDER_SURVEY_PROGRESS_TABLE} (holder_id, section_id, completed, updated_at)
+            VALUES (:holder_id, :section_id, :completed, now())
+            ON CONFLICT (holder_id, section_id)
+            DO UPDATE SET completed = EXCLUDED.completed, updated_at = EXCLUDED.updated_at
+        """), {"holder_id": holder_id, "section_id": section_id, "completed": completed})
+        return conn.execute(
+            text(f"SELECT survey_progress_bits FROM {HOLDERS_TABLE} WHERE holder_id = :holder_id"),
+            {"holder_id": holder_id}
+        ).scalar() or 0
+
+# --------------------------------------------------------
+# Analytics
+# --------------------------------------------------------
+def get_holder_progress(holder_id):
+    """Completed / remaining sections and the next section to fill for one holder"""
+    _ensure_ready()
+    with engine.connect() as conn:
+        bits = conn.execute(
+            text(f"SELECT survey_progress_bits FROM {HOLDERS_TABLE} WHERE holder_id = :holder_id"),
+            {"holder_id": holder_id}
+        ).scalar() or 0
+    return {
+        "bits": bits,
+        "completed": completed_sections(bits),
+        "remaining": remaining_sections(bits),
+        "next_section": next_incomplete_section(bits),
+        "percent": round(100 * len(completed_sections(bits)) / TOTAL_SURVEY_SECTIONS, 1),
+    }
+
+
+def _section_count_sql(bits_column):
+    return " + ".join(f"(({bits_column} >> {i}) & 1)" for i in range(TOTAL_SURVEY_SECTIONS))
+
+
+GROUP_EXPRESSIONS = {
+    "island": ("COALESCE(i.name, 'Unknown')", "LEFT JOIN holdings ho ON ho.id = h.farm_id LEFT JOIN islands i ON i.id = ho.island_id"),
+    "agent": ("COALESCE(u.username, 'Unassigned')", f"LEFT JOIN {USERS_TABLE} u ON u.id = h.assigned_agent_id"),
+}
+
+
+def completion_distribution(group_by="island"):
+    """Per island or per agent: holder counts by completion state and per-section completion.
+
+    One aggregate over the holders bitmap column; no scan of holder_survey_progress.
+    """
+    _ensure_ready()
+    group_sql, join_sql = GROUP_EXPRESSIONS[group_by]
+    section_columns = ",\n".join(
+        f"SUM((h.survey_progress_bits >> {i}) & 1) AS section_{i + 1}" for i in range(TOTAL_SURVEY_SECTIONS)
+    )
+    with engine.connect() as conn:
+        rows = conn.execute(text(f"""
+            SELECT {group_sql} AS group_name,
+                   COUNT(*) AS holders,
+                   COUNT(*) FILTER (WHERE h.survey_progress_bits = :full_mask) AS complete,
+                   COUNT(*) FILTER (WHERE h.survey_progress_bits = 0) AS not_started,
+                   ROUND(AVG({_section_count_sql('h.survey_progress_bits')}) * 100.0 / :total, 1) AS avg_percent,
+                   {section_columns}
+            FROM {HOLDERS_TABLE} h
+            {join_sql}
+            GROUP BY 1
+            ORDER BY 1
+        """), {"full_mask": FULL_MASK, "total": TOTAL_SURVEY_SECTIONS}).mappings().all()
+
+    result = []
+    for row in rows:
+        row = dict(row)
+        row["in_progress"] = row["holders"] - row["complete"] - row["not_started"]
+        result.append(row)
+    return result
@@ -0,0 +1,229 @@
+"""
+Census tabulation engine.
+
+Each standard table is one GROUPING SETS query, so the full cross-tab and its
+row/column subtotals and grand total come from a single pass over the raw
+tables. Results are stored in tabulation_cache keyed on a data version built
+from per-table change counters (bumped by statement-level triggers), so a
+recurring report only reads the cache until its source tables change.
+"""
+import json
+
+import pandas as pd
+from sqlalchemy import text
+
+from census_app.config import engine, HOLDERS_TABLE, HOLDING_LABOUR_TABLE
+
+ALL_LABEL = "All"
+DATA_VERSIONS_TABLE = "census_data_versions"
+TABULATION_CACHE_TABLE = "tabulation_cache"
+
+ISLAND_JOIN = "JOIN holdings ho ON ho.id = {holding_id} JOIN islands i ON i.id = ho.island_id"
+
+# name -> title, dimensions, measures, source tables, SQL (dimension columns first)
+TABULATIONS = {
+    "acres_by_island_tenure": {
+        "title": "Land area (acres) by island and tenure",
+        "dimensions": ["island", "tenure"],
+        "measures": ["parcels", "total_acres", "developed_acres", "irrigated_acres"],
+        "sources": ["land_use_parcels", "land_use", "holdings", "islands"],
+        "sql": f"""
+            SELECT i.name AS island, p.tenure::text AS tenure,
+                   GROUPING(i.name, p.tenure) AS grouping_id,
+                   COUNT(*) AS parcels,
+                   COALESCE(SUM(p.total_acres), 0) AS total_acres,
+                   COALESCE(SUM(p.developed_acres), 0) AS developed_acres,
+                   COALESCE(SUM(p.irrigated_area), 0) AS irrigated_acres
+            FROM land_use_parcels p
+            JOIN land_use lu ON lu.id = p.land_use_id
+            {ISLAND_JOIN.format(holding_id="lu.holding_id")}
+            GROUP BY GROUPING SETS ((i.name, p.tenure), (i.name), (p.tenure), ())
+        """,
+    },
+    "workers_by_sex_island": {
+        "title": "Hired workers by island and sex",
+        "dimensions": ["island", "sex"],
+        "measures": ["permanent", "temporary", "non_bahamian"],
+        "sources": [HOLDING_LABOUR_TABLE, HOLDERS_TABLE, "holdings", "islands"],
+        "sql": f"""
+            SELECT i.name AS island, w.sex,
+                   GROUPING(i.name, w.sex) AS grouping_id,
+                   COALESCE(SUM(w.workers) FILTER (WHERE l.question_no = 2), 0) AS permanent,
+                   COALESCE(SUM(w.workers) FILTER (WHERE l.question_no = 3), 0) AS temporary,
+                   COALESCE(SUM(w.workers) FILTER (WHERE l.question_no = 4), 0) AS non_bahamian
+            FROM {HOLDING_LABOUR_TABLE} l
+            JOIN {HOLDERS_TABLE} h ON h.holder_id = l.holder_id
+            {ISLAND_JOIN.format(holding_id="h.farm_id")}
+            CROSS JOIN LATERAL (VALUES ('Male', l.male_count), ('Female', l.female_count)) AS w(sex, workers)
+            WHERE l.question_no BETWEEN 2 AND 4
+            GROUP BY GROUPING SETS ((i.name, w.sex), (i.name), (w.sex), ())
+        """,
+    },
+    "livestock_by_type_island": {
+        "title": "Livestock by type and island",
+        "dimensions": ["animal_type", "island"],
+        "measures": ["males", "females", "total", "total_value"],
+        "sources": ["livestock_information", "holdings", "islands"],
+        "sql": f"""
+            SELECT ls.animal_type::text AS animal_type, i.name AS island,
+                   GROUPING(ls.animal_type, i.name) AS grouping_id,
+                   COALESCE(SUM(ls.males_count), 0) AS males,
+                   COALESCE(SUM(ls.females_count), 0) AS females,
+                   COALESCE(SUM(ls.total_count), 0) AS total,
+                   COALESCE(SUM(ls.total_value), 0) AS total_value
+            FROM livestock_information ls
+            {ISLAND_JOIN.format(holding_id="ls.holding_id")}
+            GROUP BY GROUPING SETS ((ls.animal_type, i.name), (ls.animal_type), (i.name), ())
+        """,
+    },
+    "crop_area_by_crop_island": {
+        "title": "Crop area (acres) by crop and island",
+        "dimensions": ["crop", "island"],
+        "measures": ["area_acres", "plants"],
+        "sources": ["crop_information", "holdings", "islands"],
+        "sql": f"""
+            SELECT c.crop_name AS crop, i.name AS island,
+                   GROUPING(c.crop_name, i.name) AS grouping_id,
+                   COALESCE(SUM(c.area_acres), 0) AS area_acres,
+                   COALESCE(SUM(c.plants_organized + c.plants_scattered), 0) AS plants
+            FROM crop_information c
+            {ISLAND_JOIN.format(holding_id="c.holding_id")}
+            GROUP BY GROUPING SETS ((c.crop_name, i.name), (c.crop_name), (i.name), ())
+        """,
+    },
+    "harvest_by_island_market": {
+        "title": "Harvested quantity by island and market",
+        "dimensions": ["island", "market"],
+        "measures": ["area_harvested", "harvested_quantity"],
+        "sources": ["harvest_information", "market_trade_codes", "holdings", "islands"],
+        "sql": f"""
+            SELECT i.name AS island, COALESCE(m.description, hv.market_trade_code::text) AS market,
+                   GROUPING(i.name, COALESCE(m.description, hv.market_trade_code::text)) AS grouping_id,
+                   COALESCE(SUM(hv.area_harvested), 0) AS area_harvested,
+                   COALESCE(SUM(hv.harvested_quantity), 0) AS harvested_quantity
+            FROM harvest_information hv
+            LEFT JOIN market_trade_codes m ON m.code = hv.market_trade_code
+            {ISLAND_JOIN.format(holding_id="hv.holding_id")}
+            GROUP BY GROUPING SETS (
+                (i.name, COALESCE(m.description, hv.market_trade_code::text)), (i.name),
+                (COALESCE(m.description, hv.market_trade_code::text)), ()
+            )
+        """,
+    },
+}
+
+# --------------------------------------------------------
+# Data versions
+# --------------------------------------------------------
+def ensure_tabulation_support(conn):
+    """Create the version counters, their statement-level triggers and the cache table"""
+    conn.execute(text(f"""
+        CREATE TABLE IF NOT EXISTS {DATA_VERSIONS_TABLE} (
+            table_name TEXT PRIMARY KEY,
+            version BIGINT NOT NULL DEFAULT 0
+        )
+    """))
+    conn.execute(text(f"""
+        CREATE TABLE IF NOT EXISTS {TABULATION_CACHE_TABLE} (
+            name TEXT PRIMARY KEY,
+            data_version TEXT NOT NULL,
+            computed_at TIMESTAMP DEFAULT now(),
+            result JSONB NOT NULL
+        )
+    """))
+    conn.execute(text(f"""
+        CREATE OR REPLACE FUNCTION bump_census_data_version() RETURNS trigger AS $$
+        BEGIN
+            INSERT INTO {DATA_VERSIONS_TABLE} (table_name, version) VALUES (TG_TABLE_NAME, 1)
+            ON CONFLICT (table_name) DO UPDATE SET version = {DATA_VERSIONS_TABLE}.version + 1;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    """))
+    # Creating a trigger locks its table against writes, so only add the missing ones
+    existing = {row[0] for row in conn.execute(text("SELECT tgname FROM pg_trigger WHERE NOT tgisinternal")).all()}
+    for table in sorted({source for tab in TABULATIONS.values() for source in tab["sources"]}):
+        if f"trg_{table}_data_version" in existing:
+            continue
+        conn.execute(text(f"""
+            CREATE TRIGGER trg_{table}_data_version
+            AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON {table}
+            FOR EACH STATEMENT EXECUTE FUNCTION bump_census_data_version()
+        """))
+
+
+_support_ready = False
+
+
+def _ensure_ready():
+    global _support_ready
+    if not _support_ready:
+        with engine.begin() as conn:
+            ensure_tabulation_support(conn)
+        _support_ready = True
+
+
+def data_version(conn, sources):
+    """Version key for a set of source tables, e.g. 'holdings:3,islands:0'"""
+    versions = dict(conn.execute(
+        text(f"SELECT table_name, version FROM {DATA_VERSIONS_TABLE} WHERE table_name = ANY(:tables)"),
+        {"tables": list(sources)}
+    ).all())
+    return ",".join(f"{table}:{versions.get(table, 0)}" for table in sorted(sources))
+
+# --------------------------------------------------------
+# Tabulation API
+# --------------------------------------------------------
+def get_tabulation(name, force=False):
+    """Result cube of a standard tabulation as a DataFrame, served from cache when current.
+
+    Subtotal rows carry "All" in the dimension they aggregate over.
+    """
+    _ensure_ready()
+    tab = TABULATIONS[name]
+
+    with engine.begin() as conn:
+        version = data_version(conn, tab["sources"])
+        if not force:
+            cached = conn.execute(
+                text(f"SELECT result FROM {TABULATION_CACHE_TABLE} WHERE name = :name AND data_version = :version"),
+                {"name": name, "version": version}
+            ).scalar()
+            if cached is not None:
+                return pd.DataFrame(cached, columns=tab["dimensions"] + tab["measures"])
+
+        rows = conn.execute(text(tab["sql"])).mappings().all()
+        records = []
+        for row in rows:
+            grouping_id = row["grouping_id"]
+            record = []
+            for position, dimension in enumerate(tab["dimensions"]):
+                # GROUPING() sets bit (n - 1 - position) for dimensions rolled up in this row
+                rolled_up = grouping_id >> (len(tab["dimensions"]) - 1 - position) & 1
+                record.append(ALL_LABEL if rolled_up else (row[dimension] or "Unknown"))
+            record += [float(row[measure] or 0) for measure in tab["measures"]]
+            records.append(record)
+
+        conn.execute(text(f"""
+            INSERT INTO {TABULATION_CACHE_TABLE} (name, data_version, computed_at, result)
+            VALUES (:name, :version, now(), CAST(:result AS jsonb))
+            ON CONFLICT (name) DO UPDATE
+            SET data_version = EXCLUDED.data_version, computed_at = EXCLUDED.computed_at, result = EXCLUDED.result
+        """), {"name": name, "version": version, "result": json.dumps(records)})
+
+    return pd.DataFrame(records, columns=tab["dimensions"] + tab["measures"])
+
+
+def crosstab(name, measure):
+    """Two-way table of one measure with "All" margins, from the cached cube"""
+    tab = TABULATIONS[name]
+    row_dim, col_dim = tab["dimensions"]
+    cube = get_tabulation(name)
+    # An empty source still yields the grand-total row; any data adds detail rows
+    if len(cube) <= 1:
+        return cube.iloc[0:0]
+    table = cube.pivot_table(index=row_dim, columns=col_dim, values=measure, aggfunc="sum", fill_value=0)
+    # Keep the margins last
+    rows = sorted(label for label in table.index if label != ALL_LABEL) + [ALL_LABEL]
+    cols = sorted(label for label in table.columns if label != ALL_LABEL) + [ALL_LABEL]
+    return table.reindex(index=rows, columns=cols, fill_value=0)
@@ -0,0 +1,48 @@
+from datetime import datetime
+
+import pytest
+from sqlalchemy import create_engine, text
+
+from census_app import analytics_lake
+
+
+@pytest.fixture
+def census(tmp_path, monkeypatch):
+    source = create_engine(f"sqlite:///{tmp_path / 'census.db'}")
+    with source.begin() as conn:
+        conn.execute(text("CREATE TABLE islands (id INTEGER PRIMARY KEY, name TEXT)"))
+        conn.execute(text("CREATE TABLE holdings (id INTEGER PRIMARY KEY, island_id INTEGER)"))
+        conn.execute(text("""
+            CREATE TABLE holders (
+                holder_id INTEGER PRIMARY KEY, farm_id INTEGER, age INTEGER,
+                submitted_at TIMESTAMP, updated_at TIMESTAMP
+            )
+        """))
+        conn.execute(text("INSERT INTO islands VALUES (1, 'Andros')"))
+        conn.execute(text("INSERT INTO holdings VALUES (1, 1)"))
+    monkeypatch.setattr(analytics_lake, "engine", source)
+    monkeypatch.setattr(analytics_lake, "LAKE_DIR", str(tmp_path / "lake"))
+    return source
+
+
+def _add_holder(source, holder_id, age, updated_at):
+    with source.begin() as conn:
+        conn.execute(text("""
+            INSERT OR REPLACE INTO holders (holder_id, farm_id, age, submitted_at, updated_at)
+            VALUES (:id, 1, :age, '2025-03-01 09:00:00', :updated_at)
+        """), {"id": holder_id, "age": age, "updated_at": updated_at})
+
+
+def test_compact_merges_batches_with_and_without_null_integers(census):
+    _add_holder(census, 1, 30, datetime(2025, 2, 1))
+    _add_holder(census, 2, None, datetime(2025, 3, 1))
+    assert analytics_lake.sync_table("holders") == 2
+
+    # The second batch has no NULL in age
+    _add_holder(census, 2, 41, datetime(2025, 3, 10))
+    assert analytics_lake.sync_table("holders") == 1
+
+    assert analytics_lake.compact_table("holders", min_files=1) == 1
+    holders = analytics_lake.load_lake_table("holders").set_index("holder_id")
+    assert holders["age"].to_dict() == {1: 30, 2: 41}
+    assert set(holders["island"]) == {"Andros"}
@@ -0,0 +1,25 @@
+import numpy as np
+
+from census_app.assignment import _local_search, capacitated_kmeans
+
+
+def test_local_search_swaps_when_every_closer_agent_is_full():
+    # Each holder starts with the far agent and both agents are full: only a swap helps
+    labels = _local_search([[10, 1], [1, 10]], [0, 1], [1, 1])
+    assert list(labels) == [1, 0]
+
+
+def test_local_search_moves_into_spare_capacity():
+    labels = _local_search([[10, 1], [1, 10]], [0, 1], [2, 2])
+    assert list(labels) == [1, 0]
+
+
+def test_local_search_keeps_optimal_assignment():
+    labels = _local_search([[1, 10], [10, 1]], [0, 1], [1, 1])
+    assert list(labels) == [0, 1]
+
+
+def test_capacitated_kmeans_respects_capacity():
+    points = np.array([[25.0, -77.3], [25.01, -77.31], [25.02, -77.32], [24.0, -76.0]])
+    labels, _ = capacitated_kmeans(points, [2, 2])
+    assert np.bincount(labels, minlength=2).tolist() == [2, 2]
@@ -0,0 +1,50 @@
+import base64
+import re
+import zlib
+from datetime import datetime
+
+from sqlalchemy import create_engine
+
+from census_app import config, exports
+
+ROW_COUNT = 95
+
+
+def _fake_rows(conn):
+    rows = [
+        (n, f"Holder {n}", "Agent Smith", datetime(2025, 3, 1, 9), datetime(2025, 3, 3, 9), 12, "Due soon")
+        for n in range(1, ROW_COUNT + 1)
+    ]
+    for start in range(0, len(rows), 40):
+        yield rows[start:start + 40]
+
+
+def _visible_text(path):
+    """Strings drawn inside the page area of every page of a ReportLab PDF"""
+    raw = open(path, "rb").read()
+    page_height = float(re.search(rb"/MediaBox \[ 0 0 [\d.]+ ([\d.]+) \]", raw).group(1))
+    visible = []
+    for match in re.finditer(rb"stream\r?\n(.*?)endstream", raw, re.S):
+        content = zlib.decompress(base64.a85decode(match.group(1).strip()[:-2])).decode("latin-1")
+        offset = 0.0
+        # Tables are drawn after a translation (cm); their text is positioned relative to it
+        for line in content.splitlines():
+            translation = re.match(r"1 0 0 1 ([-\d.]+) ([-\d.]+) cm", line)
+            if translation:
+                offset = float(translation.group(2))
+            for y, string in re.findall(r"BT 1 0 0 1 [-\d.]+ ([-\d.]+) Tm \((.*?)\) Tj", line):
+                if 0 <= offset + float(y) <= page_height:
+                    visible.append(string)
+    return visible
+
+
+def test_pdf_export_keeps_every_row_on_the_page(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "engine", create_engine("sqlite://"))
+    monkeypatch.setattr(exports, "_count_pending", lambda conn: ROW_COUNT)
+    monkeypatch.setattr(exports, "_stream_pending_rows", _fake_rows)
+
+    path = str(tmp_path / "pending.pdf")
+    exports.run_pdf_export(path, f"{path}.progress")
+
+    visible = _visible_text(path)
+    assert [f"Holder {n}" for n in range(1, ROW_COUNT + 1)] == [s for s in visible if re.fullmatch(r"Holder \d+", s)]
@@ -0,0 +1,27 @@
+import pandas as pd
+
+from census_app.household_roster import ROSTER_COLUMNS, diff_roster
+
+MEMBER = {
+    "holder_number": 1, "relationship": "Spouse", "sex": "Female", "age": 40, "education": "Secondary",
+    "primary_occupation": "Farmer", "secondary_occupation": "None", "working_time": "F",
+}
+
+
+def _roster(*rows):
+    return pd.DataFrame(list(rows), columns=["id"] + ROSTER_COLUMNS)
+
+
+def test_diff_roster_deletes_a_cleared_member():
+    stored = _roster({"id": 7, **MEMBER})
+    edited = _roster({"id": 7, **{column: None for column in ROSTER_COLUMNS}})
+    assert diff_roster(stored, edited) == ([], [], [{"id": 7}])
+
+
+def test_diff_roster_updates_changed_and_inserts_new_members():
+    stored = _roster({"id": 7, **MEMBER})
+    edited = _roster({"id": 7, **MEMBER, "age": 41}, {"id": None, **MEMBER, "holder_number": 2})
+    inserts, updates, deletes = diff_roster(stored, edited)
+    assert [row["holder_number"] for row in inserts] == [2]
+    assert [(row["id"], row["age"]) for row in updates] == [(7, 41)]
+    assert deletes == []
@@ -0,0 +1,41 @@
+import ast
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+APP_DIR = Path(__file__).resolve().parents[1] / "census_app" / "registration_test"
+
+# Loaded on demand by the pages that need them, never at import time
+HEAVY_MODULES = ["pandas", "folium", "streamlit_folium", "requests", "pyarrow", "st_aggrid"]
+IMPORT_BUDGET_SECONDS = 1.5
+
+
+def _module_level_imports():
+    tree = ast.parse((APP_DIR / "main_app.py").read_text())
+    return "\n".join(
+        ast.unparse(node) for node in tree.body if isinstance(node, (ast.Import, ast.ImportFrom))
+    )
+
+
+def _run_imports():
+    program = "\n".join([
+        "import json, sys, time",
+        "start = time.perf_counter()",
+        _module_level_imports(),
+        "elapsed = time.perf_counter() - start",
+        f"print(json.dumps({{'elapsed': elapsed, 'loaded': [m for m in {HEAVY_MODULES!r} if m in sys.modules]}}))",
+    ])
+    # A fresh interpreter so nothing imported by pytest or other tests leaks in
+    result = subprocess.run(
+        [sys.executable, "-c", program], cwd=APP_DIR, capture_output=True, text=True, check=True
+    )
+    return json.loads(result.stdout.splitlines()[-1])
+
+
+def test_main_app_imports_skip_heavy_modules():
+    assert _run_imports()["loaded"] == []
+
+
+def test_main_app_imports_within_budget():
+    assert _run_imports()["elapsed"] < IMPORT_BUDGET_SECONDS